@@ -2,7 +2,7 @@
 
 import json
 import logging
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from typing import List
 
@@ -23,6 +23,8 @@ logger = logging.getLogger(__name__)
 
 # Utils
 from utils import to_json, parse_adk_event
+from config import config
+from tools.analysis.ingestion import analyze_trace_source
 
 
 @dataclass
@@ -38,15 +40,21 @@ class TracePattern:
 
 # --- Tool Definitions ---
 
-def analyze_traces(agent_name: str) -> str:
+def analyze_traces(agent_name: str, trace_source: str = "") -> str:
     """
     Analyzes traces for a specific agent to identify failure patterns.
     
     Args:
         agent_name: The name of the agent to analyze.
+        trace_source: Optional JSONL/OTLP file or log directory to stream traces
+            from. Defaults to the `TRACE_SOURCE` setting.
     """
     logger.info(f"Starting trace analysis for: {agent_name}")
     
+    source = trace_source or config.analysis.trace_source
+    if source:
+        return _analyze_trace_source(agent_name, source)
+    
     # Simulate iterative trace analysis
     patterns = [
         TracePattern(
@@ -104,6 +112,31 @@ def analyze_traces(agent_name: str) -> str:
     logger.info(f"Trace analysis complete: Found {len(patterns)} patterns")
     return json.dumps(results, indent=2)
 
+def _analyze_trace_source(agent_name: str, source: str) -> str:
+    """Stream real traces from `source` through the incremental detectors."""
+    analyzer = analyze_trace_source(
+        source, agent_name=agent_name, batch_size=config.analysis.ingest_batch_size
+    )
+    patterns = [TracePattern(**p) for p in analyzer.patterns()]
+    
+    results = {
+        "analysis_type": "streaming_trace_analysis",
+        "timestamp": datetime.now().isoformat(),
+        "agent_name": agent_name,
+        "trace_source": source,
+        "iterations_completed": analyzer.batches_processed,
+        "traces_analyzed": analyzer.traces_analyzed,
+        "traces_per_second": round(analyzer.traces_per_second, 1),
+        "patterns_detected": [asdict(pattern) for pattern in patterns],
+        "error_templates": analyzer.error_templates(),
+        "critical_patterns": sum(1 for p in patterns if p.severity == "critical"),
+        "high_patterns": sum(1 for p in patterns if p.severity == "high"),
+        "analysis_complete": True
+    }
+    
+    logger.info(f"Trace analysis complete: Found {len(patterns)} patterns")
+    return json.dumps(results, indent=2)
+
 # --- Agent Definition ---
 
 trace_tool = FunctionTool(analyze_traces)
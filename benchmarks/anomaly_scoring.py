@@ -0,0 +1,82 @@
+"""Benchmark: batched NumPy anomaly scoring vs the scalar function.
+
+Scores every metric of every agent once per interval, as the fleet-wide
+anomaly pass does, at 10k and 100k agents by default.
+
+Usage:
+    python benchmarks/anomaly_scoring.py [--agents 10000 100000] [--metrics 8]
+"""
+
+import argparse
+import time
+
+# Ensure repo root is on Python path so `from tools ...` works when running the script
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from tools.analysis.pattern_detection import (
+    SEVERITIES,
+    calculate_anomaly_score,
+    calculate_anomaly_scores,
+    classify_anomaly_scores,
+    top_anomalies
+)
+
+
+def make_matrices(agents: int, metrics: int):
+    rng = np.random.default_rng(5)
+    means = rng.uniform(10, 500, size=(agents, metrics))
+    std_devs = means * rng.uniform(0.05, 0.3, size=(agents, metrics))
+    std_devs[rng.random((agents, metrics)) < 0.01] = 0.0  # flat series
+    current = rng.normal(means, std_devs + 1e-9)
+    spikes = rng.random((agents, metrics)) < 0.001
+    current[spikes] += 10 * std_devs[spikes]
+    return current, means, std_devs
+
+
+def scalar_pass(current, means, std_devs, threshold: float):
+    rows = current.tolist(), means.tolist(), std_devs.tolist()
+    flagged = []
+    for agent, (values, mus, sigmas) in enumerate(zip(*rows)):
+        for metric, (value, mean, std_dev) in enumerate(zip(values, mus, sigmas)):
+            score = calculate_anomaly_score(value, mean, std_dev)
+            if score >= threshold:
+                flagged.append((score, agent, metric))
+    flagged.sort(reverse=True)
+    return flagged[:10]
+
+
+def batched_pass(current, means, std_devs, threshold: float):
+    scores = calculate_anomaly_scores(current, means, std_devs)
+    severities = SEVERITIES[classify_anomaly_scores(scores, threshold)]
+    return top_anomalies(scores, 10, threshold), severities
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--metrics", type=int, default=8)
+    parser.add_argument("--threshold", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"{'agents':>8} {'values':>9} {'scalar ms':>10} {'batched ms':>11} {'speedup':>8}")
+    for agents in args.agents:
+        current, means, std_devs = make_matrices(agents, args.metrics)
+
+        started = time.perf_counter()
+        expected = scalar_pass(current, means, std_devs, args.threshold)
+        scalar = time.perf_counter() - started
+
+        started = time.perf_counter()
+        top, _ = batched_pass(current, means, std_devs, args.threshold)
+        batched = time.perf_counter() - started
+
+        assert [(a["agent"], a["metric"]) for a in top] == [(agent, metric) for _, agent, metric in expected]
+        print(f"{agents:>8} {current.size:>9} {scalar * 1e3:>10.1f} {batched * 1e3:>11.1f} {scalar / batched:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark: fleet-wide recovery throughput vs. deployment backend load.
+
+Recovers many agents against a stand-in `DeploymentServer` whose rollback
+latency grows with concurrent load and which fails calls beyond its
+capacity. Compares serial recovery, an unbounded burst and the rate-limited
+`FleetRecoveryCoordinator`.
+
+Usage:
+    python benchmarks/fleet_recovery.py [--agents 200] [--latency-ms 50] [--capacity 16]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+# Ensure repo root is on Python path so `from tools ...` works when running the script
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mcp_servers.deployment_server import DeploymentServer
+from tools.recovery.fleet import FleetRecoveryCoordinator, RecoveryTarget
+
+
+class LoadedDeploymentServer(DeploymentServer):
+    """Deployment server stand-in with load-dependent latency and an overload limit."""
+
+    def __init__(self, latency_ms: float, capacity: int):
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.capacity = capacity
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def rollback_agent(self, agent_name: str, target_version: str):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            overloaded = self.in_flight > self.capacity
+            await asyncio.sleep(self.latency_ms / 1000 * (1 + self.in_flight / self.capacity))
+            if overloaded:
+                return {"status": "error", "agent": agent_name, "error": "backend overloaded"}
+            return await super().rollback_agent(agent_name, target_version)
+        finally:
+            self.in_flight -= 1
+
+
+async def run_case(name: str, args, **coordinator_kwargs):
+    server = LoadedDeploymentServer(args.latency_ms, args.capacity)
+
+    async def recover(target: RecoveryTarget):
+        return await server.rollback_agent(target.agent_name, target.target_version)
+
+    targets = [
+        RecoveryTarget(f"agent_{i}", ["critical", "high", "medium"][i % 3], target_version="v2.2.5")
+        for i in range(args.agents)
+    ]
+    coordinator = FleetRecoveryCoordinator(recover, failure_rate_threshold=1.1, **coordinator_kwargs)
+    started = time.perf_counter()
+    report = await coordinator.run(targets)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<28} {elapsed:>8.2f} {report.count('recovered') / elapsed:>10.1f} "
+          f"{report.count('recovered'):>9} {report.count('failed'):>6} {server.peak_in_flight:>12}")
+
+
+async def main_async(args):
+    print(f"{args.agents} agents, {args.latency_ms:.0f} ms base latency, backend capacity {args.capacity}")
+    print(f"{'strategy':<28} {'seconds':>8} {'ok/sec':>10} {'recovered':>9} {'failed':>6} {'peak in-flight':>12}")
+    unlimited = float(args.agents * 1000)
+    await run_case("serial", args, workers=1, rate_per_second=unlimited, burst=args.agents)
+    await run_case("unbounded burst", args, workers=args.agents, rate_per_second=unlimited, burst=args.agents)
+    for workers in (args.capacity // 2, args.capacity):
+        rate = workers / (args.latency_ms / 1000) * 0.9
+        await run_case(f"coordinator w={workers} r={rate:.0f}/s", args,
+                       workers=workers, rate_per_second=rate, burst=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--capacity", type=int, default=16)
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
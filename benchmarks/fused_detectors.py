@@ -0,0 +1,89 @@
+"""Benchmark: fused single-pass detector engine vs one pass per detector.
+
+Fused cost grows with the number of distinct fields the detectors read (at
+most three here), not with the number of detectors.
+
+Usage:
+    python benchmarks/fused_detectors.py [--traces 200000]
+"""
+
+import argparse
+import random
+import time
+
+# Ensure repo root is on Python path so `from tools ...` works when running the script
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools.analysis.detector_engine import DetectorEngine, MatchDetector
+
+ERROR_TYPES = [None] * 8 + ["timeout", "connection_reset", "invalid_response"]
+STATUS_CODES = [200] * 20 + [429, 500, 502, 503]
+OPERATIONS = [f"op_{i}" for i in range(64)]
+
+
+def make_traces(count: int):
+    rng = random.Random(7)
+    return [
+        {
+            "trace_id": f"t{i}",
+            "operation": rng.choice(OPERATIONS),
+            "error_type": rng.choice(ERROR_TYPES),
+            "status_code": rng.choice(STATUS_CODES),
+            "duration_ms": rng.expovariate(1 / 300),
+            "timestamp": f"2025-11-17T10:{(i // 60) % 60:02d}:{i % 60:02d}Z",
+        }
+        for i in range(count)
+    ]
+
+
+def make_detectors(count: int):
+    """Equality detectors spread over the error_type, status_code and operation fields."""
+    candidates = (
+        [("error_type", v) for v in ERROR_TYPES if v]
+        + [("status_code", v) for v in (429, 500, 502, 503)]
+        + [("operation", v) for v in OPERATIONS]
+    )
+    return [
+        MatchDetector(f"d{i}_{field}_{value}", field, value)
+        for i, (field, value) in enumerate(candidates[:count])
+    ]
+
+
+def per_detector_scans(traces, detectors):
+    """The pre-engine approach: one `sum(...)` pass per detector."""
+    return {
+        d.name: sum(1 for t in traces if t.get(d.field_name) == d.value) > len(traces) * d.min_ratio
+        for d in detectors
+    }
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", type=int, default=200_000)
+    args = parser.parse_args()
+
+    traces = make_traces(args.traces)
+    _, one_scan = timed(lambda: sum(1 for t in traces if t.get("error_type") == "timeout"))
+
+    print(f"{args.traces} traces, single reference scan: {one_scan * 1000:.1f} ms")
+    print(f"{'detectors':>9} {'fields':>6} {'separate ms':>12} {'fused ms':>9} {'fused/scan':>11} {'speedup':>8}")
+    for count in (1, 2, 4, 8, 16, 32, 48, 64):
+        detectors = make_detectors(count)
+        expected, separate = timed(per_detector_scans, traces, detectors)
+        engine = DetectorEngine(detectors, track_occurrences=False)
+        fused_results, fused = timed(engine.run, traces)
+        assert fused_results == expected
+        print(f"{count:>9} {len(engine.fields):>6} {separate * 1000:>12.1f} {fused * 1000:>9.1f} "
+              f"{fused / one_scan:>10.2f}x {separate / fused:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
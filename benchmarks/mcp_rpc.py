@@ -0,0 +1,100 @@
+"""Benchmark: MCP request throughput and latency for the recovery agent's calls.
+
+Starts the deployment and notification servers as subprocesses, on Unix
+sockets or on stdio, and drives `deploy_agent`, `rollback_agent` and
+`send_notification` through one pipelined connection per server. Runs once
+with a single outstanding request, which is how the recovery path used to
+call the servers, and once with `--concurrency` outstanding requests.
+Reports requests/sec and p50/p99 latency.
+
+Usage:
+    python benchmarks/mcp_rpc.py [--requests 5000] [--concurrency 64] [--transport socket|stdio]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Ensure repo root is on Python path so `from mcp_servers ...` works when running the script
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+
+from mcp_servers.transport import McpClient
+
+CALLS = {
+    "deploy_agent": ("deployment_server", lambda i: {"agent_name": f"agent_{i % 500}", "version": f"v{i}"}),
+    "rollback_agent": ("deployment_server", lambda i: {"agent_name": f"agent_{i % 500}", "target_version": "v1"}),
+    "send_notification": ("notification_server", lambda i: {
+        "channel": "slack", "title": "Automated recovery", "message": f"Recovery in progress for agent_{i % 500}"
+    }),
+}
+
+
+async def connect(server: str, transport: str, max_in_flight: int, workdir: str):
+    command = [sys.executable, "-m", f"mcp_servers.{server}", "--max-in-flight", str(max_in_flight),
+               "--log-level", "WARNING"]
+    if transport == "stdio":
+        return await McpClient.spawn(*command, cwd=REPO_ROOT), None
+    path = os.path.join(workdir, f"{server}.sock")
+    process = await asyncio.create_subprocess_exec(*command, "--socket", path, cwd=REPO_ROOT)
+    for _ in range(200):
+        if os.path.exists(path):
+            break
+        await asyncio.sleep(0.05)
+    return await McpClient.connect_socket(path), process
+
+
+async def drive(client: McpClient, tool: str, requests: int, concurrency: int):
+    make_arguments = CALLS[tool][1]
+    latencies = np.empty(requests)
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            await client.call_tool(tool, make_arguments(i))
+            latencies[i] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--transport", choices=["socket", "stdio"], default="socket")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    clients, processes = {}, []
+    for server in sorted({server for server, _ in CALLS.values()}):
+        clients[server], process = await connect(server, args.transport, args.max_in_flight, workdir)
+        await clients[server].initialize("benchmark")
+        if process is not None:
+            processes.append(process)
+
+    print(f"transport={args.transport} requests={args.requests} max_in_flight={args.max_in_flight}")
+    print(f"{'tool':<20}{'outstanding':>12}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for tool, (server, _) in CALLS.items():
+        for concurrency in (1, args.concurrency):
+            rate, p50, p99 = await drive(clients[server], tool, args.requests, concurrency)
+            print(f"{tool:<20}{concurrency:>12}{rate:>10.0f}{p50:>9.2f}{p99:>9.2f}")
+
+    for client in clients.values():
+        await client.close()
+    for process in processes:
+        process.terminate()
+        await process.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
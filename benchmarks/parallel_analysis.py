@@ -0,0 +1,67 @@
+"""Benchmark: sharded trace analysis scaling with worker processes.
+
+Writes a synthetic JSONL trace dump, then analyzes it with 1, 2, 4, ...
+workers up to the core count and reports speedup over one worker.
+
+Usage:
+    python benchmarks/parallel_analysis.py [--traces 1000000] [--max-workers N]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+# Ensure repo root is on Python path so `from tools ...` works when running the script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools.analysis.parallel import ParallelTraceAnalyzer
+
+
+def write_traces(path: str, count: int):
+    rng = random.Random(11)
+    with open(path, "w") as handle:
+        for i in range(count):
+            handle.write(json.dumps({
+                "trace_id": f"t{i // 8}",
+                "span_id": f"s{i}",
+                "operation": f"op_{rng.randrange(40)}",
+                "error_type": "timeout" if rng.random() < 0.12 else None,
+                "status_code": 429 if rng.random() < 0.01 else 200,
+                "duration_ms": round(rng.expovariate(1 / 300), 3),
+                "timestamp": f"2025-11-17T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}Z",
+            }) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", type=int, default=1_000_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "traces.jsonl")
+        write_traces(path, args.traces)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.traces} traces ({size_mb:.0f} MB), {os.cpu_count()} cores")
+        print(f"{'workers':>7} {'shards':>6} {'seconds':>8} {'traces/s':>10} {'speedup':>8} {'efficiency':>10}")
+
+        workers = 1
+        baseline = None
+        while True:
+            analyzer = ParallelTraceAnalyzer(workers=workers, min_shard_bytes=1024 * 1024)
+            merged = analyzer.analyze(path)
+            assert merged.traces == args.traces
+            baseline = baseline or analyzer.elapsed_seconds
+            speedup = baseline / analyzer.elapsed_seconds
+            print(f"{workers:>7} {analyzer.shards:>6} {analyzer.elapsed_seconds:>8.2f} "
+                  f"{merged.traces / analyzer.elapsed_seconds:>10.0f} {speedup:>7.2f}x {speedup / workers:>9.0%}")
+            if workers >= args.max_workers:
+                break
+            workers = min(workers * 2, args.max_workers)
+
+
+if __name__ == "__main__":
+    main()
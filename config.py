@@ -29,6 +29,10 @@ class RecoveryConfig:
     enable_automatic_rollback: bool = True
     enable_state_restoration: bool = True
     max_recovery_attempts: int = 3
+    checkpoint_dir: Optional[str] = None
+    checkpoint_chunk_bytes: int = 65536  # average content-defined chunk size, power of two
+    restored_state_dir: Optional[str] = None  # restores write <agent>.state here
+    deployment_registry_path: Optional[str] = None
 
 
 @dataclass
@@ -39,6 +43,20 @@ class ComplianceConfig:
     sla_target_uptime_percent: float = 99.7
     sla_check_interval_minutes: int = 60
     retention_days: int = 90
+    audit_log_dir: Optional[str] = None  # durable hash-chained audit log when immutable logs are enabled
+
+
+@dataclass
+class AnalysisConfig:
+    """Configuration for trace analysis settings."""
+    trace_source: Optional[str] = None
+    ingest_batch_size: int = 1000
+    baseline_path: Optional[str] = None
+    seasonal_baseline_path: Optional[str] = None
+    baseline_save_interval_seconds: float = 60.0  # learned state is written at most this often
+    seasonal_buckets: int = 168  # hour-of-week
+    anomaly_z_threshold: float = 3.0
+    prefilter_z_threshold: float = 3.0  # below this, skip the LLM anomaly detector
 
 
 @dataclass
@@ -58,6 +76,9 @@ class Config:
     # Compliance
     compliance: ComplianceConfig = None
     
+    # Analysis
+    analysis: AnalysisConfig = None
+    
     # Logging
     log_level: str = "INFO"
     log_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -70,11 +91,26 @@ class Config:
             self.recovery = RecoveryConfig()
         if self.compliance is None:
             self.compliance = ComplianceConfig()
+        if self.analysis is None:
+            self.analysis = AnalysisConfig()
         
         # Load from environment variables
         self.google_api_key = os.getenv("GOOGLE_API_KEY", self.google_api_key)
         self.google_cloud_project = os.getenv("GOOGLE_CLOUD_PROJECT", self.google_cloud_project)
         self.log_level = os.getenv("LOG_LEVEL", self.log_level)
+        self.recovery.checkpoint_dir = os.getenv("CHECKPOINT_DIR", self.recovery.checkpoint_dir)
+        self.recovery.restored_state_dir = os.getenv("RESTORED_STATE_DIR", self.recovery.restored_state_dir)
+        self.recovery.deployment_registry_path = os.getenv(
+            "DEPLOYMENT_REGISTRY_PATH", self.recovery.deployment_registry_path
+        )
+        self.compliance.audit_log_dir = os.getenv("AUDIT_LOG_DIR", self.compliance.audit_log_dir)
+        self.analysis.trace_source = os.getenv("TRACE_SOURCE", self.analysis.trace_source)
+        self.analysis.baseline_path = os.getenv("BASELINE_PATH", self.analysis.baseline_path)
+        self.analysis.seasonal_baseline_path = os.getenv("SEASONAL_BASELINE_PATH", self.analysis.seasonal_baseline_path)
+        self.analysis.baseline_save_interval_seconds = float(
+            os.getenv("BASELINE_SAVE_INTERVAL_SECONDS", self.analysis.baseline_save_interval_seconds)
+        )
+        self.analysis.prefilter_z_threshold = float(os.getenv("PREFILTER_Z_THRESHOLD", self.analysis.prefilter_z_threshold))
 
 
 # Create global config instance
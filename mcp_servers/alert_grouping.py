@@ -0,0 +1,246 @@
+"""Alert grouping and storm suppression.
+
+When a shared dependency fails, every affected agent raises its own alert.
+`AlertGrouper` clusters alerts whose `group_by` labels match (by default
+dependency, pattern name and region; alerts with none of them group by
+agent). A group's first notification goes out `group_wait_seconds` after it
+opens and lists its members. While the group stays active, a follow-up digest
+goes out every `digest_interval_seconds` that has new alerts. A group closes
+after `window_seconds` without alerts, with a final digest if anything is
+unreported.
+
+Every operation is O(1) amortized. Groups live in an OrderedDict kept in
+order of last activity, so expiry pops from the front. Notification
+deadlines sit in two FIFO deques that are naturally sorted, because each
+uses a constant delay from a non-decreasing clock. Memory is bounded by
+`max_groups` and by `max_members` listed per group.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = {"critical": 0, "error": 1, "warning": 2, "info": 3}
+
+
+@dataclass
+class Alert:
+    """One alert raised for an agent."""
+    agent_name: str
+    message: str
+    severity: str = "critical"
+    labels: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class GroupNotification:
+    """A grouped notification ready to send."""
+    kind: str  # "initial", "digest" or "final"
+    labels: Dict[str, str]
+    severity: str
+    total_alerts: int
+    new_alerts: int
+    members: List[str]
+    unlisted_alerts: int  # alerts from agents beyond `max_members`
+    sample_message: str
+
+    @property
+    def title(self) -> str:
+        scope = ", ".join(f"{k}={v}" for k, v in self.labels.items())
+        prefix = {"initial": "", "digest": "[update] ", "final": "[closed] "}[self.kind]
+        agents = f"{len(self.members)}{'+' if self.unlisted_alerts else ''}"
+        return f"{prefix}{self.total_alerts} alerts from {agents} agents ({scope})"
+
+    @property
+    def message(self) -> str:
+        members = ", ".join(self.members)
+        if self.unlisted_alerts:
+            members += f" (+{self.unlisted_alerts} alerts from unlisted agents)"
+        return f"{self.sample_message}\nAffected agents: {members}\nNew since last notification: {self.new_alerts}"
+
+
+@dataclass
+class _Group:
+    key: Tuple[str, ...]
+    serial: int
+    labels: Dict[str, str]
+    opened_at: float
+    last_at: float
+    severity: str
+    sample_message: str
+    members: "OrderedDict[str, int]" = field(default_factory=OrderedDict)
+    unlisted_alerts: int = 0
+    total: int = 0
+    unreported: int = 0
+    notified: bool = False
+    next_digest_at: float = 0.0
+
+
+class AlertGrouper:
+    """Cluster alerts by labels and emit grouped notifications and digests."""
+
+    def __init__(
+        self,
+        emit: Callable[[GroupNotification], Any],
+        group_by: Sequence[str] = ("dependency", "pattern", "region"),
+        window_seconds: float = 300.0,
+        group_wait_seconds: float = 10.0,
+        digest_interval_seconds: float = 60.0,
+        max_groups: int = 10_000,
+        max_members: int = 50,
+        clock=time.monotonic
+    ):
+        self.emit = emit
+        self.group_by = tuple(group_by)
+        self.window_seconds = window_seconds
+        self.group_wait_seconds = group_wait_seconds
+        self.digest_interval_seconds = digest_interval_seconds
+        self.max_groups = max_groups
+        self.max_members = max_members
+        self.clock = clock
+        self.stats = {"alerts": 0, "groups": 0, "notifications": 0}
+        self._groups: "OrderedDict[Tuple[str, ...], _Group]" = OrderedDict()
+        # (due time, group key, group serial); stale entries are skipped when popped
+        self._initial_due: Deque[Tuple[float, Tuple[str, ...], int]] = deque()
+        self._digest_due: Deque[Tuple[float, Tuple[str, ...], int]] = deque()
+        self._serials = itertools.count()
+        self._ticker: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def group_key(self, alert: Alert) -> Tuple[str, ...]:
+        key = tuple(alert.labels.get(name, "") for name in self.group_by)
+        return key if any(key) else ("agent", alert.agent_name)
+
+    def add(self, alert: Alert) -> List[GroupNotification]:
+        """Record an alert; returns (and emits) any notifications that became due."""
+        now = self.clock()
+        self.stats["alerts"] += 1
+        key = self.group_key(alert)
+        group = self._groups.get(key)
+        if group is None:
+            labels = {name: alert.labels[name] for name in self.group_by if alert.labels.get(name)}
+            group = _Group(key, next(self._serials), labels or {"agent": alert.agent_name}, now, now,
+                           alert.severity, alert.message)
+            self._groups[key] = group
+            self.stats["groups"] += 1
+            self._initial_due.append((now + self.group_wait_seconds, key, group.serial))
+        else:
+            self._groups.move_to_end(key)
+            if SEVERITY_ORDER.get(alert.severity, 9) < SEVERITY_ORDER.get(group.severity, 9):
+                group.severity = alert.severity
+
+        group.last_at = now
+        group.total += 1
+        group.unreported += 1
+        if alert.agent_name in group.members:
+            group.members[alert.agent_name] += 1
+        elif len(group.members) < self.max_members:
+            group.members[alert.agent_name] = 1
+        else:
+            group.unlisted_alerts += 1
+        if group.notified and not group.next_digest_at:
+            self._schedule_digest(group, now)
+        self._ensure_ticker()
+
+        emitted = self.tick(now)
+        while len(self._groups) > self.max_groups:
+            _, evicted = self._groups.popitem(last=False)
+            emitted.extend(self._close(evicted))
+        return emitted
+
+    def tick(self, now: Optional[float] = None) -> List[GroupNotification]:
+        """Emit notifications whose time has come and close idle groups."""
+        now = self.clock() if now is None else now
+        emitted: List[GroupNotification] = []
+
+        while self._initial_due and self._initial_due[0][0] <= now:
+            _, key, serial = self._initial_due.popleft()
+            group = self._groups.get(key)
+            if group is None or group.serial != serial:
+                continue  # closed (and possibly reopened) since
+            emitted.append(self._notify(group, "initial", now))
+
+        while self._digest_due and self._digest_due[0][0] <= now:
+            due_at, key, serial = self._digest_due.popleft()
+            group = self._groups.get(key)
+            if group is None or group.serial != serial or group.next_digest_at != due_at:
+                continue
+            if group.unreported:
+                emitted.append(self._notify(group, "digest", now))
+            else:
+                group.next_digest_at = 0.0  # quiet; the next alert schedules a digest
+
+        while self._groups:
+            oldest = next(iter(self._groups.values()))
+            if now - oldest.last_at < self.window_seconds:
+                break
+            del self._groups[oldest.key]
+            emitted.extend(self._close(oldest))
+        return emitted
+
+    def close_all(self) -> List[GroupNotification]:
+        """Close every open group at shutdown, emitting what is still unreported."""
+        emitted: List[GroupNotification] = []
+        while self._groups:
+            _, group = self._groups.popitem(last=False)
+            emitted.extend(self._close(group))
+        self._initial_due.clear()
+        self._digest_due.clear()
+        if self._ticker is not None and not self._ticker.done():
+            self._ticker.cancel()
+        self._ticker = None
+        return emitted
+
+    def _notify(self, group: _Group, kind: str, now: float) -> GroupNotification:
+        notification = GroupNotification(
+            kind=kind,
+            labels=dict(group.labels),
+            severity=group.severity,
+            total_alerts=group.total,
+            new_alerts=group.unreported,
+            members=list(group.members),
+            unlisted_alerts=group.unlisted_alerts,
+            sample_message=group.sample_message
+        )
+        self.stats["notifications"] += 1
+        group.unreported = 0
+        group.notified = True
+        if kind != "final":
+            self._schedule_digest(group, now)
+        try:
+            self.emit(notification)
+        except Exception as e:
+            logger.error(f"Emitting grouped alert {notification.title} failed: {e}")
+        return notification
+
+    def _schedule_digest(self, group: _Group, now: float):
+        group.next_digest_at = now + self.digest_interval_seconds
+        self._digest_due.append((group.next_digest_at, group.key, group.serial))
+
+    def _close(self, group: _Group) -> List[GroupNotification]:
+        if group.unreported == 0:
+            return []
+        return [self._notify(group, "final" if group.notified else "initial", self.clock())]
+
+    def _ensure_ticker(self):
+        """Run `tick` in the background so digests go out when alerts stop arriving."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._ticker is None or self._ticker.done() or self._ticker.get_loop() is not loop:
+            self._ticker = loop.create_task(self._tick_forever())
+
+    async def _tick_forever(self):
+        interval = max(min(self.group_wait_seconds, self.digest_interval_seconds) / 4, 0.01)
+        while self._groups:
+            await asyncio.sleep(interval)
+            self.tick()
@@ -0,0 +1,257 @@
+"""Persistent deployment history with a last-known-good index.
+
+Every deploy, post-deploy health verdict and rollback is appended as one
+JSON line to the registry file, which is never rewritten. An in-memory
+index keeps, per agent, the current version, the recent versions and a
+stack of healthy ones, so `last_known_good` and `current` are O(1) dict
+lookups.
+
+Startup cost stays flat as the history grows: every `snapshot_every`
+appends the index is saved next to the log together with the log offset it
+covers, and loading reads the snapshot and replays only the lines after it.
+
+Appends fsync, so async callers run the `record_*` methods in a worker
+thread; a lock keeps concurrent appends and snapshots in order.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeploymentRecord:
+    """One deployed version of an agent."""
+    agent_name: str
+    version: str
+    platform: str
+    deployed_at: str
+    healthy: Optional[bool] = None  # None until a health verdict is recorded
+    reliability_score: Optional[float] = None
+    verdict_at: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return asdict(self)
+
+
+@dataclass
+class AgentDeployments:
+    """Index entry for one agent."""
+    current: Optional[str] = None
+    recent: "OrderedDict[str, DeploymentRecord]" = field(default_factory=OrderedDict)
+    good: List[str] = field(default_factory=list)  # healthy versions, oldest first
+
+
+class DeploymentRegistry:
+    """Append-only deployment log plus an O(1) last-known-good index."""
+
+    def __init__(self, path: Optional[str] = None, keep_recent: int = 32, keep_good: int = 16,
+                 snapshot_every: int = 10_000):
+        self.path = path
+        self.keep_recent = keep_recent
+        self.keep_good = keep_good
+        self.snapshot_every = snapshot_every
+        self._agents: Dict[str, AgentDeployments] = {}
+        self._appends_since_snapshot = 0
+        self._torn_tail = False
+        self._write_lock = threading.RLock()  # snapshot() takes it too, also from inside _record
+
+    @property
+    def snapshot_path(self) -> Optional[str]:
+        return f"{self.path}.snapshot" if self.path else None
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    # --- Recording ---
+
+    def record_deploy(self, agent_name: str, version: str, platform: str = "cloud_run",
+                      at: Optional[str] = None) -> DeploymentRecord:
+        """Record that `version` is now serving for `agent_name`."""
+        event = {"event": "deploy", "agent": agent_name, "version": version, "platform": platform,
+                 "at": at or datetime.now().isoformat()}
+        return self._record(event)
+
+    def record_health(self, agent_name: str, version: str, healthy: bool,
+                      reliability_score: Optional[float] = None, at: Optional[str] = None) -> Optional[DeploymentRecord]:
+        """Record the post-deploy health verdict and reliability score of a version."""
+        event = {"event": "health", "agent": agent_name, "version": version, "healthy": healthy,
+                 "reliability_score": reliability_score, "at": at or datetime.now().isoformat()}
+        return self._record(event)
+
+    def record_rollback(self, agent_name: str, version: str, at: Optional[str] = None) -> Optional[DeploymentRecord]:
+        """Record that `agent_name` was rolled back to an earlier `version`."""
+        event = {"event": "rollback", "agent": agent_name, "version": version,
+                 "at": at or datetime.now().isoformat()}
+        return self._record(event)
+
+    # --- Lookups ---
+
+    def current(self, agent_name: str) -> Optional[str]:
+        entry = self._agents.get(agent_name)
+        return entry.current if entry else None
+
+    def last_known_good(self, agent_name: str, exclude_current: bool = True) -> Optional[str]:
+        """Most recent healthy version, skipping the one currently serving by default."""
+        entry = self._agents.get(agent_name)
+        if entry is None:
+            return None
+        for version in reversed(entry.good):
+            if not (exclude_current and version == entry.current):
+                return version
+        return None
+
+    def get(self, agent_name: str, version: str) -> Optional[DeploymentRecord]:
+        entry = self._agents.get(agent_name)
+        return entry.recent.get(version) if entry else None
+
+    def history(self, agent_name: str) -> List[DeploymentRecord]:
+        """Recent deployments of an agent, oldest first."""
+        entry = self._agents.get(agent_name)
+        return list(entry.recent.values()) if entry else []
+
+    # --- Index maintenance ---
+
+    def _apply(self, event: Dict[str, Any]) -> Optional[DeploymentRecord]:
+        entry = self._agents.setdefault(event["agent"], AgentDeployments())
+        version = event["version"]
+        kind = event["event"]
+
+        if kind == "deploy":
+            record = DeploymentRecord(event["agent"], version, event.get("platform", "cloud_run"), event["at"])
+            entry.recent.pop(version, None)
+            entry.recent[version] = record
+            while len(entry.recent) > self.keep_recent:
+                entry.recent.popitem(last=False)
+            entry.current = version
+            return record
+
+        if kind == "rollback":
+            entry.current = version
+            return entry.recent.get(version)
+
+        # Health verdict
+        record = entry.recent.get(version)
+        if record is not None:
+            record.healthy = event["healthy"]
+            record.reliability_score = event.get("reliability_score")
+            record.verdict_at = event["at"]
+        if version in entry.good:
+            entry.good.remove(version)
+        if event["healthy"]:
+            entry.good.append(version)
+            del entry.good[:-self.keep_good]
+        return record
+
+    # --- Persistence ---
+
+    def _record(self, event: Dict[str, Any]) -> Optional[DeploymentRecord]:
+        """Append to the log, then update the index (and snapshot it when due)."""
+        with self._write_lock:
+            return self._append(event)
+
+    def _append(self, event: Dict[str, Any]) -> Optional[DeploymentRecord]:
+        if self.path:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            line = json.dumps(event, separators=(",", ":")) + "\n"
+            if self._torn_tail:  # terminate a partial line left by a crash
+                line = "\n" + line
+                self._torn_tail = False
+            with open(self.path, "a") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+        record = self._apply(event)
+        if self.path:
+            self._appends_since_snapshot += 1
+            if self._appends_since_snapshot >= self.snapshot_every:
+                self.snapshot()
+        return record
+
+    def snapshot(self):
+        """Save the index and the log offset it covers, atomically."""
+        if not self.path:
+            return
+        with self._write_lock:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        offset = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        data = {
+            "offset": offset,
+            "agents": {
+                agent: {
+                    "current": entry.current,
+                    "good": entry.good,
+                    "recent": [
+                        [r.version, r.platform, r.deployed_at, r.healthy, r.reliability_score, r.verdict_at]
+                        for r in entry.recent.values()
+                    ],
+                }
+                for agent, entry in self._agents.items()
+            },
+        }
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".registry-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as handle:
+                json.dump(data, handle, separators=(",", ":"))
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._appends_since_snapshot = 0
+
+    @classmethod
+    def load(cls, path: Optional[str], **kwargs) -> "DeploymentRegistry":
+        """Load the snapshot, then replay log lines written after it."""
+        registry = cls(path, **kwargs)
+        if not path or not os.path.exists(path):
+            return registry
+
+        offset = registry._load_snapshot()
+        replayed = 0
+        with open(path, "rb") as handle:
+            handle.seek(offset)
+            for line in handle:
+                try:
+                    registry._apply(json.loads(line))
+                    replayed += 1
+                except (ValueError, KeyError) as e:
+                    # A torn final line from a crash mid-append is expected; skip it
+                    logger.warning(f"Skipping unreadable deployment registry entry: {e}")
+                registry._torn_tail = not line.endswith(b"\n")
+        registry._appends_since_snapshot = replayed
+        logger.info(f"Loaded deployment registry for {len(registry)} agents ({replayed} entries replayed)")
+        return registry
+
+    def _load_snapshot(self) -> int:
+        if not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with open(self.snapshot_path) as handle:
+                data = json.load(handle)
+            if data["offset"] > os.path.getsize(self.path):
+                raise ValueError("snapshot is newer than the log")
+            for agent, state in data["agents"].items():
+                entry = self._agents[agent] = AgentDeployments(current=state["current"], good=list(state["good"]))
+                for record in state["recent"]:
+                    entry.recent[record[0]] = DeploymentRecord(agent, *record)
+            return data["offset"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring deployment registry snapshot {self.snapshot_path}: {e}")
+            self._agents = {}
+            return 0
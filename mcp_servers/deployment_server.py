@@ -1,6 +1,12 @@
 """MCP Server for deployment management via Cloud Run and Kubernetes."""
 
+import asyncio
 import logging
+from typing import Optional
+
+from config import config
+from mcp_servers.deployment_registry import DeploymentRegistry
+from mcp_servers.transport import McpServer, McpTool, run_server
 
 logger = logging.getLogger(__name__)
 
@@ -8,21 +14,32 @@ logger = logging.getLogger(__name__)
 class DeploymentServer:
     """MCP Server for deployment APIs."""
     
-    def __init__(self):
+    def __init__(self, registry: Optional[DeploymentRegistry] = None):
         self.name = "deployment_server"
         self.version = "0.1.0"
+        self.registry = registry if registry is not None else DeploymentRegistry.load(
+            config.recovery.deployment_registry_path
+        )
+        self.mcp = McpServer(self.name, self.version, [
+            McpTool.from_function(tool) for tool in (self.deploy_agent, self.rollback_agent, self.record_health)
+        ])
     
-    async def start(self):
-        """Start the MCP server."""
+    async def start(self, socket_path: Optional[str] = None):
+        """Start the MCP server, listening on a Unix socket when `socket_path` is given."""
         logger.info(f"Starting {self.name}")
+        if socket_path:
+            await self.mcp.serve_socket(socket_path)
     
     async def stop(self):
         """Stop the MCP server."""
         logger.info(f"Stopping {self.name}")
+        await self.mcp.close()
     
     async def deploy_agent(self, agent_name: str, version: str, platform: str = "cloud_run"):
         """Deploy agent to specified platform."""
         logger.info(f"Deploying {agent_name}:{version} to {platform}")
+        # Registry appends fsync; keep them off the event loop
+        await asyncio.to_thread(self.registry.record_deploy, agent_name, version, platform)
         return {
             "status": "success",
             "agent": agent_name,
@@ -30,9 +47,29 @@ class DeploymentServer:
             "platform": platform
         }
     
-    async def rollback_agent(self, agent_name: str, target_version: str):
-        """Rollback agent to target version."""
+    async def record_health(self, agent_name: str, version: str, healthy: bool,
+                            reliability_score: Optional[float] = None):
+        """Record the post-deploy health verdict of a version."""
+        await asyncio.to_thread(self.registry.record_health, agent_name, version, healthy, reliability_score)
+        return {
+            "status": "success",
+            "agent": agent_name,
+            "version": version,
+            "healthy": healthy,
+            "last_known_good": self.registry.last_known_good(agent_name)
+        }
+    
+    async def rollback_agent(self, agent_name: str, target_version: Optional[str] = None):
+        """Rollback agent to target version, or to its last known good version."""
+        target_version = target_version or self.registry.last_known_good(agent_name)
+        if not target_version:
+            return {
+                "status": "error",
+                "agent": agent_name,
+                "error": "No target version given and no known good version recorded"
+            }
         logger.info(f"Rolling back {agent_name} to {target_version}")
+        await asyncio.to_thread(self.registry.record_rollback, agent_name, target_version)
         return {
             "status": "success",
             "agent": agent_name,
@@ -42,3 +79,7 @@ class DeploymentServer:
 
 # Create singleton instance
 deployment_server = DeploymentServer()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_server(deployment_server.mcp))
@@ -0,0 +1,255 @@
+"""Asynchronous outbound queue for notifications.
+
+Callers `submit` a notification and return immediately; one worker per
+channel drains the queue behind a `TokenBucket` sized to that channel's
+API limits. While a notification is waiting, identical ones (same channel,
+title and message, or the same explicit key) are folded into it and sent
+once with a count. After a key has been sent, repeats within
+`coalesce_window_seconds` are held until the window ends and go out as one
+message. Channels that accept digests send up to `max_batch` notifications
+per call. When `max_pending` notifications are waiting, `submit` rejects
+new ones and `put` waits for space. `close` sends whatever is still queued,
+held repeats included, before stopping the workers.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from utils import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = {"critical": 0, "error": 1, "warning": 2, "info": 3}
+
+
+@dataclass
+class ChannelLimit:
+    """Rate limit and batching for one channel."""
+    rate_per_second: float
+    burst: float = 1.0
+    max_batch: int = 1  # 1: the channel takes one notification per call
+
+
+CHANNEL_LIMITS = {
+    "slack": ChannelLimit(rate_per_second=1.0, burst=3, max_batch=20),
+    "pagerduty": ChannelLimit(rate_per_second=2.0, burst=5, max_batch=1),
+    "email": ChannelLimit(rate_per_second=0.2, burst=2, max_batch=50),
+    "sms": ChannelLimit(rate_per_second=0.1, burst=1, max_batch=1),
+}
+
+
+@dataclass
+class QueuedNotification:
+    """A pending notification and how many identical ones it stands for."""
+    channel: str
+    title: str
+    message: str
+    severity: str = "info"
+    key: str = ""
+    count: int = 1
+    queued_at: float = field(default_factory=time.monotonic)
+    not_before: float = 0.0
+
+    @property
+    def text(self) -> str:
+        return f"{self.message} (x{self.count})" if self.count > 1 else self.message
+
+
+Sender = Callable[[str, str, str, str], Awaitable[bool]]
+
+
+class NotificationQueue:
+    """Per-channel rate-limited, coalescing, batching notification queue."""
+
+    def __init__(
+        self,
+        sender: Sender,
+        limits: Optional[Dict[str, ChannelLimit]] = None,
+        max_pending: int = 1000,
+        coalesce_window_seconds: float = 30.0,
+        clock=time.monotonic
+    ):
+        self.sender = sender
+        self.limits = dict(CHANNEL_LIMITS if limits is None else limits)
+        self.max_pending = max_pending
+        self.coalesce_window_seconds = coalesce_window_seconds
+        self.clock = clock
+        self.stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "calls": 0, "delivered": 0, "failed": 0}
+        self._pending: Dict[str, "OrderedDict[str, QueuedNotification]"] = {}
+        self._last_sent: Dict[str, float] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._space: Optional[asyncio.Event] = None
+        self._sending = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+    def limit(self, channel: str) -> ChannelLimit:
+        return self.limits.get(channel) or self.limits.setdefault(channel, ChannelLimit(1.0))
+
+    # --- Producers ---
+
+    def submit(self, channel: str, title: str, message: str, severity: str = "info",
+               key: Optional[str] = None) -> bool:
+        """Queue a notification without waiting; False if the queue is full."""
+        channel = getattr(channel, "value", channel)
+        key = key or f"{channel}:{title}:{message}"
+        pending = self._pending.setdefault(channel, OrderedDict())
+        self.stats["submitted"] += 1
+
+        existing = pending.get(key)
+        if existing is not None:
+            existing.count += 1
+            if SEVERITY_ORDER.get(severity, 9) < SEVERITY_ORDER.get(existing.severity, 9):
+                existing.severity = severity
+            self.stats["coalesced"] += 1
+            return True
+
+        if len(self) >= self.max_pending:
+            self.stats["rejected"] += 1
+            logger.warning(f"Notification queue full ({self.max_pending}); dropping {channel} notification: {title}")
+            return False
+
+        now = self.clock()
+        last_sent = self._last_sent.get(key)
+        not_before = last_sent + self.coalesce_window_seconds if last_sent is not None else now
+        pending[key] = QueuedNotification(channel, title, message, severity, key, queued_at=now,
+                                          not_before=max(now, not_before))
+        self._wake(channel)
+        return True
+
+    async def put(self, channel: str, title: str, message: str, severity: str = "info",
+                  key: Optional[str] = None):
+        """Queue a notification, waiting for space when the queue is full."""
+        channel = getattr(channel, "value", channel)
+        key = key or f"{channel}:{title}:{message}"
+        self._ensure_running()
+        while len(self) >= self.max_pending and key not in self._pending.get(channel, {}):
+            self._space.clear()
+            await self._space.wait()
+        self.submit(channel, title, message, severity, key)
+
+    async def flush(self, timeout: Optional[float] = None):
+        """Wait until every pending notification that is due has been sent."""
+        async def drained():
+            while self._sending or any(entry.not_before <= self.clock() for pending in self._pending.values()
+                                       for entry in pending.values()):
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(drained(), timeout)
+
+    async def close(self, timeout: Optional[float] = None):
+        """Send everything still queued, without waiting out coalescing windows, then stop the workers."""
+        now = self.clock()
+        for pending in self._pending.values():
+            for entry in pending.values():
+                entry.not_before = min(entry.not_before, now)
+        if len(self):
+            self._ensure_running()
+            for wakeup in self._wakeups.values():
+                wakeup.set()
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping notification queue with {len(self)} notification(s) unsent")
+        await self.stop()
+
+    async def stop(self):
+        """Cancel the channel workers; pending notifications stay queued."""
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers = {}
+
+    # --- Workers ---
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Events and tasks belong to one loop; rebuild them for a new one
+            self._loop = loop
+            self._workers = {}
+            self._wakeups = {}
+            self._space = asyncio.Event()
+        for channel in self._pending:
+            task = self._workers.get(channel)
+            if task is None or task.done():
+                self._wakeups[channel] = asyncio.Event()
+                self._workers[channel] = loop.create_task(self._drain(channel))
+
+    def _wake(self, channel: str):
+        try:
+            self._ensure_running()
+        except RuntimeError:
+            return  # no running loop; workers start on the next submit or put inside one
+        self._wakeups[channel].set()
+
+    def _bucket(self, channel: str) -> TokenBucket:
+        bucket = self._buckets.get(channel)
+        if bucket is None:
+            limit = self.limit(channel)
+            bucket = self._buckets[channel] = TokenBucket(limit.rate_per_second, limit.burst, self.clock)
+        return bucket
+
+    def _due(self, channel: str) -> List[QueuedNotification]:
+        now = self.clock()
+        due = [entry for entry in self._pending[channel].values() if entry.not_before <= now]
+        due.sort(key=lambda entry: SEVERITY_ORDER.get(entry.severity, 9))
+        return due[:self.limit(channel).max_batch]
+
+    async def _drain(self, channel: str):
+        wakeup = self._wakeups[channel]
+        bucket = self._bucket(channel)
+        while True:
+            if not self._due(channel):
+                wakeup.clear()
+                waiting = [entry.not_before for entry in self._pending[channel].values()]
+                timeout = max(min(waiting) - self.clock(), 0.0) if waiting else None
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            while not bucket.try_acquire():
+                await asyncio.sleep(bucket.time_until_available())
+            batch = self._due(channel)  # more may have arrived while waiting for a token
+            self._sending += 1
+            now = self.clock()
+            for entry in batch:
+                del self._pending[channel][entry.key]
+                self._last_sent[entry.key] = now
+            self._prune_last_sent(now)
+            if self._space is not None:
+                self._space.set()
+            try:
+                await self._send(channel, batch)
+            finally:
+                self._sending -= 1
+
+    async def _send(self, channel: str, batch: List[QueuedNotification]):
+        if len(batch) == 1:
+            entry = batch[0]
+            title, message, severity = entry.title, entry.text, entry.severity
+        else:
+            title = f"{len(batch)} notifications"
+            message = "\n".join(f"[{entry.severity}] {entry.title}: {entry.text}" for entry in batch)
+            severity = batch[0].severity  # batches are sorted most severe first
+        self.stats["calls"] += 1
+        try:
+            delivered = await self.sender(channel, title, message, severity)
+        except Exception as e:
+            logger.error(f"Sending {len(batch)} notification(s) to {channel} failed: {e}")
+            delivered = False
+        count = sum(entry.count for entry in batch)
+        self.stats["delivered" if delivered is not False else "failed"] += count
+
+    def _prune_last_sent(self, now: float):
+        if len(self._last_sent) > 10 * self.max_pending:
+            cutoff = now - self.coalesce_window_seconds
+            self._last_sent = {key: sent for key, sent in self._last_sent.items() if sent >= cutoff}
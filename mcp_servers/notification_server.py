@@ -1,7 +1,13 @@
 """MCP Server for notifications and alerts."""
 
+import asyncio
 import logging
 from enum import Enum
+from typing import Dict, List, Optional
+
+from mcp_servers.alert_grouping import Alert, AlertGrouper, GroupNotification
+from mcp_servers.notification_queue import NotificationQueue
+from mcp_servers.transport import McpServer, McpTool, run_server
 
 logger = logging.getLogger(__name__)
 
@@ -20,14 +26,33 @@ class NotificationServer:
     def __init__(self):
         self.name = "notification_server"
         self.version = "0.1.0"
+        # Outbound queue; delivery goes through send_notification at each channel's rate
+        self.queue = NotificationQueue(self.send_notification)
+        # Alerts sharing a root cause page once, with follow-up digests
+        self.alert_grouper = AlertGrouper(self._page_group)
+        self.mcp = McpServer(self.name, self.version, [
+            McpTool.from_function(tool) for tool in (self.send_notification, self.send_alert)
+        ])
     
-    async def start(self):
-        """Start the MCP server."""
+    async def start(self, socket_path: Optional[str] = None):
+        """Start the MCP server, listening on a Unix socket when `socket_path` is given."""
         logger.info(f"Starting {self.name}")
+        if socket_path:
+            await self.mcp.serve_socket(socket_path)
     
-    async def stop(self):
-        """Stop the MCP server."""
+    async def stop(self, drain_timeout_seconds: float = 10.0):
+        """Stop the MCP server, paging open alert groups and delivering queued notifications first."""
         logger.info(f"Stopping {self.name}")
+        await self.mcp.close()
+        self.alert_grouper.close_all()
+        await self.queue.close(drain_timeout_seconds)
+    
+    async def serve(self, argv: Optional[List[str]] = None):
+        """Serve MCP until stdin closes (or the socket server stops), then shut down cleanly."""
+        try:
+            await run_server(self.mcp, argv)
+        finally:
+            await self.stop()
     
     async def send_notification(
         self,
@@ -40,11 +65,36 @@ class NotificationServer:
         logger.info(f"Sending {severity} notification to {channel}: {title}")
         return True
     
-    async def send_alert(self, agent_name: str, alert_message: str) -> bool:
-        """Send critical alert for incident."""
+    def queue_notification(
+        self,
+        channel: NotificationChannel,
+        title: str,
+        message: str,
+        severity: str = "info"
+    ) -> bool:
+        """Queue a notification for rate-limited delivery; False if the queue is full."""
+        return self.queue.submit(channel, title, message, severity)
+    
+    async def send_alert(
+        self,
+        agent_name: str,
+        alert_message: str,
+        labels: Optional[Dict[str, str]] = None
+    ) -> bool:
+        """Raise a critical alert; alerts with matching labels (dependency, pattern, region) page as one group."""
         logger.warning(f"CRITICAL ALERT for {agent_name}: {alert_message}")
+        self.alert_grouper.add(Alert(agent_name, alert_message, "critical", labels or {}))
         return True
+    
+    def _page_group(self, notification: GroupNotification):
+        self.queue_notification(
+            NotificationChannel.PAGERDUTY, notification.title, notification.message, notification.severity
+        )
 
 
 # Create singleton instance
 notification_server = NotificationServer()
+
+
+if __name__ == "__main__":
+    asyncio.run(notification_server.serve())
@@ -0,0 +1,348 @@
+"""MCP over JSON-RPC 2.0: tool dispatch, stdio and local-socket serving, and a client.
+
+Messages are newline-delimited JSON, as in the MCP stdio transport, and the
+same framing is used on Unix domain sockets. Each request on a connection
+is dispatched as its own task, so a client can pipeline many requests and
+get responses back as they finish, matched by `id`. A server-wide semaphore
+bounds how many requests run at once. When it is exhausted the server stops
+reading new requests, so a fast client is slowed down instead of queuing
+work without limit.
+
+Supported methods: `initialize`, `notifications/initialized`, `ping`,
+`tools/list` and `tools/call`.
+"""
+
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import os
+import sys
+import typing
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = "2024-11-05"
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# Line limit for one message; large enough for any tool call we serve
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object", list: "array"}
+
+
+class McpError(Exception):
+    """JSON-RPC error returned by the peer, or raised by a handler to return one."""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+@dataclass
+class McpTool:
+    """A callable exposed through `tools/call`."""
+    name: str
+    handler: Callable[..., Awaitable[Any]]
+    description: str = ""
+    input_schema: Dict[str, Any] = field(default_factory=lambda: {"type": "object", "properties": {}})
+
+    @classmethod
+    def from_function(cls, handler: Callable[..., Awaitable[Any]], name: Optional[str] = None) -> "McpTool":
+        """Build a tool whose input schema comes from the handler's signature and type hints."""
+        hints = typing.get_type_hints(handler)
+        properties, required = {}, []
+        for param in inspect.signature(handler).parameters.values():
+            if param.name == "self":
+                continue
+            hint = hints.get(param.name, str)
+            args = [a for a in typing.get_args(hint) if a is not type(None)]
+            base = typing.get_origin(args[0] if args else hint) or (args[0] if args else hint)
+            properties[param.name] = {"type": _JSON_TYPES.get(base, "string")}
+            if inspect.isclass(base) and issubclass(base, Enum):
+                properties[param.name]["enum"] = [member.value for member in base]
+            if param.default is inspect.Parameter.empty:
+                required.append(param.name)
+        description = (inspect.getdoc(handler) or "").split("\n")[0]
+        schema = {"type": "object", "properties": properties, "required": required}
+        return cls(name or handler.__name__, handler, description, schema)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {"name": self.name, "description": self.description, "inputSchema": self.input_schema}
+
+
+class McpServer:
+    """JSON-RPC dispatcher for a set of MCP tools."""
+
+    def __init__(self, name: str, version: str, tools: List[McpTool], max_in_flight: int = 64):
+        self.name = name
+        self.version = version
+        self.tools = {tool.name: tool for tool in tools}
+        self.max_in_flight = max_in_flight
+        self.stats = {"requests": 0, "errors": 0, "peak_in_flight": 0}
+        self._in_flight = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._servers: List[asyncio.AbstractServer] = []
+
+    # --- Dispatch ---
+
+    async def handle(self, message: Any) -> Optional[Dict[str, Any]]:
+        """Handle one decoded message; returns the response, or None for notifications."""
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or "method" not in message:
+            return _error(message.get("id") if isinstance(message, dict) else None,
+                          INVALID_REQUEST, "Invalid JSON-RPC request")
+        request_id = message.get("id")
+        is_notification = "id" not in message
+        self.stats["requests"] += 1
+        try:
+            result = await self._dispatch(message["method"], message.get("params") or {})
+        except McpError as e:
+            self.stats["errors"] += 1
+            return None if is_notification else _error(request_id, e.code, e.message, e.data)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.exception(f"MCP method {message['method']} failed")
+            return None if is_notification else _error(request_id, INTERNAL_ERROR, str(e))
+        return None if is_notification else {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def _dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "initialize":
+            return {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": self.name, "version": self.version},
+            }
+        if method in ("notifications/initialized", "ping"):
+            return {}
+        if method == "tools/list":
+            return {"tools": [tool.to_dict() for tool in self.tools.values()]}
+        if method == "tools/call":
+            return await self._call_tool(params)
+        raise McpError(METHOD_NOT_FOUND, f"Method not found: {method}")
+
+    async def _call_tool(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        tool = self.tools.get(params.get("name"))
+        if tool is None:
+            raise McpError(INVALID_PARAMS, f"Unknown tool: {params.get('name')}")
+        arguments = params.get("arguments") or {}
+        try:
+            bound = inspect.signature(tool.handler).bind(**arguments)
+        except TypeError as e:
+            raise McpError(INVALID_PARAMS, f"Invalid arguments for {tool.name}: {e}")
+        try:
+            value = await tool.handler(*bound.args, **bound.kwargs)
+        except Exception as e:
+            # Tool failures are results the model can see, not protocol errors
+            logger.error(f"MCP tool {tool.name} failed: {e}")
+            return {"content": [{"type": "text", "text": str(e)}], "isError": True}
+        result = {"content": [{"type": "text", "text": json.dumps(value, default=str)}], "isError": False}
+        if isinstance(value, dict):
+            result["structuredContent"] = value
+        return result
+
+    # --- Serving ---
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer):
+        """Serve newline-delimited JSON-RPC on one connection until EOF."""
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._slots_loop = loop
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line: bytes):
+            try:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    response = _error(None, PARSE_ERROR, "Parse error")
+                else:
+                    response = await self.handle(message)
+                if response is not None:
+                    data = json.dumps(response, separators=(",", ":"), default=str).encode() + b"\n"
+                    async with write_lock:
+                        writer.write(data)
+                        await writer.drain()
+            except (ConnectionError, RuntimeError) as e:
+                logger.debug(f"MCP client went away before response: {e}")
+            finally:
+                self._in_flight -= 1
+                self._slots.release()
+
+        try:
+            while True:
+                await self._slots.acquire()  # backpressure: stop reading at the in-flight limit
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError) as e:
+                    self._slots.release()
+                    logger.warning(f"MCP connection error: {e}")
+                    break
+                if not line:
+                    self._slots.release()
+                    break
+                if not line.strip():
+                    self._slots.release()
+                    continue
+                self._in_flight += 1
+                self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self._in_flight)
+                task = asyncio.ensure_future(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve_socket(self, path: str) -> asyncio.AbstractServer:
+        """Listen on a Unix domain socket at `path`."""
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.serve_connection, path, limit=_STREAM_LIMIT)
+        self._servers.append(server)
+        logger.info(f"{self.name} serving MCP on {path}")
+        return server
+
+    async def serve_stdio(self):
+        """Serve on this process's stdin/stdout until stdin closes."""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=_STREAM_LIMIT)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout.buffer)
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        logger.info(f"{self.name} serving MCP on stdio")
+        await self.serve_connection(reader, writer)
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+
+
+def _error(request_id: Any, code: int, message: str, data: Any = None) -> Dict[str, Any]:
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+
+class McpClient:
+    """Pipelining MCP client: many requests may be outstanding on one connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, process=None):
+        self.reader = reader
+        self.writer = writer
+        self.process = process
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect_socket(cls, path: str) -> "McpClient":
+        reader, writer = await asyncio.open_unix_connection(path, limit=_STREAM_LIMIT)
+        return cls(reader, writer)
+
+    @classmethod
+    async def spawn(cls, *command: str, cwd: Optional[str] = None) -> "McpClient":
+        """Start a server subprocess and talk to it over its stdin/stdout."""
+        process = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, cwd=cwd, limit=_STREAM_LIMIT
+        )
+        return cls(process.stdout, process.stdin, process)
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+        await self.writer.drain()
+
+    async def initialize(self, client_name: str = "guardian-client") -> Dict[str, Any]:
+        result = await self.request("initialize", {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": client_name, "version": "0.1.0"},
+        })
+        await self.notify("notifications/initialized")
+        return result
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> Any:
+        """Call a tool and return its structured (or decoded text) result; raises McpError on tool failure."""
+        result = await self.request("tools/call", {"name": name, "arguments": arguments or {}})
+        if result.get("isError"):
+            raise McpError(INTERNAL_ERROR, result["content"][0]["text"])
+        if "structuredContent" in result:
+            return result["structuredContent"]
+        return json.loads(result["content"][0]["text"])
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                future = self._pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    error = message["error"]
+                    future.set_exception(McpError(error["code"], error["message"], error.get("data")))
+                else:
+                    future.set_result(message.get("result"))
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("MCP connection closed"))
+            self._pending.clear()
+
+    async def close(self):
+        self.writer.close()
+        if self.process is not None:
+            await self.process.wait()
+        await asyncio.gather(self._receiver, return_exceptions=True)
+
+
+async def run_server(server: McpServer, argv: Optional[List[str]] = None):
+    """Entry point shared by the servers: stdio by default, or `--socket PATH`."""
+    import argparse
+    parser = argparse.ArgumentParser(description=f"Serve {server.name} over MCP")
+    parser.add_argument("--socket", help="Unix domain socket path instead of stdio")
+    parser.add_argument("--max-in-flight", type=int, default=server.max_in_flight)
+    parser.add_argument("--log-level", default=None, help="Root log level, e.g. WARNING; logs go to stderr")
+    args = parser.parse_args(argv)
+    server.max_in_flight = args.max_in_flight
+    if args.log_level:
+        logging.getLogger().setLevel(args.log_level.upper())
+    if args.socket:
+        listener = await server.serve_socket(args.socket)
+        async with listener:
+            await listener.serve_forever()
+    else:
+        await server.serve_stdio()
@@ -50,3 +50,668 @@ def test_calculate_anomaly_score():
     # 3 std devs away
     score = calculate_anomaly_score(130, 100, 10)
     assert score == 3.0
+
+
+def test_streaming_ingestion_jsonl_and_rotation(tmp_path):
+    """Test JSONL ingestion from a rotated log directory, oldest file first."""
+    import json
+    from tools.analysis.ingestion import iter_traces
+
+    for name, op in [("traces.jsonl", "newest"), ("traces.jsonl.1", "middle"), ("traces.jsonl.2", "oldest")]:
+        (tmp_path / name).write_text(json.dumps({"operation": op}) + "\n\nnot json\n")
+
+    operations = [t["operation"] for t in iter_traces(str(tmp_path))]
+    assert operations == ["oldest", "middle", "newest"]
+
+
+def test_streaming_ingestion_skips_malformed_first_line(tmp_path):
+    """Test a JSONL file whose first record is malformed is still read line by line."""
+    import json
+    from tools.analysis.ingestion import iter_traces, to_epoch_seconds
+
+    for name, first in [("broken.jsonl", '{"operation": "a", }'), ("truncated.jsonl", '{"operation": "a", "dur')]:
+        path = tmp_path / name
+        path.write_text(first + "\n" + json.dumps({"operation": "b"}) + "\n")
+        assert [t["operation"] for t in iter_traces(str(path))] == ["b"]
+
+    assert to_epoch_seconds("1700000000.5") == 1700000000.5
+    assert to_epoch_seconds("2023-11-14T22:13:20Z") == 1700000000.0
+    assert to_epoch_seconds("yesterday") is None
+
+
+def test_streaming_ingestion_otlp_export(tmp_path):
+    """Test flattening OTLP-JSON exports into trace dicts."""
+    import json
+    from tools.analysis.ingestion import iter_traces
+
+    export = {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "ChatAgent"}}]},
+        "scopeSpans": [{"spans": [{
+            "traceId": "t1", "spanId": "s1", "name": "api_call",
+            "startTimeUnixNano": "1700000000000000000", "endTimeUnixNano": "1700000000250000000",
+            "attributes": [{"key": "http.status_code", "value": {"intValue": "429"}}],
+            "status": {"code": 2, "message": "Deadline exceeded"},
+        }]}],
+    }]}
+    path = tmp_path / "export.json"
+    path.write_text(json.dumps(export, indent=2))
+
+    traces = list(iter_traces(str(path)))
+    assert len(traces) == 1
+    assert traces[0]["agent"] == "ChatAgent"
+    assert traces[0]["status_code"] == 429
+    assert traces[0]["error_type"] == "timeout"
+    assert traces[0]["duration_ms"] == 250.0
+
+
+def test_streaming_trace_analyzer_matches_detectors():
+    """Test incremental detection agrees with the in-memory detectors."""
+    from tools.analysis.ingestion import StreamingTraceAnalyzer
+
+    traces = (
+        [{"error_type": "timeout", "operation": "api_call"} for _ in range(30)]
+        + [{"status_code": 429, "operation": "client"} for _ in range(5)]
+        + [{"error_type": None} for _ in range(65)]
+    )
+    analyzer = StreamingTraceAnalyzer(batch_size=7).consume(iter(traces))
+
+    patterns = {p["pattern_name"]: p for p in analyzer.patterns()}
+    assert analyzer.traces_analyzed == 100
+    assert analyzer.batches_processed == 15
+    assert ("timeout_cascade" in patterns) == detect_timeout_cascade(traces)
+    assert ("external_api_rate_limit" in patterns) == detect_api_rate_limit(traces)
+    assert patterns["timeout_cascade"]["frequency"] == 30
+    assert patterns["timeout_cascade"]["affected_operations"] == ["api_call"]
+    assert analyzer.summary()["traces_per_second"] > 0
+
+
+def test_detector_engine_single_pass():
+    """Test fused detectors, predicates and accumulators share one pass."""
+    from tools.analysis.detector_engine import Accumulator, Detector, DetectorEngine
+    from tools.analysis.pattern_detection import DEFAULT_DETECTORS, detect_patterns
+
+    class MaxDuration(Accumulator):
+        name = "max_duration"
+        fields = ("duration_ms",)
+
+        def __init__(self):
+            self.value = 0
+
+        def update(self, duration_ms):
+            self.value = max(self.value, duration_ms or 0)
+
+        def result(self, total):
+            return self.value
+
+    reads = []
+
+    class CountingTrace(dict):
+        def get(self, key, default=None):
+            reads.append(key)
+            return super().get(key, default)
+
+    traces = [CountingTrace(error_type="timeout", status_code=200, duration_ms=5, payload="x")
+              for _ in range(3)]
+    traces += [CountingTrace(error_type=None, status_code=429, duration_ms=90, payload="x")]
+    slow = Detector("slow_call", ("duration_ms",), lambda d: d > 50)
+
+    engine = DetectorEngine(DEFAULT_DETECTORS + [slow, MaxDuration()])
+    results = engine.run(traces)
+
+    assert results == {
+        "timeout_cascade": True, "external_api_rate_limit": True, "slow_call": True, "max_duration": 90
+    }
+    assert "payload" not in reads
+    assert set(reads) <= set(engine.fields)
+    assert engine.stats("timeout_cascade").frequency == 3
+    assert detect_patterns(traces)["timeout_cascade"] == detect_timeout_cascade(traces)
+
+
+def test_trace_table_vectorized_queries():
+    """Test columnar filters, counts and indexes."""
+    from tools.analysis.pattern_detection import DEFAULT_DETECTORS, detect_patterns
+    from tools.analysis.trace_table import TraceTable
+
+    traces = [
+        {"operation": "api_call", "agent": "a1", "error_type": "timeout", "status_code": 504,
+         "duration_ms": 3000, "timestamp": "2025-11-17T10:15:00Z"},
+        {"operation": "api_call", "agent": "a2", "error_type": None, "status_code": 429,
+         "duration_ms": 80, "timestamp": "2025-11-17T10:16:00Z"},
+        {"operation": "cache", "agent": "a1", "error_type": None, "status_code": 200,
+         "duration_ms": 5, "timestamp": "2025-11-17T10:17:00Z"},
+        {"operation": "api_call", "agent": "a1", "error_type": "timeout", "status_code": None,
+         "duration_ms": None, "timestamp": None},
+    ]
+    table = TraceTable.from_traces(traces)
+
+    assert len(table) == 4
+    assert table.count(error_type="timeout") == 2
+    assert table.count(status_code=429) == 1
+    assert table.count(operation="api_call", agent="a1") == 2
+    assert table.count(operation=["cache", "missing"]) == 1
+    assert table.count(duration_ms=(50, None)) == 2
+    assert list(table.categorical["operation"].rows("cache")) == [2]
+    assert table.group_counts("operation", table.filter(error_type="timeout")) == {"api_call": 2}
+    assert table.time_range(table.filter(agent="a1"))[1] - table.time_range()[0] == 120
+    assert table.take(table.filter(agent="a2")).categorical["operation"].decode() == ["api_call"]
+    assert table.run_detectors(DEFAULT_DETECTORS) == detect_patterns(traces)
+
+    textual = TraceTable.from_traces([{"status_code": "OK"}, {"status_code": "503"}, {"status_code": "5xx"}])
+    assert list(textual.numeric["status_code"]) == [0, 503, 0]
+
+
+def test_memory_leak_monitor_streaming_trend():
+    """Test incremental leak detection, noise rejection and projection."""
+    import random
+    from tools.analysis.memory_trend import MemoryLeakMonitor, MemoryTrend
+
+    monitor = MemoryLeakMonitor(window=60, threshold_percent=85.0, interval_seconds=60)
+    rng = random.Random(1)
+    for i in range(200):
+        monitor.observe("leaky", 40 + i * 0.05 + rng.uniform(-0.2, 0.2))   # +3%/hour
+        monitor.observe("noisy", 40 + rng.uniform(-2, 2))
+        monitor.observe("drift", 40 + i * 0.001)                          # +0.06%/hour
+
+    leaky = monitor.report("leaky")
+    assert leaky.leaking
+    assert abs(leaky.slope_per_hour - 3.0) < 0.5
+    assert leaky.confidence > 0.99
+    # ~50% now, ~35 points to go at ~3%/hour
+    assert 10 * 3600 < leaky.seconds_to_threshold < 14 * 3600
+    assert not monitor.report("noisy").leaking
+    assert not monitor.report("drift").leaking
+    assert [r.process for r in monitor.leaks()] == ["leaky"]
+
+    # Sliding-window Mann-Kendall S matches a full recomputation
+    trend = MemoryTrend(window=10, interval_seconds=1)
+    values = [rng.uniform(0, 100) for _ in range(35)]
+    for v in values:
+        trend.add(v)
+    window = values[-10:]
+    expected = sum((b > a) - (b < a) for i, a in enumerate(window) for b in window[i + 1:])
+    assert trend.mann_kendall_s == expected
+
+
+def test_span_tree_critical_path_and_error_origin():
+    """Test out-of-order tree building, critical path, self time and error origins."""
+    from tools.analysis.span_tree import SpanTreeBuilder, analyze_span_trees
+
+    def span(span_id, parent_id, operation, start_ms, duration_ms, error_type=None):
+        return {"trace_id": "t1", "span_id": span_id, "parent_id": parent_id, "operation": operation,
+                "timestamp": 1700000000 + start_ms / 1000, "duration_ms": duration_ms,
+                "error_type": error_type}
+
+    traces = [
+        span("c", "root", "retrieve", 25, 35),
+        span("b", "root", "llm_call", 20, 70, error_type="timeout"),
+        span("b1", "b", "http", 30, 50, error_type="timeout"),
+        span("a", "root", "plan", 0, 30),
+        span("root", None, "workflow", 0, 100, error_type="timeout"),
+    ]
+    tree = next(SpanTreeBuilder().extend(traces).trees())
+
+    assert [s.span_id for s in tree.roots] == ["root"]
+    path = {s.operation: round(ms, 3) for s, ms in tree.critical_path()}
+    assert path == {"workflow": 10.0, "plan": 20.0, "llm_call": 20.0, "http": 50.0}
+    assert abs(sum(path.values()) - tree.duration_ms) < 1e-3
+    root = tree.roots[0]
+    assert round(tree.self_time_ms(root), 3) == 10.0
+    assert [s.span_id for s in tree.error_root_causes()] == ["b1"]
+
+    summary = analyze_span_trees(traces)
+    assert summary["failed_traces"] == 1
+    assert summary["operations"][0]["operation"] == "http"
+    assert summary["operations"][0]["root_cause_errors"] == 1
+
+
+def test_span_tree_deep_chain_without_recursion():
+    """Test that a very deep span chain does not hit the recursion limit."""
+    import sys
+    from tools.analysis.span_tree import analyze_span_trees
+
+    depth = sys.getrecursionlimit() * 3
+    traces = [{"trace_id": "deep", "span_id": i, "parent_id": i - 1 if i else None,
+               "operation": f"step_{i % 20}", "timestamp": 0, "duration_ms": depth - i}
+              for i in reversed(range(depth))]
+    summary = analyze_span_trees(traces, top=20)
+    assert sum(op["spans"] for op in summary["operations"]) == depth
+
+
+def test_parallel_sharded_analysis_matches_sequential(tmp_path):
+    """Test byte-range sharding merges to the sequential result."""
+    import json
+    from tools.analysis.ingestion import StreamingTraceAnalyzer, iter_traces
+    from tools.analysis.parallel import ParallelTraceAnalyzer, plan_file_shards
+
+    path = tmp_path / "traces.jsonl"
+    with open(path, "w") as handle:
+        for i in range(500):
+            handle.write(json.dumps({
+                "trace_id": f"t{i // 5}", "operation": f"op_{i % 7}", "duration_ms": i,
+                "error_type": "timeout" if i % 4 == 0 else None,
+                "status_code": 429 if i % 50 == 0 else 200,
+                "timestamp": f"2025-11-17T10:{i // 60:02d}:{i % 60:02d}Z",
+            }) + "\n")
+
+    shards = plan_file_shards(str(path), target_shards=8, min_shard_bytes=1000)
+    assert len(shards) == 8
+    sequential = StreamingTraceAnalyzer().consume(iter_traces(str(path))).patterns()
+
+    analyzer = ParallelTraceAnalyzer(workers=2, min_shard_bytes=1000)
+    summary = analyzer.summary(analyzer.analyze(str(path)))
+    assert summary["traces_analyzed"] == 500
+    assert dict(summary["top_operations"])["op_6"] == 71
+    assert summary["error_types"] == {"timeout": 125}
+    assert abs(summary["duration_ms"]["p50"] - 249.5) < 249.5 * 0.02
+    merged = {p["pattern_name"]: p for p in summary["patterns_detected"]}
+    for pattern in sequential:
+        assert merged[pattern["pattern_name"]]["frequency"] == pattern["frequency"]
+        assert merged[pattern["pattern_name"]]["first_occurrence"] == pattern["first_occurrence"]
+        assert merged[pattern["pattern_name"]]["last_occurrence"] == pattern["last_occurrence"]
+
+
+def test_tail_sampler_keeps_errors_and_weights_reservoir():
+    """Test tail sampling keeps every error and weighted counts stay unbiased."""
+    import random
+    from tools.analysis.detector_engine import DetectorEngine
+    from tools.analysis.pattern_detection import DEFAULT_DETECTORS
+    from tools.analysis.sampling import TailSampler, weighted_spans
+
+    rng = random.Random(3)
+    spans = []
+    for i in range(2000):
+        failed = i % 20 == 0
+        spans.append({"trace_id": i, "span_id": "child", "parent_id": "root", "operation": "api_call",
+                      "duration_ms": rng.uniform(50, 100), "error_type": "timeout" if failed else None})
+        spans.append({"trace_id": i, "span_id": "root", "parent_id": None, "operation": "workflow",
+                      "duration_ms": rng.uniform(100, 200)})
+
+    sampler = TailSampler(reservoir_size=50, rng=rng)
+    kept = sampler.extend(spans, now=0.0) + sampler.flush()
+
+    assert sum(1 for t in kept if t.reason == "error") == 100
+    assert sampler.stats["kept_reservoir"] == 50
+    assert len(kept) < 2000 * 0.1
+
+    engine = DetectorEngine(DEFAULT_DETECTORS, weight_field="sample_weight")
+    engine.update(list(weighted_spans(kept)))
+    assert round(engine.total) == len(spans)
+    assert engine.stats("timeout_cascade").frequency == 100
+    assert engine.records < len(spans) * 0.1
+
+
+def test_tail_sampler_timeout_and_memory_bound():
+    """Test pending traces time out and the span buffer stays bounded."""
+    from tools.analysis.sampling import TailSampler
+
+    sampler = TailSampler(decision_wait_seconds=10, max_buffered_spans=5)
+    sampler.add({"trace_id": "slowpoke", "parent_id": "missing", "status_code": 429}, now=0)
+    assert sampler.expire(now=5) == []
+    kept = sampler.expire(now=11)
+    assert [(t.trace_id, t.reason) for t in kept] == [("slowpoke", "rate_limited")]
+
+    for trace_id, status_code in [("text_ok", "OK"), ("text_5xx", "5xx"), ("text_503", "503")]:
+        sampler.add({"trace_id": trace_id, "parent_id": "missing", "status_code": status_code}, now=12)
+    assert [(t.trace_id, t.reason) for t in sampler.expire(now=23)] == [("text_503", "error")]
+
+    for i in range(20):
+        sampler.add({"trace_id": f"t{i}", "parent_id": "missing"}, now=20)
+        assert sampler.buffered_spans <= 5
+    assert sampler.stats["decided_early"] == 15
+
+
+def test_tail_sampler_bounds_memory_across_many_operations():
+    """Test reservoir spans count toward the span bound and latency profiles are capped."""
+    from tools.analysis.sampling import TailSampler
+
+    sampler = TailSampler(max_buffered_spans=50, reservoir_size=10, max_operations=20)
+    kept = []
+    for i in range(1000):
+        kept += sampler.add({"trace_id": i, "parent_id": None, "operation": f"op_{i}", "duration_ms": 10}, now=0)
+        assert sampler.buffered_spans + sampler.reservoir_spans <= 50
+    kept += sampler.flush()
+    assert len(sampler._latency) == 20
+    assert sampler.stats["windows_closed_early"] > 0
+    assert len(kept) == 1000 and all(t.weight == 1.0 for t in kept)
+
+
+def test_template_miner_groups_messages_by_template():
+    """Test error messages differing only in variables share one template."""
+    from tools.analysis.templates import TemplateMiner
+
+    miner = TemplateMiner()
+    first = miner.add("Timeout after 3000 ms calling payments-api", "2025-11-17T10:00:00Z", "api_call_1")
+    second = miner.add("Timeout after 4500 ms calling payments-api", "2025-11-17T11:00:00Z", "api_call_2")
+    third = miner.add("Timeout after 4500 ms calling ledger-api", "2025-11-17T12:00:00Z", "api_call_1")
+    other = miner.add("Connection refused by 10.0.0.12:5432", "2025-11-17T12:30:00Z", "db_query")
+
+    assert first.is_new and not second.is_new and not third.is_new
+    assert first.template_id == second.template_id == third.template_id != other.template_id
+    assert third.template == "Timeout after <*> ms calling <*>"
+    assert third.parameters == ["4500", "ledger-api"]
+
+    top = miner.top(1)[0]
+    assert top["frequency"] == 3
+    assert top["first_occurrence"] == "2025-11-17T10:00:00Z"
+    assert top["last_occurrence"] == "2025-11-17T12:00:00Z"
+    assert top["affected_operations"] == ["api_call_1", "api_call_2"]
+
+    miner.add("Timeout after 4500 ms calling ledger-api")
+    assert miner.cache_hits == 2  # the second message and this exact repeat
+
+
+def test_streaming_analyzer_mines_error_templates():
+    """Test the streaming analyzer reports error templates of failed traces."""
+    from tools.analysis.ingestion import StreamingTraceAnalyzer
+
+    traces = [{"operation": "checkout", "error_type": "error", "timestamp": f"t{i}",
+               "error_message": f"order {1000 + i} rejected: stock 0x{i:012x} missing"} for i in range(50)]
+    traces += [{"operation": "checkout", "error_type": None, "error_message": None}] * 50
+    analyzer = StreamingTraceAnalyzer(batch_size=16, mine_templates=True).consume(traces)
+
+    templates = analyzer.error_templates()
+    assert len(templates) == 1
+    assert templates[0]["template"] == "order <*> rejected: stock <*> missing"
+    assert templates[0]["frequency"] == 50
+    assert StreamingTraceAnalyzer().error_templates() == []
+
+
+def test_baseline_store_statistics_and_persistence(tmp_path):
+    """Test baselines learn incrementally and survive a save/load round trip."""
+    import statistics
+    from tools.analysis.baselines import BaselineStore
+
+    values = [200 + (i * 37) % 100 for i in range(500)]
+    path = tmp_path / "baselines.json"
+    store = BaselineStore(str(path), min_samples=30)
+    for value in values[:10]:
+        store.observe("chat", "response_time_ms", value)
+    assert store.score("chat", "response_time_ms", 1000) is None
+    for value in values[10:]:
+        store.observe("chat", "response_time_ms", value)
+
+    baseline = store.get("chat", "response_time_ms")
+    assert abs(baseline.mean - statistics.mean(values)) < 1e-9
+    assert abs(baseline.std_dev - statistics.stdev(values)) < 1e-9
+    store.save()
+    assert [p.name for p in tmp_path.iterdir()] == ["baselines.json"]
+
+    reloaded = BaselineStore.load(str(path))
+    restored = reloaded.get("chat", "response_time_ms")
+    assert restored.count == 500 and restored.m2 == baseline.m2
+    assert reloaded.score("chat", "response_time_ms", 1000) == store.score("chat", "response_time_ms", 1000)
+    assert reloaded.summary("chat")["response_time_ms"]["p95"] == baseline.summary()["p95"]
+    assert len(BaselineStore.load(str(tmp_path / "missing.json"))) == 0
+
+
+def test_baseline_store_saves_only_when_due_and_dirty(tmp_path):
+    """Test scoring-path saves are batched by interval and skipped when nothing changed."""
+    from tools.analysis.baselines import BaselineStore
+
+    now = [0.0]
+    path = tmp_path / "baselines.json"
+    store = BaselineStore(str(path), clock=lambda: now[0])
+    store.observe("chat", "response_time_ms", 300)
+    assert not store.save_if_due(60) and not path.exists()
+
+    now[0] = 61
+    assert store.save_if_due(60) and not store.dirty
+    assert not store.save_if_due(60)  # nothing new
+    store.observe("chat", "response_time_ms", 310)
+    now[0] = 90
+    assert not store.save_if_due(60)
+    assert store.save_if_due(0)  # shutdown flush
+    assert BaselineStore.load(str(path)).get("chat", "response_time_ms").count == 2
+
+
+def test_batched_anomaly_scores_match_scalar():
+    """Test batched scoring agrees with the scalar score, zero std_dev included."""
+    import numpy as np
+    from tools.analysis.pattern_detection import (
+        SEVERITIES, calculate_anomaly_scores, classify_anomaly_scores, top_anomalies
+    )
+
+    current = np.array([[1850.0, 8.5, 89.2], [300.0, 0.4, 40.0]])
+    means = np.array([[287.0, 0.37, 42.3], [287.0, 0.37, 42.3]])
+    std_devs = np.array([[52.0, 0.15, 8.2], [52.0, 0.0, 8.2]])
+    scores = calculate_anomaly_scores(current, means, std_devs)
+
+    for (row, column), score in np.ndenumerate(scores):
+        assert score == calculate_anomaly_score(current[row, column], means[row, column], std_devs[row, column])
+    assert scores[1, 1] == 0.0
+    assert SEVERITIES[classify_anomaly_scores(scores)].tolist()[0] == ["critical", "critical", "high"]
+
+    top = top_anomalies(scores, k=2, agents=["chat", "search"], metrics=["latency", "errors", "cpu"])
+    assert [(a["agent"], a["metric"], a["severity"]) for a in top] == [
+        ("chat", "errors", "critical"), ("chat", "latency", "critical")
+    ]
+
+
+def test_seasonal_baselines_score_against_matching_hour(tmp_path):
+    """Test Monday-morning load is scored against Monday-morning history."""
+    from datetime import datetime, timedelta, timezone
+    from tools.analysis.seasonal import SeasonalBaselines
+
+    seasonal = SeasonalBaselines()
+    monday_9am = datetime(2025, 11, 17, 9, tzinfo=timezone.utc)
+    assert seasonal.bucket(monday_9am) == 9
+    assert seasonal.bucket("2025-11-23T23:30:00Z") == 167
+    for week in range(8):
+        for hour in range(168):
+            at = monday_9am - timedelta(weeks=week + 1, hours=9) + timedelta(hours=hour)
+            busy = at.weekday() == 0 and 8 <= at.hour < 12
+            seasonal.observe("chat", "response_time_ms", (900 if busy else 300) + week, at)
+
+    assert seasonal.score("chat", "response_time_ms", 905, monday_9am) < 3
+    assert seasonal.score("chat", "response_time_ms", 905, monday_9am + timedelta(days=1)) > 3
+    assert seasonal.score("chat", "cpu_utilization", 50, monday_9am) is None
+    assert seasonal.stats.nbytes == len(seasonal.stats) * seasonal.bytes_per_series
+
+    row = seasonal.series_id("chat", "response_time_ms")
+    batch = seasonal.score_batch([row, row], [monday_9am.timestamp()] * 2, [905, 3000])
+    assert batch[0] == seasonal.score("chat", "response_time_ms", 905, monday_9am)
+    assert batch[1] > 100
+
+    path = tmp_path / "seasonal.npz"
+    seasonal.save(str(path))
+    reloaded = SeasonalBaselines.load(str(path))
+    assert reloaded.baseline("chat", "response_time_ms", monday_9am) == seasonal.baseline("chat", "response_time_ms", monday_9am)
+    assert not seasonal.dirty and not seasonal.save_if_due(str(path), 0)
+    seasonal.observe("chat", "response_time_ms", 310, monday_9am)
+    assert not seasonal.save_if_due(str(path), 3600) and seasonal.save_if_due(str(path), 0)
+
+
+def test_multivariate_detector_flags_unusual_combinations():
+    """Test correlated-metric combinations are flagged when each metric alone looks normal."""
+    import numpy as np
+    from tools.analysis.multivariate import MultivariateDetector
+
+    rng = np.random.default_rng(0)
+    mean = np.array([287.0, 42.0])
+    cov = np.array([[2500.0, 300.0], [300.0, 60.0]])  # latency and CPU rise together
+    detector = MultivariateDetector(["response_time_ms", "cpu_utilization"], min_samples=30)
+    agents = ["chat", "search"]
+    for sample in rng.multivariate_normal(mean, cov, size=(400, 2)):
+        detector.observe(agents, sample)
+
+    assert np.isnan(MultivariateDetector(["a", "b"]).score(["new"], [[1.0, 2.0]])[0])
+    # Both points are within ~1.4 sigma on each metric alone
+    together, apart = detector.score(["chat", "chat"], [[357.0, 49.0], [357.0, 33.0]])
+    assert together < detector.threshold < apart
+
+    flagged = detector.anomalies(["chat", "search"], [[357.0, 33.0], [290.0, 42.0]], learn=False)
+    assert [a["agent"] for a in flagged] == ["chat"]
+    assert abs(sum(flagged[0]["contributions"].values()) - 1) < 0.01
+
+    # One extreme outlier barely moves the robust estimate
+    before = detector.means[detector.agent_index("chat")].copy()
+    detector.update(["chat"], [[50_000.0, 99.0]])
+    assert abs(detector.means[detector.agent_index("chat")][0] - before[0]) < 10
+
+
+def test_change_point_detectors_report_persistent_shifts():
+    """Test CUSUM, Page-Hinkley and BOCPD report a level shift once, ignoring a lone spike."""
+    import random
+    from tools.analysis.change_point import BayesianChangePoint, ChangePointMonitor, Cusum, PageHinkley
+
+    rng = random.Random(4)
+    series = [rng.gauss(0.4, 0.1) for _ in range(300)] + [rng.gauss(1.5, 0.1) for _ in range(200)]
+    series[100] = 3.0  # a single spike is not a shift
+
+    for detector in (Cusum(), PageHinkley(), BayesianChangePoint()):
+        changes = [c for c in (detector.update(v, i) for i, v in enumerate(series)) if c]
+        assert len(changes) == 1, detector.name
+        change = changes[0]
+        assert change.direction == "increase"
+        assert 295 <= change.started_at <= 300 < change.detected_at <= 310
+        assert change.magnitude > 0.5
+
+    monitor = ChangePointMonitor(lambda: Cusum(mean=0.4, std_dev=0.1))
+    for i, value in enumerate([0.4] * 20 + [0.1] * 20):
+        monitor.observe("chat", "error_rate_percent", value, f"t{i}")
+    shifts = monitor.changes("chat")
+    assert [(s["metric"], s["direction"], s["started_at"]) for s in shifts] == [("error_rate_percent", "decrease", "t20")]
+
+    # A constant warm-up window must not make float-level jitter look like a shift
+    for detector in (Cusum(), PageHinkley()):
+        jitter = [detector.update(500.0) for _ in range(30)] + [detector.update(500.0 + 1e-6 * (i % 3)) for i in range(200)]
+        assert not any(jitter) and detector.reference.std_dev == 5.0, detector.name
+
+
+def test_holt_forecaster_time_to_threshold():
+    """Test batched Holt forecasts project threshold crossings with an interval."""
+    import numpy as np
+    from tools.analysis.forecasting import HoltForecaster
+
+    forecaster = HoltForecaster(interval_seconds=60)
+    rng = np.random.default_rng(2)
+    rising, flat, hot = (forecaster.series_id("chat", m) for m in ("error_rate", "cpu", "memory"))
+    for step in range(40):
+        forecaster.update([rising, flat, hot], [0.4 + 0.1 * step + rng.normal(0, 0.05), 40 + rng.normal(0, 1), 90])
+
+    # Error rate reaches ~4.3 at step 39 and climbs 0.1/min, so 5.0 is ~7 minutes away
+    crossing = forecaster.time_to_threshold([rising, flat, hot], [5.0, 80.0, 85.0])
+    assert 5 * 60 <= crossing["expected"][0] <= 9 * 60
+    assert crossing["earliest"][0] <= crossing["expected"][0] <= crossing["latest"][0]
+    assert np.isnan(crossing["expected"][1])
+    assert crossing["expected"][2] == 0.0
+
+    mean, lower, upper = forecaster.forecast([rising], np.arange(1, 11)[None, :])
+    assert mean.shape == (1, 10) and np.all(np.diff(upper - lower) > 0)
+    assert np.isnan(forecaster.time_to_threshold([forecaster.observe("new", "cpu", 10.0)], 80.0)["expected"][0])
+    assert np.isnan(forecaster.time_to_threshold([forecaster.observe("new", "memory", 95.0)], 80.0)["expected"][0])
+
+    # Irregular sampling (ad hoc calls): the trend is per second, not per call
+    irregular = HoltForecaster(interval_seconds=60)
+    t = 0.0
+    for _ in range(40):
+        t += rng.uniform(5, 300)
+        row = irregular.observe("chat", "error_rate", 1.0 + 0.002 * t, t)
+    crossing = irregular.time_to_threshold([row], [1.0 + 0.002 * (t + 600)])
+    assert 450 <= crossing["expected"][0] <= 800
+
+
+def test_prefilter_gates_normal_agents_and_counts_calls(monkeypatch):
+    """Test only agents with anomalous scores reach the LLM agent."""
+    import asyncio
+    import random
+    from tools.analysis.baselines import BaselineStore
+    from tools.analysis.prefilter import AnomalyPrefilter
+
+    rng = random.Random(8)
+    store = BaselineStore(min_samples=30)
+    for agent in ("chat", "search", "billing"):
+        for _ in range(100):
+            store.observe(agent, "response_time_ms", rng.gauss(300, 30))
+    prefilter = AnomalyPrefilter(store, threshold=4.0)
+
+    decisions = prefilter.evaluate_fleet({
+        "chat": {"response_time_ms": 310},
+        "search": {"response_time_ms": 900},
+        "billing": {"response_time_ms": 295},
+        "new_agent": {"response_time_ms": 50, "error_rate_percent": 12.0},
+    })
+    assert [d.escalate for d in decisions] == [False, True, False, True]
+    assert decisions[3].scores == {"response_time_ms": None, "error_rate_percent": None}
+    assert prefilter.stats() == {"evaluated": 4, "gated": 2, "escalated": 2, "gate_rate": 0.5}
+    assert store.get("chat", "response_time_ms").count == 101
+    assert store.get("search", "response_time_ms").count == 100  # escalated samples are not learned
+
+    from agents import anomaly_detector as module
+    calls = []
+
+    async def fake_run(agent, message, session_id):
+        calls.append(message)
+        return [{"type": "text", "text": "explained"}]
+
+    monkeypatch.setattr(module, "prefilter", AnomalyPrefilter(store, threshold=4.0))
+    quiet = asyncio.run(module.detect_anomalies_gated("chat", {"response_time_ms": 305}, run=fake_run))
+    loud = asyncio.run(module.detect_anomalies_gated("chat", {"response_time_ms": 2000}, run=fake_run))
+    assert quiet["status"] == "no_anomaly" and loud["analysis_type"] == "llm_anomaly_detection"
+    assert len(calls) == 1 and "response_time_ms" in calls[0]
+
+
+def test_baselines_follow_confirmed_level_shift(monkeypatch):
+    """Test a permanent level shift is re-learned instead of being flagged forever."""
+    import json
+    import random
+    from datetime import datetime, timedelta, timezone
+    from agents import anomaly_detector as module
+    from tools.analysis.baselines import BaselineStore
+    from tools.analysis.change_point import ChangePointMonitor
+    from tools.analysis.forecasting import HoltForecaster
+    from tools.analysis.prefilter import AnomalyPrefilter
+    from tools.analysis.seasonal import SeasonalBaselines
+
+    rng = random.Random(5)
+    series = [rng.gauss(300, 20) for _ in range(40)] + [rng.gauss(900, 20) for _ in range(40)]
+
+    prefilter = AnomalyPrefilter(BaselineStore(min_samples=30), threshold=4.0)
+    escalated = [prefilter.evaluate("chat", {"response_time_ms": v}).escalate for v in series]
+    assert any(escalated[40:]) and not any(escalated[50:])
+    assert abs(prefilter.store.get("chat", "response_time_ms").mean - 900) < 30
+
+    store = BaselineStore()
+    monkeypatch.setattr(module, "baseline_store", store)
+    monkeypatch.setattr(module, "seasonal_baselines", SeasonalBaselines())
+    monkeypatch.setattr(module, "forecaster", HoltForecaster())
+    monkeypatch.setattr(module, "change_monitor", ChangePointMonitor())
+    start = datetime(2025, 11, 17, 10, tzinfo=timezone.utc)
+    results = [
+        json.loads(module.analyze_anomalies("chat", json.dumps({"response_time_ms": v}),
+                                            (start + timedelta(minutes=i)).isoformat()))
+        for i, v in enumerate(series)
+    ]
+    assert results[40]["anomalies"] and not any(r["anomalies"] for r in results[50:])
+    assert [s["metric"] for r in results for s in r["level_shifts"]] == ["response_time_ms"]
+    assert abs(store.get("chat", "response_time_ms").mean - 900) < 30
+
+
+def test_analyze_anomalies_never_learns_from_simulated_sample(monkeypatch):
+    """Test the fallback sample is scored without touching learned state, and bad input is an error result."""
+    import json
+    from agents import anomaly_detector as module
+    from tools.analysis.baselines import BaselineStore
+    from tools.analysis.change_point import ChangePointMonitor
+    from tools.analysis.forecasting import HoltForecaster
+    from tools.analysis.seasonal import SeasonalBaselines
+
+    store, seasonal, forecaster = BaselineStore(), SeasonalBaselines(), HoltForecaster()
+    monkeypatch.setattr(module, "baseline_store", store)
+    monkeypatch.setattr(module, "seasonal_baselines", seasonal)
+    monkeypatch.setattr(module, "forecaster", forecaster)
+    monkeypatch.setattr(module, "change_monitor", ChangePointMonitor())
+
+    simulated = json.loads(module.analyze_anomalies("demo_agent"))
+    assert simulated["simulated_observations"] and simulated["anomalies"]
+    assert simulated["memory_learning"]["patterns_updated"] == 0
+    assert store.get("demo_agent", "response_time_ms").count == 30  # only the seeded prior
+    assert len(forecaster) == 0 and seasonal.series_id("demo_agent", "response_time_ms", create=False) is None
+
+    real = json.loads(module.analyze_anomalies("demo_agent", '{"response_time_ms": 290}'))
+    assert not real["simulated_observations"]
+    assert store.get("demo_agent", "response_time_ms").count == 31
+
+    for bad in ("{not json", "[1, 2]", '{"response_time_ms": "fast"}'):
+        result = json.loads(module.analyze_anomalies("demo_agent", bad))
+        assert result["status"] == "error" and "Invalid observations" in result["error"]
@@ -53,3 +53,92 @@ class TestAnomalyDetector:
         from agents.anomaly_detector import anomaly_detector_agent
         assert anomaly_detector_agent is not None
         assert anomaly_detector_agent.name == "anomaly_detector"
+
+
+class TestMcpServing:
+    """Test MCP JSON-RPC serving over a local socket and stdio."""
+
+    def test_socket_serving_with_pipelined_calls(self):
+        """Test many outstanding requests on one connection are answered and matched by id."""
+        import asyncio
+        import os
+        import tempfile
+        from mcp_servers.deployment_registry import DeploymentRegistry
+        from mcp_servers.deployment_server import DeploymentServer
+        from mcp_servers.transport import METHOD_NOT_FOUND, McpClient, McpError
+
+        server = DeploymentServer(DeploymentRegistry())
+        path = os.path.join(tempfile.mkdtemp(), "deploy.sock")
+
+        async def scenario():
+            await server.start(path)
+            client = await McpClient.connect_socket(path)
+            info = await client.initialize()
+            tools = await client.request("tools/list")
+            results = await asyncio.gather(*(
+                client.call_tool("deploy_agent", {"agent_name": f"agent_{i}", "version": f"v{i}"}) for i in range(50)
+            ))
+            try:
+                await client.request("resources/list")
+                missing = None
+            except McpError as e:
+                missing = e.code
+            await client.close()
+            await server.stop()
+            return info, tools, results, missing
+
+        info, tools, results, missing = asyncio.run(scenario())
+        assert info["serverInfo"]["name"] == "deployment_server"
+        assert {t["name"] for t in tools["tools"]} == {"deploy_agent", "rollback_agent", "record_health"}
+        assert [r["version"] for r in results] == [f"v{i}" for i in range(50)]
+        assert server.registry.current("agent_7") == "v7"
+        assert missing == METHOD_NOT_FOUND
+
+    def test_in_flight_limit_bounds_concurrent_dispatch(self):
+        """Test the server never runs more than max_in_flight requests at once."""
+        import asyncio
+        import os
+        import tempfile
+        from mcp_servers.transport import McpClient, McpServer, McpTool
+
+        async def slow(delay: float) -> dict:
+            """Sleep, then answer."""
+            await asyncio.sleep(delay)
+            return {"slept": delay}
+
+        server = McpServer("slow", "0.1.0", [McpTool.from_function(slow)], max_in_flight=4)
+        path = os.path.join(tempfile.mkdtemp(), "slow.sock")
+
+        async def scenario():
+            await server.serve_socket(path)
+            client = await McpClient.connect_socket(path)
+            started = asyncio.get_running_loop().time()
+            results = await asyncio.gather(*(client.call_tool("slow", {"delay": 0.05}) for _ in range(20)))
+            elapsed = asyncio.get_running_loop().time() - started
+            await client.close()
+            await server.close()
+            return results, elapsed
+
+        results, elapsed = asyncio.run(scenario())
+        assert len(results) == 20
+        assert server.stats["peak_in_flight"] == 4
+        assert elapsed >= 0.25  # 20 requests, 4 at a time, 50ms each
+
+    def test_stdio_serving(self):
+        """Test a server subprocess speaks MCP on stdin/stdout."""
+        import asyncio
+        import os
+        import sys
+        from mcp_servers.transport import McpClient
+
+        async def scenario():
+            repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            client = await McpClient.spawn(sys.executable, "-m", "mcp_servers.notification_server", cwd=repo_root)
+            await client.initialize()
+            sent = await client.call_tool("send_notification", {
+                "channel": "slack", "title": "Recovery", "message": "chat recovered"
+            })
+            await client.close()
+            return sent
+
+        assert asyncio.run(scenario()) is True
@@ -35,3 +35,79 @@ def test_aggregate_health_checks():
     assert aggregate_health_checks(["healthy", "warning"]) == "warning"
     assert aggregate_health_checks(["healthy", "critical"]) == "critical"
     assert aggregate_health_checks(["warning", "critical"]) == "critical"
+
+
+def test_detector_span_processor_feeds_detectors():
+    """Test spans ended in-process reach the detectors and metrics."""
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.trace import Status, StatusCode
+    from tools.monitoring.otel_processor import DetectorSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "ChatAgent"}))
+    processor = DetectorSpanProcessor(flush_interval_seconds=60, batch_size=4)
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer("test")
+
+    with tracer.start_as_current_span("workflow"):
+        for _ in range(3):
+            with tracer.start_as_current_span("api_call") as span:
+                span.set_attribute("http.status_code", 429)
+        with tracer.start_as_current_span("llm_call") as span:
+            span.set_status(Status(StatusCode.ERROR, "deadline"))
+            span.set_attribute("error.type", "timeout")
+
+    batches = []
+    processor.on_batch = batches.append
+    processor.force_flush()
+    provider.shutdown()
+
+    assert processor.analyzer.traces_analyzed == 5
+    patterns = {p["pattern_name"]: p for p in processor.analyzer.patterns()}
+    assert patterns["external_api_rate_limit"]["frequency"] == 3
+    assert patterns["timeout_cascade"]["affected_operations"] == ["llm_call"]
+    assert processor.metrics.get_stats("otel.spans")["count"] == 2
+    spans = [t for batch in batches for t in batch]
+    assert {t["agent"] for t in spans} == {"ChatAgent"}
+    root = next(t for t in spans if t["operation"] == "workflow")
+    assert all(t["parent_id"] == root["span_id"] for t in spans if t is not root)
+
+
+def test_detector_span_processor_survives_detector_errors():
+    """Test a failing batch is logged and skipped, and per-batch metrics stay bounded."""
+    from opentelemetry.sdk.trace import TracerProvider
+    from tools.analysis.ingestion import StreamingTraceAnalyzer
+    from tools.monitoring.otel_processor import DetectorSpanProcessor
+
+    class FlakyAnalyzer(StreamingTraceAnalyzer):
+        def update(self, traces):
+            if not getattr(self, "failed", False):
+                self.failed = True
+                raise ValueError("bad span")
+            super().update(traces)
+
+    provider = TracerProvider()
+    processor = DetectorSpanProcessor(FlakyAnalyzer(), flush_interval_seconds=0.01, batch_size=1, metrics_window=2)
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer("test")
+    for name in ("first", "second", "third"):
+        with tracer.start_as_current_span(name):
+            pass
+        processor.force_flush()
+    provider.shutdown()
+
+    assert processor.stats == {"spans": 3, "span_errors": 0, "batches": 3, "failed_batches": 1}
+    assert processor.analyzer.traces_analyzed == 2
+    assert processor.metrics.get_stats("otel.spans")["count"] == 2
+
+
+def test_span_ring_buffer_drops_oldest_when_full():
+    """Test the ring buffer bound and drop accounting."""
+    from tools.monitoring.otel_processor import SpanRingBuffer
+
+    buffer = SpanRingBuffer(capacity=3)
+    for i in range(5):
+        buffer.push(i)
+    assert buffer.dropped == 2
+    assert buffer.drain(10) == [2, 3, 4]
+    assert len(buffer) == 0
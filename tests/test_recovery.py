@@ -0,0 +1,549 @@
+"""Tests for recovery tools."""
+
+import asyncio
+import os
+import resource
+import time
+
+import numpy as np
+
+from config import config
+from mcp_servers.alert_grouping import Alert, AlertGrouper
+from mcp_servers.deployment_registry import DeploymentRegistry
+from mcp_servers.deployment_server import DeploymentServer
+from mcp_servers.notification_queue import ChannelLimit, NotificationQueue
+from mcp_servers.notification_server import NotificationServer
+from tools.recovery.checkpoint_store import CheckpointStore
+from tools.recovery.executor import PlanStep, RecoveryExecutor, build_recovery_dag
+from tools.recovery.incident_response import build_recovery_plan, notify_operations_team, restore_checkpoint
+from tools.recovery.ledger import RecoveryLedger, idempotency_key
+
+
+def _sleeper(seconds: float, log: list, name: str, outcome=True):
+    async def action():
+        log.append(name)
+        await asyncio.sleep(seconds)
+        return outcome
+    return action
+
+
+def test_build_recovery_dag_from_plan():
+    """Test plan actions become DAG steps with dependency edges."""
+    steps = build_recovery_dag(build_recovery_plan("critical"), "chat", "v2.2.5", "checkpoint-1")
+    edges = {step.name: step.depends_on for step in steps}
+    assert edges == {
+        "circuit_breaker": [],
+        "rollback": ["circuit_breaker"],
+        "restore": ["rollback"],
+        "notify": ["circuit_breaker"],
+        "escalate": ["circuit_breaker"],
+    }
+    assert {s.name: s.depends_on for s in build_recovery_dag(["rollback", "notify"], "chat", "v1", "c1")} == {
+        "rollback": [], "notify": []
+    }
+
+
+def test_recovery_executor_runs_independent_steps_concurrently():
+    """Test wall time tracks the critical path, not the sum of steps."""
+    log = []
+    steps = [
+        PlanStep("circuit_breaker", _sleeper(0.02, log, "circuit_breaker")),
+        PlanStep("rollback", _sleeper(0.15, log, "rollback"), ["circuit_breaker"]),
+        PlanStep("restore", _sleeper(0.05, log, "restore"), ["rollback"]),
+        PlanStep("notify", _sleeper(0.15, log, "notify"), ["circuit_breaker"]),
+        PlanStep("escalate", _sleeper(0.15, log, "escalate"), ["circuit_breaker"]),
+    ]
+    report = asyncio.run(RecoveryExecutor().run(steps))
+
+    assert report.successful
+    assert log[0] == "circuit_breaker" and log[-1] == "restore"
+    assert report.sum_of_steps_ms > 500
+    assert 200 <= report.critical_path_ms <= report.total_ms < 400
+    rollback, notify = report.steps[1], report.steps[3]
+    assert abs(rollback.started_at_ms - notify.started_at_ms) < 20
+
+
+def test_recovery_executor_retries_timeouts_and_skips_dependents():
+    """Test timeouts are retried up to the attempt limit and dependents are skipped."""
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        return len(attempts) >= 2
+
+    steps = [
+        PlanStep("circuit_breaker", flaky),
+        PlanStep("rollback", _sleeper(1.0, [], "rollback"), ["circuit_breaker"], timeout_seconds=0.02),
+        PlanStep("restore", _sleeper(0, [], "restore"), ["rollback"]),
+        PlanStep("notify", _sleeper(0, [], "notify", outcome=False), ["circuit_breaker"]),
+    ]
+    report = asyncio.run(RecoveryExecutor(max_attempts=3, retry_backoff_seconds=0).run(steps))
+    results = {step.name: step for step in report.steps}
+
+    assert (results["circuit_breaker"].status, results["circuit_breaker"].attempts) == ("completed", 2)
+    assert (results["rollback"].status, results["rollback"].attempts) == ("timed_out", 3)
+    assert results["restore"].status == "skipped"
+    assert (results["notify"].status, results["notify"].attempts) == ("failed", 3)
+    assert not report.successful
+
+
+def test_token_bucket_limits_rate():
+    """Test the token bucket allows a burst, then refills at the configured rate."""
+    from utils import TokenBucket
+
+    now = [0.0]
+    bucket = TokenBucket(rate_per_second=2.0, capacity=3, clock=lambda: now[0])
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.time_until_available() == 0.5
+    now[0] = 0.5
+    assert bucket.try_acquire() and not bucket.try_acquire()
+
+
+def test_fleet_recovery_prioritizes_severity_and_rate_limits():
+    """Test critical agents go first and each platform respects its token bucket."""
+    from tools.recovery.fleet import FleetRecoveryCoordinator, RecoveryTarget
+
+    calls = []
+
+    async def recover(target):
+        calls.append((target.agent_name, target.platform))
+        await asyncio.sleep(0)
+        return {"status": "success"}
+
+    targets = [RecoveryTarget(f"low_{i}", "low", "gke") for i in range(3)]
+    targets += [RecoveryTarget(f"crit_{i}", "critical", "cloud_run") for i in range(3)]
+    coordinator = FleetRecoveryCoordinator(recover, workers=1, rate_per_second={"cloud_run": 20.0, "gke": 1000.0}, burst=1)
+    report = asyncio.run(coordinator.run(targets))
+
+    assert [name for name, _ in calls[:3]] == ["crit_0", "crit_1", "crit_2"]
+    assert report.count("recovered") == 6 and not report.halted
+    assert report.elapsed_seconds >= 2 / 20  # two refills of the cloud_run bucket
+
+
+def test_fleet_recovery_halts_wave_on_failure_rate():
+    """Test the wave stops once most recoveries are failing."""
+    from tools.recovery.fleet import FleetRecoveryCoordinator, RecoveryTarget
+
+    attempted = []
+
+    async def recover(target):
+        attempted.append(target.agent_name)
+        raise ConnectionError("deployment backend unavailable")
+
+    targets = [RecoveryTarget(f"agent_{i}") for i in range(50)]
+    coordinator = FleetRecoveryCoordinator(recover, workers=2, rate_per_second=1000.0, burst=10,
+                                           failure_rate_threshold=0.5, min_results=5)
+    report = asyncio.run(coordinator.run(targets))
+
+    assert report.halted and "failure rate" in report.halt_reason
+    assert 5 <= len(attempted) <= 7
+    assert report.count("halted") == 50 - len(attempted)
+    assert report.to_dict()["not_attempted"] == report.count("halted")
+
+
+def test_recovery_dag_keeps_ordering_when_an_action_is_dropped():
+    """Test a step whose dependency is not planned waits on that dependency's dependencies."""
+    steps = build_recovery_dag(["circuit_breaker", "restore", "notify"], "chat", "", "checkpoint-1")
+    assert {step.name: step.depends_on for step in steps} == {
+        "circuit_breaker": [], "restore": ["circuit_breaker"], "notify": ["circuit_breaker"]
+    }
+
+
+def test_recovery_ledger_deduplicates_concurrent_and_repeated_actions():
+    """Test duplicates attach to the running action and later ones hit the cache."""
+    now = [0.0]
+    ledger = RecoveryLedger(result_ttl_seconds=60, clock=lambda: now[0])
+    log = []
+
+    async def scenario():
+        factory = _sleeper(0.05, log, "rollback", outcome={"status": "success"})
+        concurrent = await asyncio.gather(*(ledger.run("chat", "rollback", "v2.2.5", factory) for _ in range(5)))
+        repeated = await ledger.run("chat", "rollback", "v2.2.5", factory)
+        other_target = await ledger.run("chat", "rollback", "v2.2.4", factory)
+        now[0] = 61
+        expired = await ledger.run("chat", "rollback", "v2.2.5", factory)
+        return concurrent, repeated, other_target, expired
+
+    concurrent, repeated, other_target, expired = asyncio.run(scenario())
+    assert sorted(r.source for r in concurrent) == ["attached"] * 4 + ["executed"]
+    assert all(r.value == {"status": "success"} for r in concurrent)
+    assert repeated.source == "cached"
+    assert other_target.source == "executed"
+    assert expired.source == "executed"
+    assert log == ["rollback"] * 3
+    assert ledger.stats == {"executed": 3, "attached": 4, "cached": 1, "failed": 0}
+
+
+def test_recovery_ledger_does_not_cache_failures():
+    """Test a failed action is shared by waiters but retried by the next request."""
+    ledger = RecoveryLedger()
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("deployment backend unavailable")
+        return True
+
+    async def scenario():
+        first = await asyncio.gather(*(ledger.run("chat", "restore", "c1", flaky) for _ in range(3)),
+                                     return_exceptions=True)
+        retry = await ledger.run("chat", "restore", "c1", flaky)
+        return first, retry
+
+    first, retry = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in first)
+    assert retry.source == "executed" and retry.value is True
+    assert len(calls) == 2
+    assert not ledger.in_flight(idempotency_key("chat", "restore", "c1"))
+
+
+def test_recovery_ledger_retries_actions_that_report_failure():
+    """Test an action returning False is not cached, so executor retries really run it again."""
+    ledger = RecoveryLedger()
+    calls = []
+
+    async def rollback():
+        calls.append(1)
+        return len(calls) == 3
+
+    async def scenario():
+        executor = RecoveryExecutor(max_attempts=3, retry_backoff_seconds=0)
+        steps = [PlanStep("rollback", lambda: _through_ledger(ledger, rollback))]
+        return await executor.run(steps)
+
+    report = asyncio.run(scenario())
+    assert report.successful
+    assert len(calls) == 3
+    assert ledger.stats == {"executed": 3, "attached": 0, "cached": 0, "failed": 2}
+    assert ledger.cached(idempotency_key("chat", "rollback", "v2.2.5")) is True
+
+
+async def _through_ledger(ledger: RecoveryLedger, factory):
+    return (await ledger.run("chat", "rollback", "v2.2.5", factory)).value
+
+
+def test_recovery_dag_routes_actions_through_ledger():
+    """Test two overlapping recoveries of one agent share the ledger."""
+    ledger = RecoveryLedger()
+
+    async def scenario():
+        executor = RecoveryExecutor()
+        plan = build_recovery_plan("high")
+        return await asyncio.gather(*(
+            executor.run(build_recovery_dag(plan, "chat", "v2.2.5", "c1", ledger=ledger)) for _ in range(2)
+        ))
+
+    reports = asyncio.run(scenario())
+    assert all(report.successful for report in reports)
+    assert ledger.stats["executed"] == 3  # circuit_breaker, rollback, restore
+    assert ledger.stats["attached"] + ledger.stats["cached"] == 3
+
+
+def test_checkpoint_store_writes_only_changed_chunks(tmp_path):
+    """Test incremental checkpoints dedupe unchanged content, including after an insertion."""
+    store = CheckpointStore(str(tmp_path), average_chunk_bytes=4096)
+    state = np.random.default_rng(7).integers(0, 256, 1 << 20, dtype=np.uint8).tobytes()
+
+    first = store.write("chat", "cp-1", state)
+    assert first.new_chunks == first.chunks and first.bytes_written == len(state)
+    assert store.write("chat", "cp-1-again", state).bytes_written == 0
+
+    edited = state[:300_000] + b"inserted conversation turn" + state[300_000:]
+    second = store.write("chat", "cp-2", edited)
+    assert 0 < second.bytes_written < 0.05 * len(edited)
+
+    assert store.restore("chat", "cp-1") == state
+    assert store.restore("chat", "cp-2") == edited
+    assert store.latest("chat") == "cp-2"
+    assert store.verify("chat", "cp-2")
+
+
+def test_checkpoint_store_restore_to_file_and_garbage_collection(tmp_path):
+    """Test file restores and that deleted checkpoints release only their own chunks."""
+    store = CheckpointStore(str(tmp_path / "store"), average_chunk_bytes=1024)
+    rng = np.random.default_rng(3)
+    shared = rng.integers(0, 256, 50_000, dtype=np.uint8).tobytes()
+    store.write("chat", "old", shared + rng.integers(0, 256, 20_000, dtype=np.uint8).tobytes())
+    store.write("chat", "new", shared)
+
+    destination = tmp_path / "state.bin"
+    assert store.restore_to("chat", "new", str(destination)) == len(shared)
+    assert destination.read_bytes() == shared
+
+    store.delete("chat", "old")
+    assert store.collect_garbage() > 0
+    assert store.restore("chat", "new") == shared
+    assert store.checkpoints("chat") == ["new"]
+    assert not store.verify("chat", "old")
+
+
+def test_checkpoint_store_restores_more_chunks_than_open_file_limit(tmp_path):
+    """Test restore and verify map one chunk at a time, so chunk count is not bounded by RLIMIT_NOFILE."""
+    store = CheckpointStore(str(tmp_path), average_chunk_bytes=256)
+    state = np.random.default_rng(11).integers(0, 256, 256 * 1024, dtype=np.uint8).tobytes()
+    assert store.write("chat", "big", state).chunks > 256
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (128, hard))
+    try:
+        assert store.restore("chat", "big") == state
+        assert store.verify("chat", "big")
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def test_restore_checkpoint_writes_agent_state(tmp_path, monkeypatch):
+    """Test restore writes the agent's state file, and only verifies when there is nowhere to write."""
+    monkeypatch.setattr(config.recovery, "checkpoint_dir", str(tmp_path / "store"))
+    CheckpointStore().write("chat", "c1", b"agent state")
+
+    assert asyncio.run(restore_checkpoint("chat", "c1"))
+    assert not (tmp_path / "state").exists()
+    assert not asyncio.run(restore_checkpoint("chat", "missing"))
+
+    monkeypatch.setattr(config.recovery, "restored_state_dir", str(tmp_path / "state"))
+    assert asyncio.run(restore_checkpoint("chat", "c1"))
+    assert (tmp_path / "state" / "chat.state").read_bytes() == b"agent state"
+    assert not asyncio.run(restore_checkpoint("chat", "missing"))
+
+
+def test_deployment_registry_tracks_last_known_good():
+    """Test health verdicts drive the last-known-good index."""
+    registry = DeploymentRegistry()
+    registry.record_deploy("chat", "v1")
+    registry.record_health("chat", "v1", True, 0.99)
+    registry.record_deploy("chat", "v2")
+    registry.record_health("chat", "v2", True, 0.98)
+    registry.record_deploy("chat", "v3")
+    assert registry.current("chat") == "v3"
+    assert registry.last_known_good("chat") == "v2"
+
+    registry.record_health("chat", "v3", False, 0.61)
+    registry.record_health("chat", "v2", False, 0.70)  # v2 degraded later too
+    assert registry.last_known_good("chat") == "v1"
+    assert registry.get("chat", "v3").reliability_score == 0.61
+    assert registry.last_known_good("unknown") is None
+
+
+def test_deployment_registry_reloads_from_snapshot_and_log_tail(tmp_path):
+    """Test startup replays only entries after the snapshot and tolerates a torn last line."""
+    path = str(tmp_path / "deployments.jsonl")
+    registry = DeploymentRegistry(path, snapshot_every=4)
+    for i in range(5):
+        registry.record_deploy("chat", f"v{i}")
+        registry.record_health("chat", f"v{i}", i != 4, 0.9)
+    with open(path, "a") as handle:
+        handle.write('{"event":"deploy","agent":"chat"')
+
+    loaded = DeploymentRegistry.load(path, snapshot_every=4)
+    assert loaded.current("chat") == "v4"
+    assert loaded.last_known_good("chat") == "v3"
+    assert loaded._appends_since_snapshot == 2  # 8 entries were covered by the snapshot
+
+    loaded.record_deploy("chat", "v5")
+    os.remove(path + ".snapshot")
+    assert DeploymentRegistry.load(path).current("chat") == "v5"
+
+
+def test_rollback_defaults_to_last_known_good():
+    """Test rollback without a target uses the registry."""
+    server = DeploymentServer(DeploymentRegistry())
+
+    async def scenario():
+        await server.deploy_agent("chat", "v1")
+        await server.record_health("chat", "v1", True, 0.99)
+        await server.deploy_agent("chat", "v2")
+        missing = await server.rollback_agent("search")
+        return await server.rollback_agent("chat"), missing
+
+    result, missing = asyncio.run(scenario())
+    assert result["rolled_back_to"] == "v1"
+    assert server.registry.current("chat") == "v1"
+    assert missing["status"] == "error"
+
+
+def test_deployment_server_writes_registry_off_event_loop(tmp_path):
+    """Test durable registry appends run in worker threads and stay intact when concurrent."""
+    import threading
+
+    writers = set()
+
+    class TracingRegistry(DeploymentRegistry):
+        def _append(self, event):
+            writers.add(threading.get_ident())
+            return super()._append(event)
+
+    path = str(tmp_path / "deployments.jsonl")
+    server = DeploymentServer(TracingRegistry(path, snapshot_every=7))
+
+    async def scenario():
+        await asyncio.gather(*(server.deploy_agent(f"agent_{i}", "v1") for i in range(40)))
+        await asyncio.gather(*(server.record_health(f"agent_{i}", "v1", True) for i in range(40)))
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert writers and loop_thread not in writers
+    with open(path) as handle:
+        assert len(handle.readlines()) == 80
+    loaded = DeploymentRegistry.load(path)
+    assert all(loaded.last_known_good(f"agent_{i}", exclude_current=False) == "v1" for i in range(40))
+
+
+def _recording_sender(calls: list, delay: float = 0.0):
+    async def send(channel, title, message, severity):
+        calls.append((channel, title, message, severity))
+        await asyncio.sleep(delay)
+        return True
+    return send
+
+
+def test_notification_queue_coalesces_and_batches():
+    """Test identical notifications merge with a count and batchable channels get one call."""
+    calls = []
+    queue = NotificationQueue(_recording_sender(calls), limits={"slack": ChannelLimit(100, 5, max_batch=10)},
+                              coalesce_window_seconds=0.1)
+
+    async def scenario():
+        for _ in range(5):
+            queue.submit("slack", "Rollback", "chat rolled back")
+        queue.submit("slack", "Latency", "search p95 high", "critical")
+        queue.submit("slack", "Errors", "billing error rate 7%")
+        await queue.flush(timeout=1)
+        first = list(calls)
+        queue.submit("slack", "Rollback", "chat rolled back")  # within the window: held back
+        queue.submit("slack", "Rollback", "chat rolled back")
+        await queue.flush(timeout=1)
+        held = len(calls)
+        await asyncio.sleep(0.15)
+        await queue.flush(timeout=1)
+        await queue.stop()
+        return first, held
+
+    first, held = asyncio.run(scenario())
+    assert len(first) == 1
+    channel, title, message, severity = first[0]
+    assert title == "3 notifications" and severity == "critical"
+    assert message.splitlines()[0].startswith("[critical] Latency")
+    assert "chat rolled back (x5)" in message
+    assert held == 1
+    assert calls[1][2] == "chat rolled back (x2)"
+    assert queue.stats["delivered"] == 9 and queue.stats["coalesced"] == 5
+
+
+def test_notification_queue_rate_limits_and_applies_backpressure():
+    """Test per-channel token buckets pace sends and a full queue rejects or waits."""
+    calls = []
+    queue = NotificationQueue(_recording_sender(calls), limits={"pagerduty": ChannelLimit(20, 1)}, max_pending=3)
+
+    async def scenario():
+        started = time.perf_counter()
+        accepted = [queue.submit("pagerduty", f"Incident {i}", "down", "critical") for i in range(4)]
+        await queue.put("pagerduty", "Incident 4", "down", "critical")  # waits for space
+        await queue.flush(timeout=2)
+        await queue.stop()
+        return accepted, time.perf_counter() - started
+
+    accepted, elapsed = asyncio.run(scenario())
+    assert accepted == [True, True, True, False]
+    assert [title for _, title, _, _ in calls] == [f"Incident {i}" for i in (0, 1, 2, 4)]
+    assert elapsed >= 0.14  # 4 sends at 20/s with a burst of 1
+    assert queue.stats["rejected"] == 1
+
+
+def test_notify_operations_team_does_not_wait_for_delivery(monkeypatch):
+    """Test the recovery path only enqueues notifications."""
+    server = NotificationServer()
+    calls = []
+    server.queue.sender = _recording_sender(calls, delay=1.0)
+    monkeypatch.setattr("mcp_servers.notification_server.notification_server", server)
+
+    async def scenario():
+        started = time.perf_counter()
+        accepted = await notify_operations_team("Automated recovery in progress for chat", "slack")
+        return accepted, time.perf_counter() - started
+
+    accepted, elapsed = asyncio.run(scenario())
+    assert accepted and elapsed < 0.1
+
+
+def test_notification_server_drains_queue_and_groups_on_stop():
+    """Test shutdown pages open alert groups and sends queued notifications, held repeats included."""
+    server = NotificationServer()
+    calls = []
+    server.queue = NotificationQueue(_recording_sender(calls), limits={"slack": ChannelLimit(100, 5),
+                                                                      "pagerduty": ChannelLimit(100, 5)})
+    server.alert_grouper.emit = server._page_group
+
+    async def scenario():
+        server.queue_notification("slack", "Rollback", "chat rolled back")
+        await server.queue.flush(timeout=1)
+        server.queue_notification("slack", "Rollback", "chat rolled back")  # held for the coalescing window
+        for agent in ("chat", "search", "billing"):
+            await server.send_alert(agent, "database timeout", {"dependency": "postgres"})
+        await server.stop(drain_timeout_seconds=1)
+
+    asyncio.run(scenario())
+    assert sorted((channel, title) for channel, title, _, _ in calls) == [
+        ("pagerduty", "3 alerts from 3 agents (dependency=postgres)"), ("slack", "Rollback"), ("slack", "Rollback")
+    ]
+    assert len(server.queue) == 0 and len(server.alert_grouper) == 0
+
+
+def test_alert_grouper_collapses_storm_into_group_and_digests():
+    """Test one page per root cause, follow-up digests, and a final digest when the group goes idle."""
+    now = [0.0]
+    sent = []
+    grouper = AlertGrouper(sent.append, window_seconds=60, group_wait_seconds=5, digest_interval_seconds=30,
+                           max_members=10, clock=lambda: now[0])
+    for i in range(500):
+        now[0] = i * 0.002
+        grouper.add(Alert(f"agent_{i % 40}", "database timeout", labels={"dependency": "postgres", "region": "us"}))
+    grouper.add(Alert("search", "high latency"))  # unlabelled alerts group per agent
+    assert sent == []
+
+    now[0] = 6.0
+    grouper.tick()
+    postgres = [n for n in sent if n.labels.get("dependency") == "postgres"]
+    assert len(sent) == 2 and len(postgres) == 1
+    assert postgres[0].total_alerts == 500 and len(postgres[0].members) == 10
+    assert postgres[0].unlisted_alerts == 500 - 10 * 13  # agents 0-9 alert 13 times each in 500 rounds of 40
+    assert postgres[0].title.startswith("500 alerts from 10+ agents (dependency=postgres, region=us)")
+
+    now[0] = 20.0
+    for i in range(20):
+        grouper.add(Alert(f"agent_{i}", "database timeout", labels={"dependency": "postgres", "region": "us"}))
+    now[0] = 36.0
+    grouper.tick()
+    assert sent[-1].kind == "digest" and sent[-1].new_alerts == 20
+
+    now[0] = 40.0
+    grouper.add(Alert("agent_1", "database timeout", labels={"dependency": "postgres", "region": "us"}))
+    now[0] = 101.0
+    grouper.tick()
+    assert sent[-1].kind == "digest" and sent[-1].new_alerts == 1
+    assert len(grouper) == 0
+    assert grouper.stats == {"alerts": 522, "groups": 2, "notifications": 4}
+
+
+def test_alert_grouper_bounds_groups():
+    """Test the least recently active group is closed when max_groups is exceeded."""
+    sent = []
+    grouper = AlertGrouper(sent.append, max_groups=100, clock=lambda: 0.0)
+    for i in range(1000):
+        grouper.add(Alert(f"agent_{i}", "down", labels={"pattern": f"p{i}"}))
+    assert len(grouper) == 100
+    assert len(sent) == 900 and all(n.kind == "initial" for n in sent)
+
+
+def test_execute_recovery_skips_restore_without_checkpoint(tmp_path, monkeypatch):
+    """Test an agent with no checkpoint gets no restore step instead of a made-up checkpoint id."""
+    import json
+    from agents.recovery import execute_recovery
+
+    monkeypatch.setattr(config.recovery, "checkpoint_dir", str(tmp_path))
+    result = json.loads(asyncio.run(execute_recovery("AgentWithoutCheckpoints", "high")))
+    assert "restore" not in [step["action"] for step in result["recovery_steps"]]
+    assert {"action": "restore", "reason": "No checkpoint recorded"} in result["skipped_actions"]
+    assert result["checkpoint_id"] is None and result["recovery_successful"]
@@ -1,5 +1,12 @@
 """Tests for reporting tools."""
 
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tools.reporting.audit_log import SegmentedAuditLog
 from tools.reporting.audit_trail import (
     AuditTrail,
     calculate_sla_compliance,
@@ -39,3 +46,113 @@ def test_generate_reliability_score():
     # Poor performance: high error rate, lower uptime, slower response
     result = generate_reliability_score(8.0, 95.0, 2000, 1000)
     assert result["score"] < 85
+
+
+def test_segmented_audit_log_chains_and_recovers(tmp_path):
+    """Test records survive reopening, span segments, and a torn tail is truncated."""
+    log = SegmentedAuditLog(str(tmp_path), segment_bytes=4096)
+    for i in range(200):
+        log.append({"event_type": "recovery_executed", "actor": "recovery_pipeline", "details": f"step {i}"})
+    head = log.head()
+    log.close()
+    assert len(log.segments()) > 1
+
+    segments = sorted(tmp_path.glob("segment-*.log"))
+    with open(segments[-1], "ab") as handle:
+        handle.write(b"\x40\x00\x00\x00{\"seq\":")  # crash mid-append
+
+    reopened = SegmentedAuditLog(str(tmp_path), segment_bytes=4096)
+    assert len(reopened) == 200 and reopened.head() == head
+    reopened.append({"event_type": "health_check_completed"})
+    result = reopened.verify()
+    assert result.ok and result.records == 201
+    entries = list(reopened.entries(start_seq=199))
+    assert [e["seq"] for e in entries] == [199, 200]
+    reopened.close()
+
+
+def test_segmented_audit_log_recovers_from_crash_while_rotating(tmp_path):
+    """Test a new segment whose header was never completed is dropped on reopen."""
+    with SegmentedAuditLog(str(tmp_path)) as log:
+        for i in range(3):
+            log.append({"event_type": "recovery_executed", "details": f"step {i}"})
+        head = log.head()
+    (tmp_path / "segment-0000000000000003.log").write_bytes(b"ARGAUD")  # crash before the header was written
+
+    reopened = SegmentedAuditLog(str(tmp_path))
+    assert len(reopened) == 3 and reopened.head() == head and reopened.corruption is None
+    assert reopened.append({"event_type": "health_check_completed"}) == 3
+    assert reopened.verify().ok and len(reopened.segments()) == 1
+    reopened.close()
+
+
+def test_segmented_audit_log_detects_tampering(tmp_path):
+    """Test an edited record breaks the chain."""
+    with SegmentedAuditLog(str(tmp_path)) as log:
+        for actor in ("alice", "bob", "carol"):
+            log.append({"event_type": "manual_override", "actor": actor})
+    segment = next(tmp_path.glob("segment-*.log"))
+    segment.write_bytes(segment.read_bytes().replace(b"bob", b"eve"))
+
+    result = SegmentedAuditLog(str(tmp_path), sync="never").verify()
+    assert not result.ok and result.records == 1
+    assert "hash mismatch at record 1" in result.error
+
+
+def test_audit_log_group_commit_shares_fsyncs(tmp_path):
+    """Test concurrent durable appends are covered by fewer fsyncs than events."""
+    import threading
+
+    log = SegmentedAuditLog(str(tmp_path))
+    barrier = threading.Barrier(8)
+
+    def writer(n):
+        barrier.wait()
+        for i in range(50):
+            log.append({"event_type": "anomaly_detected", "actor": f"writer_{n}", "details": str(i)})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert log.stats["records"] == 400
+    assert log.stats["fsyncs"] < 400
+    assert log.verify().ok
+    log.close()
+
+
+def test_audit_trail_backed_by_durable_log(tmp_path):
+    """Test AuditTrail persists across instances when given a log directory."""
+    trail = AuditTrail(str(tmp_path))
+    trail.log("recovery_executed", "recovery_pipeline_agent", "Rollback completed")
+    trail.store.close()
+
+    reopened = AuditTrail(str(tmp_path))
+    entries = reopened.get_entries()
+    assert entries[0]["event_type"] == "recovery_executed" and entries[0]["seq"] == 0
+    assert reopened.verify()["ok"] and reopened.verify()["durable"]
+
+
+def test_audit_log_has_a_single_writer_per_directory(tmp_path):
+    """Test trails in one process share a store and a second writer is refused."""
+    first, second = AuditTrail(str(tmp_path)), AuditTrail(str(tmp_path))
+    assert first.store is second.store
+    for i in range(3):
+        first.log("manual_override", "alice", f"change {i}")
+        second.log("manual_override", "bob", f"change {i}")
+    assert first.verify()["ok"] and first.verify()["records"] == 6
+
+    with pytest.raises(RuntimeError, match="already open"):
+        SegmentedAuditLog(str(tmp_path))
+    other_process = subprocess.run(
+        [sys.executable, "-c", "import sys; from tools.reporting.audit_log import SegmentedAuditLog; "
+                               "SegmentedAuditLog(sys.argv[1])", str(tmp_path)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), capture_output=True, text=True
+    )
+    assert other_process.returncode != 0 and "already open" in other_process.stderr
+
+    first.store.close()
+    reopened = SegmentedAuditLog(str(tmp_path))
+    assert len(reopened) == 6
+    reopened.close()
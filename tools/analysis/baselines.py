@@ -0,0 +1,231 @@
+"""Persistent per-agent, per-metric baselines for anomaly scoring.
+
+Each (agent, metric) pair keeps a Welford running mean/variance, an EWMA and a
+quantile sketch, all updated in O(1) per sample. The store is saved as one
+compact JSON file (written to a temp file and atomically renamed) and
+reloaded at startup, so baselines survive restarts without replaying history.
+A save rewrites the whole store, so callers on the scoring path use
+`save_if_due`, which writes at most once per interval and only when
+something changed.
+"""
+
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from tools.analysis.pattern_detection import calculate_anomaly_score
+from tools.analysis.sketches import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+
+class MetricBaseline:
+    """Running statistics of one metric."""
+
+    __slots__ = ("count", "mean", "m2", "ewma", "sketch", "updated_at")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma: Optional[float] = None
+        self.sketch = QuantileSketch(relative_accuracy)
+        self.updated_at: Optional[str] = None
+
+    def add(self, value: float, alpha: float = 0.1, timestamp: Optional[str] = None):
+        """Fold one sample into every statistic."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.ewma = value if self.ewma is None else alpha * value + (1 - alpha) * self.ewma
+        self.sketch.add(value)
+        self.updated_at = timestamp or datetime.now().isoformat()
+
+    @classmethod
+    def from_moments(cls, mean: float, std_dev: float, count: int) -> "MetricBaseline":
+        """Build a prior baseline from known moments (the sketch starts empty)."""
+        baseline = cls()
+        baseline.count = count
+        baseline.mean = float(mean)
+        baseline.m2 = std_dev ** 2 * max(count - 1, 0)
+        baseline.ewma = float(mean)
+        return baseline
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std_dev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def score(self, value: float) -> float:
+        """Standard deviations of `value` from the baseline mean."""
+        return calculate_anomaly_score(value, self.mean, self.std_dev)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the baseline in the `learned_baselines` report shape."""
+        summary = {
+            "mean": round(self.mean, 4),
+            "std_dev": round(self.std_dev, 4),
+            "ewma": round(self.ewma, 4) if self.ewma is not None else None,
+            "samples": self.count,
+        }
+        if self.sketch.count:
+            summary["p95"] = round(self.sketch.quantile(0.95), 4)
+            summary["p99"] = round(self.sketch.quantile(0.99), 4)
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-friendly dictionary."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "ewma": self.ewma,
+            "sketch": self.sketch.to_dict(),
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MetricBaseline":
+        """Rebuild a baseline serialized with `to_dict`."""
+        baseline = cls()
+        baseline.count = data["count"]
+        baseline.mean = data["mean"]
+        baseline.m2 = data["m2"]
+        baseline.ewma = data.get("ewma")
+        baseline.sketch = QuantileSketch.from_dict(data["sketch"])
+        baseline.updated_at = data.get("updated_at")
+        return baseline
+
+
+class BaselineStore:
+    """Baselines keyed by (agent, metric), persisted to a single JSON file."""
+
+    def __init__(self, path: Optional[str] = None, ewma_alpha: float = 0.1, min_samples: int = 30,
+                 clock=time.monotonic):
+        self.path = path
+        self.ewma_alpha = ewma_alpha
+        self.min_samples = min_samples
+        self.clock = clock
+        self.dirty = False  # changed since the last save
+        self._saved_at = clock()
+        self._baselines: Dict[Tuple[str, str], MetricBaseline] = {}
+
+    def observe(self, agent: str, metric: str, value: float, timestamp: Optional[str] = None) -> MetricBaseline:
+        """Fold one sample into the agent's baseline for `metric`."""
+        key = (agent, metric)
+        baseline = self._baselines.get(key)
+        if baseline is None:
+            baseline = self._baselines[key] = MetricBaseline()
+        baseline.add(value, self.ewma_alpha, timestamp)
+        self.dirty = True
+        return baseline
+
+    def observe_many(self, agent: str, observations: Dict[str, float], timestamp: Optional[str] = None):
+        """Fold one sample per metric."""
+        for metric, value in observations.items():
+            self.observe(agent, metric, value, timestamp)
+
+    def seed(self, agent: str, metric: str, mean: float, std_dev: float, count: int = 30):
+        """Install a prior baseline for a metric that has no history yet."""
+        if (agent, metric) not in self._baselines:
+            self._baselines[(agent, metric)] = MetricBaseline.from_moments(mean, std_dev, count)
+            self.dirty = True
+
+    def rebase(self, agent: str, metric: str, level: float, timestamp: Optional[str] = None) -> Optional[MetricBaseline]:
+        """
+        Restart a baseline at a confirmed new level, keeping its std_dev.
+
+        A long Welford history barely moves after a permanent level shift, so
+        the shifted samples would score as anomalies (and never be learned)
+        forever. The count drops to `min_samples`, so the baseline stays usable
+        and new samples carry more weight while it re-learns the new level.
+        """
+        key = (agent, metric)
+        baseline = self._baselines.get(key)
+        if baseline is None:
+            return None
+        rebased = MetricBaseline.from_moments(level, baseline.std_dev, min(baseline.count, self.min_samples))
+        rebased.updated_at = timestamp or datetime.now().isoformat()
+        self._baselines[key] = rebased
+        self.dirty = True
+        return rebased
+
+    def get(self, agent: str, metric: str) -> Optional[MetricBaseline]:
+        return self._baselines.get((agent, metric))
+
+    def score(self, agent: str, metric: str, value: float) -> Optional[float]:
+        """Z-score of `value`, or None while the baseline has fewer than `min_samples`."""
+        baseline = self._baselines.get((agent, metric))
+        if baseline is None or baseline.count < self.min_samples:
+            return None
+        return baseline.score(value)
+
+    def summary(self, agent: str) -> Dict[str, Dict[str, Any]]:
+        """Return every baseline of `agent` keyed by metric."""
+        return {metric: baseline.summary() for (name, metric), baseline in self._baselines.items() if name == agent}
+
+    def __len__(self) -> int:
+        return len(self._baselines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-friendly dictionary."""
+        agents: Dict[str, Dict[str, Any]] = {}
+        for (agent, metric), baseline in self._baselines.items():
+            agents.setdefault(agent, {})[metric] = baseline.to_dict()
+        return {"version": STORE_VERSION, "ewma_alpha": self.ewma_alpha, "agents": agents}
+
+    def save(self, path: Optional[str] = None):
+        """Write the store atomically: temp file in the same directory, then rename."""
+        path = path or self.path
+        if not path:
+            raise ValueError("No baseline path configured")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".baselines-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as handle:
+                json.dump(self.to_dict(), handle, separators=(",", ":"))
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.dirty = False
+        self._saved_at = self.clock()
+
+    def save_if_due(self, interval_seconds: float) -> bool:
+        """Save to `path` if anything changed and `interval_seconds` passed since the last save."""
+        if not self.path or not self.dirty or self.clock() - self._saved_at < interval_seconds:
+            return False
+        self.save()
+        return True
+
+    @classmethod
+    def load(cls, path: Optional[str], **kwargs) -> "BaselineStore":
+        """Load a saved store, or return an empty one if the file is missing or unreadable."""
+        store = cls(path, **kwargs)
+        if not path or not os.path.exists(path):
+            return store
+        try:
+            with open(path) as handle:
+                data = json.load(handle)
+            for agent, metrics in data.get("agents", {}).items():
+                for metric, baseline in metrics.items():
+                    store._baselines[(agent, metric)] = MetricBaseline.from_dict(baseline)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable baseline store {path}: {e}")
+            store._baselines = {}
+        return store
@@ -0,0 +1,386 @@
+"""Streaming change-point detection for metric series.
+
+Z-score thresholds react late to small persistent shifts and fire on single
+spikes. The detectors here accumulate evidence instead, and report when a shift
+started and how large it is:
+
+- `Cusum`: two-sided tabular CUSUM on standardized values.
+- `PageHinkley`: two-sided Page-Hinkley test against the running mean.
+- `BayesianChangePoint`: Bayesian online change-point detection with a
+  Normal-Gamma model, truncated to `max_run_length` run lengths.
+
+Each detector learns its reference mean and std_dev from the first `warmup`
+samples (unless given) and uses constant memory; CUSUM and Page-Hinkley are
+O(1) per sample, BOCPD O(max_run_length). After a change the reference moves
+to the new level (re-learned over the next `relearn` samples), so a sustained
+shift is reported once, not on every sample. Standardized inputs are clipped
+at `clip` std_devs, so a single spike cannot confirm a change on its own.
+"""
+
+import math
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class ChangePoint:
+    """A detected level shift."""
+    detector: str
+    direction: str  # "increase" or "decrease"
+    started_at: Any  # timestamp (or sample index) of the first shifted sample
+    detected_at: Any
+    magnitude: float  # new level minus old level, in metric units
+    previous_level: float
+    new_level: float
+    delay_samples: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return asdict(self)
+
+
+# A constant warm-up window has zero spread; floor the learned std_dev so float
+# noise after it is not read as a many-sigma shift
+MIN_STD_DEV_RELATIVE = 0.01  # fraction of |mean|
+MIN_STD_DEV_ABSOLUTE = 1e-6
+
+
+class _Reference:
+    """Reference level: fixed if given, otherwise learned during warm-up."""
+
+    def __init__(self, mean: Optional[float], std_dev: Optional[float], warmup: int):
+        self.mean = mean
+        self.std_dev = std_dev
+        self.warmup = warmup
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.mean is not None and self.std_dev is not None
+
+    def learn(self, value: float):
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+        if self._count >= self.warmup:
+            if self.mean is None:
+                self.mean = self._mean
+            if self.std_dev is None:
+                std_dev = math.sqrt(self._m2 / max(self._count - 1, 1))
+                self.std_dev = max(std_dev, MIN_STD_DEV_RELATIVE * abs(self._mean), MIN_STD_DEV_ABSOLUTE)
+
+    def relearn(self, samples: int):
+        """Re-estimate the mean from the next `samples` samples, keeping std_dev."""
+        self.mean = None
+        self.warmup = samples
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def standardize(self, value: float, clip: float) -> float:
+        """Standardized value, clipped so one spike cannot trigger a change alone."""
+        z = (value - self.mean) / self.std_dev
+        return max(-clip, min(clip, z))
+
+
+class _SequentialDetector:
+    name = "detector"
+
+    def __init__(self, mean: Optional[float], std_dev: Optional[float], warmup: int, clip: float = 3.0, relearn: int = 20):
+        self.reference = _Reference(mean, std_dev, warmup)
+        self.clip = clip
+        self.relearn = relearn
+        self.samples = 0
+
+    def update(self, value: float, timestamp: Any = None) -> Optional[ChangePoint]:
+        """Feed one sample; returns a `ChangePoint` when a shift is confirmed."""
+        at = self.samples if timestamp is None else timestamp
+        self.samples += 1
+        if not self.reference.ready:
+            self.reference.learn(value)
+            return None
+        return self._step(value, at)
+
+    def _step(self, value: float, at: Any) -> Optional[ChangePoint]:
+        raise NotImplementedError
+
+
+class _Run:
+    """Running sum of the samples since a candidate change start."""
+
+    __slots__ = ("start", "count", "total")
+
+    def __init__(self):
+        self.start: Any = None
+        self.count = 0
+        self.total = 0.0
+
+    def reset(self):
+        self.start, self.count, self.total = None, 0, 0.0
+
+    def add(self, value: float, at: Any):
+        if self.count == 0:
+            self.start = at
+        self.count += 1
+        self.total += value
+
+
+class Cusum(_SequentialDetector):
+    """Two-sided tabular CUSUM with slack `k` and decision interval `h` (in std_devs)."""
+
+    name = "cusum"
+
+    def __init__(
+        self,
+        k: float = 0.5,
+        h: float = 8.0,
+        mean: Optional[float] = None,
+        std_dev: Optional[float] = None,
+        warmup: int = 30,
+        clip: float = 3.0,
+        relearn: int = 20
+    ):
+        super().__init__(mean, std_dev, warmup, clip, relearn)
+        self.k = k
+        self.h = h
+        self.upper = 0.0
+        self.lower = 0.0
+        self._up = _Run()
+        self._down = _Run()
+
+    def _step(self, value: float, at: Any) -> Optional[ChangePoint]:
+        z = self.reference.standardize(value, self.clip)
+        self.upper = max(0.0, self.upper + z - self.k)
+        self.lower = max(0.0, self.lower - z - self.k)
+        # A side's run restarts whenever its statistic returns to zero
+        for statistic, run in ((self.upper, self._up), (self.lower, self._down)):
+            if statistic > 0:
+                run.add(value, at)
+            else:
+                run.reset()
+
+        if self.upper > self.h:
+            return self._alarm("increase", self._up, at)
+        if self.lower > self.h:
+            return self._alarm("decrease", self._down, at)
+        return None
+
+    def _alarm(self, direction: str, run: _Run, at: Any) -> ChangePoint:
+        ref = self.reference
+        new_level = run.total / run.count
+        change = ChangePoint(self.name, direction, run.start, at, new_level - ref.mean, ref.mean, new_level, run.count - 1)
+        ref.relearn(self.relearn)
+        self.upper = self.lower = 0.0
+        self._up.reset()
+        self._down.reset()
+        return change
+
+
+class PageHinkley(_SequentialDetector):
+    """
+    Two-sided Page-Hinkley test with tolerance `delta` and threshold `threshold` (in std_devs).
+
+    Deviations are taken from the running mean since the last change, as in
+    the classical test, so the level re-adapts without a re-learning window;
+    the warm-up only fixes the std_dev used for scaling.
+    """
+
+    name = "page_hinkley"
+
+    def __init__(
+        self,
+        delta: float = 0.5,
+        threshold: float = 8.0,
+        mean: Optional[float] = None,
+        std_dev: Optional[float] = None,
+        warmup: int = 30,
+        clip: float = 3.0
+    ):
+        super().__init__(mean, std_dev, warmup, clip)
+        self.delta = delta
+        self.threshold = threshold
+        self._reset()
+
+    def _reset(self):
+        self._count = 0
+        self._total = 0.0
+        self._cum_up = self._cum_down = 0.0
+        self._min_up = self._min_down = 0.0
+        self._up = _Run()
+        self._down = _Run()
+
+    def _step(self, value: float, at: Any) -> Optional[ChangePoint]:
+        self._count += 1
+        self._total += value
+        std_dev = self.reference.std_dev
+        z = max(-self.clip, min(self.clip, (value - self._total / self._count) / std_dev))
+        self._cum_up += z - self.delta
+        self._cum_down += -z - self.delta
+        # A new minimum of the cumulative sum moves the candidate start past it
+        if self._cum_up < self._min_up:
+            self._min_up = self._cum_up
+            self._up.reset()
+        else:
+            self._up.add(value, at)
+        if self._cum_down < self._min_down:
+            self._min_down = self._cum_down
+            self._down.reset()
+        else:
+            self._down.add(value, at)
+
+        if self._cum_up - self._min_up > self.threshold:
+            return self._alarm("increase", self._up, at)
+        if self._cum_down - self._min_down > self.threshold:
+            return self._alarm("decrease", self._down, at)
+        return None
+
+    def _alarm(self, direction: str, run: _Run, at: Any) -> ChangePoint:
+        new_level = run.total / run.count
+        before = self._count - run.count
+        previous_level = (self._total - run.total) / before if before else self.reference.mean
+        change = ChangePoint(self.name, direction, run.start, at, new_level - previous_level,
+                             previous_level, new_level, run.count - 1)
+        self._reset()
+        return change
+
+
+class BayesianChangePoint(_SequentialDetector):
+    """
+    Bayesian online change-point detection (Adams & MacKay) with bounded run length.
+
+    Keeps the run-length posterior and Normal-Gamma parameters for at most
+    `max_run_length` run lengths. A change is reported once the most probable
+    run length has dropped and the new run has grown to `min_run_length`
+    samples, provided the level moved by at least `min_shift` std_devs.
+    """
+
+    name = "bocpd"
+
+    def __init__(
+        self,
+        hazard: float = 1 / 250,
+        max_run_length: int = 200,
+        min_run_length: int = 5,
+        mean: Optional[float] = None,
+        std_dev: Optional[float] = None,
+        warmup: int = 30,
+        prior_strength: float = 1.0,
+        min_shift: float = 1.0
+    ):
+        super().__init__(mean, std_dev, warmup)
+        self.hazard = hazard
+        self.max_run_length = max_run_length
+        self.min_run_length = min_run_length
+        self.prior_strength = prior_strength
+        self.min_shift = min_shift
+        self._posterior: Optional[np.ndarray] = None
+        self._recent: Deque[Any] = deque(maxlen=max_run_length + 1)
+        self._map_run = 0
+        self._level: Optional[float] = None
+        self._dropped = False
+        self._last_start = -1
+
+    def _init_model(self):
+        ref = self.reference
+        size = self.max_run_length + 1
+        self._posterior = np.zeros(size)
+        self._posterior[0] = 1.0
+        self._mu0 = ref.mean
+        self._kappa0 = self.prior_strength
+        self._alpha0 = 1.0
+        self._beta0 = ref.std_dev ** 2
+        self._mu = np.full(size, self._mu0)
+        self._kappa = np.full(size, self._kappa0)
+        self._beta = np.full(size, self._beta0)
+        # alpha depends only on the run length, so the Student-t constants are precomputed
+        self._alpha = self._alpha0 + np.arange(size) / 2.0
+        self._log_norm = np.array([math.lgamma(a + 0.5) - math.lgamma(a) for a in self._alpha])
+        self._level = ref.mean
+
+    def _step(self, value: float, at: Any) -> Optional[ChangePoint]:
+        if self._posterior is None:
+            self._init_model()
+        self._recent.append(at)
+
+        alpha, kappa = self._alpha, self._kappa
+        scale2 = self._beta * (kappa + 1) / (alpha * kappa)
+        df = 2 * alpha
+        log_pred = (
+            self._log_norm - 0.5 * np.log(np.pi * df * scale2)
+            - (alpha + 0.5) * np.log1p((value - self._mu) ** 2 / (df * scale2))
+        )
+        pred = np.exp(log_pred - log_pred.max())
+
+        weighted = self._posterior * pred
+        grown = np.empty_like(weighted)
+        grown[0] = weighted.sum() * self.hazard
+        grown[1:] = weighted[:-1] * (1 - self.hazard)
+        grown[-1] += weighted[-1] * (1 - self.hazard)  # fold the tail into the longest run
+        self._posterior = grown / grown.sum()
+
+        # Normal-Gamma update, shifted by one run length; run length 0 restarts from the prior
+        mu, beta = self._mu, self._beta
+        new_mu = (kappa * mu + value) / (kappa + 1)
+        new_beta = beta + kappa * (value - mu) ** 2 / (2 * (kappa + 1))
+        self._mu = np.concatenate(([self._mu0], new_mu[:-1]))
+        self._kappa = np.concatenate(([self._kappa0], kappa[:-1] + 1))
+        self._beta = np.concatenate(([self._beta0], new_beta[:-1]))
+        self._mu[-1], self._kappa[-1], self._beta[-1] = new_mu[-1], kappa[-1] + 1, new_beta[-1]
+
+        previous_run = self._map_run
+        self._map_run = int(np.argmax(self._posterior))
+        if self._map_run < previous_run:
+            self._dropped = True
+        if not self._dropped:
+            self._level = float(self._mu[self._map_run])
+            return None
+        if self._map_run < self.min_run_length:
+            return None
+
+        self._dropped = False
+        previous_level = self._level
+        self._level = float(self._mu[self._map_run])
+        start = self.samples - self._map_run
+        # The MAP run length can flicker after a change; report each change once
+        if start <= self._last_start or abs(self._level - previous_level) < self.min_shift * self.reference.std_dev:
+            return None
+        self._last_start = start
+        # Run length r means the last r samples belong to the new segment
+        started_at = self._recent[-self._map_run]
+        direction = "increase" if self._level > previous_level else "decrease"
+        return ChangePoint(self.name, direction, started_at, at, self._level - previous_level,
+                           previous_level, self._level, self._map_run - 1)
+
+
+class ChangePointMonitor:
+    """One change-point detector per (agent, metric), with recent changes kept per agent."""
+
+    def __init__(self, factory: Callable[[], Any] = Cusum, history: int = 20):
+        self.factory = factory
+        self.history = history
+        self._detectors: Dict[Tuple[str, str], Any] = {}
+        self._changes: Dict[str, Deque[Dict[str, Any]]] = {}
+
+    def observe(self, agent: str, metric: str, value: float, timestamp: Any = None) -> Optional[ChangePoint]:
+        """Feed one sample to the series' detector; returns a change if one was confirmed."""
+        key = (agent, metric)
+        detector = self._detectors.get(key)
+        if detector is None:
+            detector = self._detectors[key] = self.factory()
+        change = detector.update(value, timestamp)
+        if change is not None:
+            changes = self._changes.get(agent)
+            if changes is None:
+                changes = self._changes[agent] = deque(maxlen=self.history)
+            changes.append({"metric": metric, **change.to_dict()})
+        return change
+
+    def changes(self, agent: str) -> List[Dict[str, Any]]:
+        """Most recent confirmed shifts for the agent, oldest first."""
+        return list(self._changes.get(agent, ()))
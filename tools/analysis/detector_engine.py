@@ -0,0 +1,284 @@
+"""Single-pass detector engine for trace pattern detection.
+
+Detectors register the trace fields they read and a per-trace predicate or
+accumulator. The engine decodes the union of those fields once per trace and
+updates every detector in the same pass, so adding detectors does not add
+passes over the data. Equality detectors (`field == value`) are fused further
+into one tally per distinct field, however many of them are registered.
+"""
+
+import operator
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class PatternStats:
+    """Running statistics for one failure pattern."""
+    frequency: float = 0
+    first_occurrence: Optional[str] = None
+    last_occurrence: Optional[str] = None
+    affected_operations: List[str] = field(default_factory=list)
+
+    def observe(self, timestamp: Any, operation: Any, max_operations: int, weight: float = 1):
+        """Record one matching trace."""
+        self.frequency += weight
+        if timestamp is not None:
+            if self.first_occurrence is None:
+                self.first_occurrence = str(timestamp)
+            self.last_occurrence = str(timestamp)
+        if (operation and operation not in self.affected_operations
+                and len(self.affected_operations) < max_operations):
+            self.affected_operations.append(operation)
+
+    def merge(self, other: "PatternStats", max_operations: int = 20) -> "PatternStats":
+        """Fold statistics gathered over another shard of traces into this one."""
+        self.frequency += other.frequency
+        firsts = [t for t in (self.first_occurrence, other.first_occurrence) if t is not None]
+        lasts = [t for t in (self.last_occurrence, other.last_occurrence) if t is not None]
+        self.first_occurrence = min(firsts) if firsts else None
+        self.last_occurrence = max(lasts) if lasts else None
+        for operation in other.affected_operations:
+            if operation not in self.affected_operations and len(self.affected_operations) < max_operations:
+                self.affected_operations.append(operation)
+        return self
+
+
+class Detector:
+    """Counts traces matching a predicate over the declared `fields`.
+
+    The pattern is detected when more than `min_ratio` of all traces match
+    (any match at all with the default of 0).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fields: Tuple[str, ...],
+        predicate: Callable[..., bool],
+        min_ratio: float = 0.0,
+        severity: str = "medium",
+        recommendation: str = ""
+    ):
+        self.name = name
+        self.fields = tuple(fields)
+        self.predicate = predicate
+        self.min_ratio = min_ratio
+        self.severity = severity
+        self.recommendation = recommendation
+
+    def detected(self, matches: int, total: int) -> bool:
+        """Decide whether the pattern is present."""
+        return matches > total * self.min_ratio
+
+
+class MatchDetector(Detector):
+    """Counts traces where `trace[field] == value`."""
+
+    def __init__(self, name: str, field_name: str, value: Any, **kwargs):
+        super().__init__(name, (field_name,), partial(operator.eq, value), **kwargs)
+        self.field_name = field_name
+        self.value = value
+
+
+class Accumulator:
+    """Stateful detector fed the declared `fields` of every trace.
+
+    Subclasses implement `update(*values)` and `result(total)`.
+    """
+
+    name: str = "accumulator"
+    fields: Tuple[str, ...] = ()
+
+    def update(self, *values: Any):
+        raise NotImplementedError
+
+    def result(self, total: int) -> Any:
+        raise NotImplementedError
+
+
+# Fields read for occurrence tracking on every match
+_OCCURRENCE_FIELDS = ("timestamp", "operation")
+
+
+class DetectorEngine:
+    """Runs every registered detector in a single pass over the traces.
+
+    With `weight_field` set (e.g. the `sample_weight` added by tail sampling),
+    each trace counts as its weight instead of 1, so frequencies and ratios
+    estimate the unsampled population. `total` is then the weighted total and
+    `records` the number of traces actually seen.
+    """
+
+    def __init__(
+        self,
+        detectors: Iterable[Any] = (),
+        track_occurrences: bool = True,
+        max_operations: int = 20,
+        weight_field: Optional[str] = None
+    ):
+        self.track_occurrences = track_occurrences
+        self.max_operations = max_operations
+        self.weight_field = weight_field
+        self._detectors: List[Detector] = []
+        self._accumulators: List[Accumulator] = []
+        self._stats: Dict[str, PatternStats] = {}
+        self.total = 0
+        self.records = 0
+        for detector in detectors:
+            self.register(detector)
+
+    def register(self, detector: Any):
+        """Register a `Detector` or `Accumulator`."""
+        names = {d.name for d in self._detectors} | {a.name for a in self._accumulators}
+        if detector.name in names:
+            raise ValueError(f"Detector '{detector.name}' is already registered")
+        if isinstance(detector, Accumulator):
+            self._accumulators.append(detector)
+        else:
+            self._detectors.append(detector)
+            self._stats[detector.name] = PatternStats()
+        self._compile()
+
+    def _compile(self):
+        """Build the fused lookup tables used by `update`."""
+        match_index: Dict[str, Dict[Any, List[PatternStats]]] = {}
+        predicates = []
+        for detector in self._detectors:
+            stats = self._stats[detector.name]
+            if isinstance(detector, MatchDetector):
+                match_index.setdefault(detector.field_name, {}).setdefault(detector.value, []).append(stats)
+            else:
+                predicates.append((detector.fields, detector.predicate, stats))
+        self._match_index = list(match_index.items())
+        self._predicates = predicates
+        self._accumulator_plan = [(a.fields, a.update) for a in self._accumulators]
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Union of the fields every registered detector needs decoded."""
+        needed: List[str] = []
+        sources = [d.fields for d in self._detectors] + [a.fields for a in self._accumulators]
+        if self.track_occurrences and self._detectors:
+            sources.append(_OCCURRENCE_FIELDS)
+        if self.weight_field:
+            sources.append((self.weight_field,))
+        for fields in sources:
+            for name in fields:
+                if name not in needed:
+                    needed.append(name)
+        return tuple(needed)
+
+    def update(self, traces: Iterable[Dict[str, Any]]):
+        """Fold one batch of traces into every detector."""
+        batch = traces if isinstance(traces, list) else list(traces)
+        self.records += len(batch)
+        if self.weight_field:
+            weight_field = self.weight_field
+            self.total += sum(trace.get(weight_field) or 1 for trace in batch)
+        else:
+            self.total += len(batch)
+        if self._match_index and not self.track_occurrences:
+            self._count_matches(batch)
+        if self._predicates or self._accumulator_plan or (self._match_index and self.track_occurrences):
+            self._scan(batch)
+
+    def _count_matches(self, batch: List[Dict[str, Any]]):
+        """Count equality matches with one tally per distinct field."""
+        weight_field = self.weight_field
+        for field_name, by_value in self._match_index:
+            try:
+                if weight_field:
+                    counts = Counter()
+                    for trace in batch:
+                        counts[trace.get(field_name)] += trace.get(weight_field) or 1
+                else:
+                    counts = Counter([trace.get(field_name) for trace in batch])
+            except TypeError:  # unhashable field values; compare one by one
+                counts = Counter()
+                for trace in batch:
+                    value = trace.get(field_name)
+                    for registered in by_value:
+                        if value == registered:
+                            counts[registered] += (trace.get(weight_field) or 1) if weight_field else 1
+            for value, matched in by_value.items():
+                count = counts.get(value, 0)
+                if count:
+                    for stats in matched:
+                        stats.frequency += count
+
+    def _scan(self, batch: List[Dict[str, Any]]):
+        """Per-trace pass for predicates, accumulators and occurrence tracking."""
+        match_index = self._match_index if self.track_occurrences else []
+        predicates = self._predicates
+        accumulators = self._accumulator_plan
+        max_operations = self.max_operations
+        weight_field = self.weight_field
+
+        for trace in batch:
+            get = trace.get
+            weight = (get(weight_field) or 1) if weight_field else 1
+            hits = None
+            for field_name, by_value in match_index:
+                try:
+                    matched = by_value.get(get(field_name))
+                except TypeError:  # unhashable field value never equals a registered value
+                    matched = None
+                if matched:
+                    hits = matched if hits is None else hits + matched
+            for fields, predicate, stats in predicates:
+                if predicate(*[get(name) for name in fields]):
+                    hits = [stats] if hits is None else hits + [stats]
+            if hits:
+                if self.track_occurrences:
+                    timestamp, operation = get("timestamp"), get("operation")
+                    for stats in hits:
+                        stats.observe(timestamp, operation, max_operations, weight)
+                else:
+                    for stats in hits:
+                        stats.frequency += weight
+            for fields, accumulate in accumulators:
+                accumulate(*[get(name) for name in fields])
+
+    def run(self, traces: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run all detectors over a batch of traces and return their results."""
+        self.update(traces)
+        return self.results()
+
+    def stats(self, name: str) -> PatternStats:
+        """Return the running statistics of a registered detector."""
+        return self._stats[name]
+
+    def results(self) -> Dict[str, Any]:
+        """Return `{name: detected}` for detectors and `{name: result}` for accumulators."""
+        results: Dict[str, Any] = {
+            d.name: d.detected(self._stats[d.name].frequency, self.total) for d in self._detectors
+        }
+        for accumulator in self._accumulators:
+            results[accumulator.name] = accumulator.result(self.total)
+        return results
+
+    def patterns(self) -> List[Dict[str, Any]]:
+        """Return detected patterns with the fields of `TracePattern`."""
+        return detected_patterns(self._detectors, self._stats, self.total)
+
+
+def detected_patterns(detectors: Iterable[Detector], stats: Dict[str, PatternStats], total: int) -> List[Dict[str, Any]]:
+    """Build `TracePattern`-shaped dicts for every detector whose pattern is present."""
+    detected = []
+    for detector in detectors:
+        pattern = stats[detector.name]
+        if not detector.detected(pattern.frequency, total):
+            continue
+        detected.append({
+            "pattern_name": detector.name,
+            "frequency": pattern.frequency,
+            "severity": detector.severity,
+            "first_occurrence": pattern.first_occurrence,
+            "last_occurrence": pattern.last_occurrence,
+            "affected_operations": list(pattern.affected_operations),
+            "recommendation": detector.recommendation,
+        })
+    return detected
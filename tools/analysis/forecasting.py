@@ -0,0 +1,186 @@
+"""Incremental Holt (linear trend) forecasting for time-to-threshold alerts.
+
+Every agent x metric series keeps a level, a trend and an exponentially
+weighted one-step error variance in stacked NumPy arrays. One sample per
+series is folded in with O(1) work, and forecasts for the whole fleet are a
+few array operations over the forecast horizon; raw history is never kept.
+
+Samples need not be evenly spaced. The trend is kept per second and each
+update projects it over the real gap since the previous sample (Wright's
+extension of Holt's method). A "step" ahead is the series' typical spacing:
+an exponentially weighted mean of its gaps. Without timestamps, samples are
+taken to be `interval_seconds` apart.
+
+Prediction intervals use the additive-error Holt (ETS(A,A,N)) variance
+    sigma^2 * (1 + (h - 1) * (alpha^2 + alpha*beta*h + beta^2*h*(2h - 1) / 6)).
+"""
+
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class HoltForecaster:
+    """Holt's linear exponential smoothing for many series at once."""
+
+    def __init__(
+        self,
+        alpha: float = 0.3,
+        beta: float = 0.1,
+        interval_seconds: float = 60.0,
+        confidence: float = 0.9,
+        min_samples: int = 5,
+        error_alpha: float = 0.1,
+        capacity: int = 64
+    ):
+        self.alpha = alpha
+        self.beta = beta
+        self.interval_seconds = interval_seconds
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.min_samples = min_samples
+        self.error_alpha = error_alpha
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.levels = np.zeros(capacity)
+        self.trends = np.zeros(capacity)
+        self.error_variances = np.zeros(capacity)
+        self.last_times = np.zeros(capacity)
+        self.spacings = np.full(capacity, float(interval_seconds))
+        self._series: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def series_id(self, agent: str, metric: str) -> int:
+        """Row of the series in the state arrays, allocated on first use."""
+        key = (agent, metric)
+        row = self._series.get(key)
+        if row is None:
+            row = self._series[key] = len(self._series)
+            if row >= len(self.counts):
+                grow = len(self.counts)
+                self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+                self.levels = np.concatenate([self.levels, np.zeros(grow)])
+                self.trends = np.concatenate([self.trends, np.zeros(grow)])
+                self.error_variances = np.concatenate([self.error_variances, np.zeros(grow)])
+                self.last_times = np.concatenate([self.last_times, np.zeros(grow)])
+                self.spacings = np.concatenate([self.spacings, np.full(grow, float(self.interval_seconds))])
+        return row
+
+    def observe(self, agent: str, metric: str, value: float, timestamp: Optional[float] = None) -> int:
+        """Fold one sample into a single series; returns its row."""
+        row = self.series_id(agent, metric)
+        self.update([row], [value], None if timestamp is None else [timestamp])
+        return row
+
+    def update(self, series: Sequence[int], values: Any, timestamps: Any = None):
+        """Fold one sample per series (rows from `series_id`) into the state.
+
+        `timestamps` are epoch seconds of the samples; without them each
+        sample is taken to be `interval_seconds` after the previous one.
+        """
+        rows = np.asarray(series, dtype=np.intp)
+        values = np.asarray(values, dtype=np.float64)
+        if timestamps is not None:
+            timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), rows.shape)
+        if len(np.unique(rows)) != len(rows):
+            # Repeated series are applied in order, one round at a time
+            seen: Dict[int, int] = {}
+            rounds = np.empty(len(rows), dtype=np.intp)
+            for i, row in enumerate(rows.tolist()):
+                rounds[i] = seen[row] = seen.get(row, -1) + 1
+            for i in range(rounds.max() + 1):
+                mask = rounds == i
+                self._update(rows[mask], values[mask], None if timestamps is None else timestamps[mask])
+            return
+        self._update(rows, values, timestamps)
+
+    def _update(self, rows: np.ndarray, values: np.ndarray, timestamps: Optional[np.ndarray]):
+        counts = self.counts[rows]
+        if timestamps is None:
+            timestamps = np.where(counts > 0, self.last_times[rows] + self.interval_seconds, 0.0)
+        level, trend = self.levels[rows], self.trends[rows]
+        first, second = counts == 0, counts == 1
+        # Gap since the previous sample; out-of-order or repeated times count as a tiny step
+        gap = np.where(first, self.spacings[rows], np.maximum(timestamps - self.last_times[rows], 1e-3))
+
+        projected = level + trend * gap
+        error = values - projected
+        new_level = self.alpha * values + (1 - self.alpha) * projected
+        new_trend = self.beta * (new_level - level) / gap + (1 - self.beta) * trend
+        variance = self.error_variances[rows]
+        new_variance = np.where(
+            counts >= 2, (1 - self.error_alpha) * variance + self.error_alpha * error ** 2, variance
+        )
+        spacing = self.spacings[rows]
+        new_spacing = np.where(
+            second, gap, np.where(first, spacing, (1 - self.error_alpha) * spacing + self.error_alpha * gap)
+        )
+
+        # Initialize from the first two samples: level = first value, trend = first difference per second
+        new_level = np.where(first, values, np.where(second, values, new_level))
+        new_trend = np.where(first, 0.0, np.where(second, (values - level) / gap, new_trend))
+
+        self.levels[rows] = new_level
+        self.trends[rows] = new_trend
+        self.error_variances[rows] = new_variance
+        self.spacings[rows] = new_spacing
+        self.last_times[rows] = np.where(first, timestamps, np.maximum(timestamps, self.last_times[rows]))
+        self.counts[rows] = counts + 1
+
+    def forecast(self, series: Sequence[int], steps: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Point forecast and prediction interval `steps` sample spacings ahead.
+
+        `steps` may be a scalar, one value per series, or a `(1, horizon)`
+        row such as `np.arange(1, 61)[None, :]` for a (series, horizon) matrix.
+        """
+        rows = np.asarray(series, dtype=np.intp)
+        h = np.asarray(steps, dtype=np.float64)
+        level, trend = self.levels[rows], self.trends[rows] * self.spacings[rows]
+        if h.ndim > level.ndim:
+            level, trend = level[..., None], trend[..., None]
+        mean = level + h * trend
+        a, b = self.alpha, self.beta
+        spread = 1 + (h - 1) * (a ** 2 + a * b * h + b ** 2 * h * (2 * h - 1) / 6)
+        variance = self.error_variances[rows]
+        if h.ndim > variance.ndim:
+            variance = variance[..., None]
+        half_width = self.z * np.sqrt(variance * spread)
+        return mean, mean - half_width, mean + half_width
+
+    def time_to_threshold(self, series: Sequence[int], thresholds: Any, horizon: int = 120) -> Dict[str, np.ndarray]:
+        """Seconds until each series is forecast to cross its (upper) threshold.
+
+        Returns `expected`, `earliest` and `latest` arrays, from the point
+        forecast, the upper bound and the lower bound of the prediction
+        interval. NaN means no crossing within `horizon` spacings, or fewer
+        than `min_samples` samples so far (even above the threshold); 0 means
+        already at or above the threshold.
+        """
+        rows = np.asarray(series, dtype=np.intp)
+        thresholds = np.broadcast_to(np.asarray(thresholds, dtype=np.float64), rows.shape)
+        steps = np.arange(1, horizon + 1, dtype=np.float64)[None, :]
+        spacings = self.spacings[rows]
+        mean, lower, upper = self.forecast(rows, steps)
+
+        def first_crossing(path: np.ndarray) -> np.ndarray:
+            crossed = path >= thresholds[:, None]
+            seconds = (crossed.argmax(axis=1) + 1) * spacings
+            return np.where(crossed.any(axis=1), seconds, np.nan)
+
+        result = {"expected": first_crossing(mean), "earliest": first_crossing(upper), "latest": first_crossing(lower)}
+        young = self.counts[rows] < self.min_samples
+        breached = (self.levels[rows] >= thresholds) & ~young
+        for key in result:
+            result[key][young] = np.nan
+            result[key] = np.where(breached, 0.0, result[key])
+        return result
+
+
+def format_minutes(seconds: Optional[float]) -> Optional[str]:
+    """Human-readable duration for alert text, e.g. '12 minutes'."""
+    if seconds is None or np.isnan(seconds):
+        return None
+    minutes = seconds / 60
+    return f"{minutes:.0f} minutes" if minutes >= 1 else f"{seconds:.0f} seconds"
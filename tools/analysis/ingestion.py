@@ -0,0 +1,356 @@
+"""Streaming trace ingestion for the trace analyzer.
+
+Traces are read lazily from JSONL files, rotated log directories or OTLP-JSON
+exports and handed to the detectors in bounded batches, so a trace dump of any
+size is analyzed in constant memory.
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from tools.analysis.detector_engine import DetectorEngine
+from tools.analysis.pattern_detection import DEFAULT_DETECTORS
+from tools.analysis.templates import TemplateAccumulator, TemplateMiner
+
+logger = logging.getLogger(__name__)
+
+_ROTATION_SUFFIX = re.compile(r"^(?P<base>.+?)(?:\.(?P<index>\d+))?$")
+
+# OTLP status codes (numeric and enum-name forms)
+_OTLP_STATUS_ERROR = (2, "STATUS_CODE_ERROR")
+
+
+def _open_text(path: str):
+    """Open a plain or gzip-compressed text file for reading."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _rotation_key(path: str):
+    """Sort key that orders rotated logs oldest first (`app.log.2`, `app.log.1`, `app.log`)."""
+    name = os.path.basename(path)
+    if name.endswith(".gz"):
+        name = name[:-3]
+    match = _ROTATION_SUFFIX.match(name)
+    index = int(match.group("index")) if match.group("index") else 0
+    return (match.group("base"), -index)
+
+
+def _attribute_value(value: Dict[str, Any]) -> Any:
+    """Unwrap an OTLP `AnyValue` into a plain Python value."""
+    for key in ("stringValue", "intValue", "doubleValue", "boolValue"):
+        if key in value:
+            return int(value[key]) if key == "intValue" else value[key]
+    return None
+
+
+def _attributes(items: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Convert an OTLP attribute list into a dictionary."""
+    return {item["key"]: _attribute_value(item.get("value", {})) for item in items or []}
+
+
+def nanos_to_iso(nanos: Any) -> Optional[str]:
+    """Convert a Unix nanosecond timestamp into an ISO-8601 string."""
+    if nanos in (None, "", 0, "0"):
+        return None
+    return datetime.fromtimestamp(int(nanos) / 1e9, tz=timezone.utc).isoformat()
+
+
+def to_epoch_seconds(value: Any) -> Optional[float]:
+    """Convert an ISO-8601 string or numeric timestamp to Unix seconds; None if unparseable."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def to_status_code(value: Any) -> int:
+    """Convert a status code such as 503 or "503" to an int; 0 if missing or non-numeric ("OK", "5xx")."""
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def otlp_span_to_trace(span: Dict[str, Any], resource: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Project an OTLP-JSON span onto the flat trace dict used by the detectors."""
+    attributes = _attributes(span.get("attributes"))
+    status = span.get("status") or {}
+    start = int(span.get("startTimeUnixNano") or 0)
+    end = int(span.get("endTimeUnixNano") or 0)
+
+    error_type = attributes.get("error.type")
+    failed = status.get("code") in _OTLP_STATUS_ERROR
+    error_message = (status.get("message") or None) if failed else None
+    if error_type is None and failed:
+        message = (error_message or "").lower()
+        error_type = "timeout" if "timeout" in message or "deadline" in message else "error"
+
+    return {
+        "trace_id": span.get("traceId"),
+        "span_id": span.get("spanId"),
+        "parent_id": span.get("parentSpanId") or None,
+        "agent": (resource or {}).get("service.name"),
+        "operation": span.get("name"),
+        "timestamp": nanos_to_iso(start),
+        "duration_ms": (end - start) / 1e6 if end >= start else 0.0,
+        "status_code": attributes.get("http.response.status_code", attributes.get("http.status_code")),
+        "error_type": error_type,
+        "error_message": error_message,
+    }
+
+
+def iter_otlp_spans(export: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Flatten one OTLP `ExportTraceServiceRequest` document into trace dicts."""
+    for resource_spans in export.get("resourceSpans", []):
+        resource = _attributes((resource_spans.get("resource") or {}).get("attributes"))
+        scopes = resource_spans.get("scopeSpans") or resource_spans.get("instrumentationLibrarySpans") or []
+        for scope in scopes:
+            for span in scope.get("spans", []):
+                yield otlp_span_to_trace(span, resource)
+
+
+def _expand(record: Any) -> Iterator[Dict[str, Any]]:
+    """Yield trace dicts from a parsed record (plain trace or OTLP export)."""
+    if isinstance(record, dict) and "resourceSpans" in record:
+        yield from iter_otlp_spans(record)
+    elif isinstance(record, dict):
+        yield record
+    elif isinstance(record, list):
+        for item in record:
+            yield from _expand(item)
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily read traces from a JSONL file, one record per line.
+
+    Lines may hold plain trace dicts or OTLP-JSON export requests (as written by
+    the OpenTelemetry Collector file exporter). Malformed lines are skipped.
+    """
+    with _open_text(path) as handle:
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed trace record at {path}:{line_number}")
+                continue
+            yield from _expand(record)
+
+
+def read_jsonl_range(path: str, start: int, end: int) -> Iterator[Dict[str, Any]]:
+    """
+    Read the JSONL records that start within bytes `[start, end)` of `path`.
+
+    Adjacent ranges cover every line exactly once, so one large file can be
+    split across workers. Only uncompressed files can be read by range.
+    """
+    with open(path, "rb") as handle:
+        if start > 0:
+            handle.seek(start - 1)
+            handle.readline()  # finish the line that straddles `start`
+        while handle.tell() < end:
+            line = handle.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed trace record in {path} near byte {handle.tell()}")
+                continue
+            yield from _expand(record)
+
+
+def is_line_delimited(path: str) -> bool:
+    """True if `path` holds one JSON document per line rather than one document overall."""
+    with _open_text(path) as handle:
+        first_line = next((line.strip() for line in handle if line.strip()), "")
+    if not first_line:
+        return True
+    try:
+        json.loads(first_line)
+    except json.JSONDecodeError:
+        # A malformed record still opens and closes on its line; a pretty-printed
+        # document starts with a bare bracket or an unterminated resourceSpans key
+        return first_line.startswith("{") and first_line.endswith("}") and "resourceSpans" not in first_line
+    return True
+
+
+def read_otlp_json(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read traces from an OTLP-JSON export.
+
+    Line-delimited exports are streamed. A single pretty-printed document has
+    to be parsed whole, so prefer the line-delimited form for large dumps.
+    Files that fail to parse as one document are read line by line instead.
+    """
+    if not is_line_delimited(path):
+        logger.info(f"{path} is a single OTLP document; loading it in full")
+        try:
+            with _open_text(path) as handle:
+                document = json.load(handle)
+        except json.JSONDecodeError:
+            logger.warning(f"{path} is not a valid JSON document; reading it line by line")
+        else:
+            yield from _expand(document)
+            return
+    yield from read_jsonl(path)
+
+
+def list_trace_files(source: str, pattern: str = "*") -> List[str]:
+    """Trace files under `source` (a file or rotated log directory), oldest first."""
+    if not os.path.isdir(source):
+        return [source]
+    paths = [p for p in glob.glob(os.path.join(source, pattern)) if os.path.isfile(p)]
+    return sorted(paths, key=_rotation_key)
+
+
+def read_log_directory(directory: str, pattern: str = "*") -> Iterator[Dict[str, Any]]:
+    """Read every trace file in a (rotated) log directory, oldest file first."""
+    for path in list_trace_files(directory, pattern):
+        yield from read_otlp_json(path)
+
+
+def iter_traces(source: str) -> Iterator[Dict[str, Any]]:
+    """Stream traces from a file or directory path."""
+    if os.path.isdir(source):
+        return read_log_directory(source)
+    return read_otlp_json(source)
+
+
+def batched(traces: Iterable[Dict[str, Any]], batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """Group a trace stream into lists of at most `batch_size` traces."""
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    iterator = iter(traces)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def project(traces: Iterable[Dict[str, Any]], fields: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Keep only `fields` of each trace so buffered batches stay small."""
+    fields = tuple(fields)
+    for trace in traces:
+        get = trace.get
+        yield {name: get(name) for name in fields}
+
+
+class StreamingTraceAnalyzer:
+    """Incrementally run the trace detectors over a stream of trace batches."""
+
+    def __init__(
+        self,
+        agent_name: Optional[str] = None,
+        batch_size: int = 1000,
+        max_operations: int = 20,
+        detectors: Optional[List[Any]] = None,
+        weight_field: Optional[str] = None,
+        mine_templates: bool = False
+    ):
+        self.agent_name = agent_name
+        self.batch_size = batch_size
+        self.engine = DetectorEngine(
+            DEFAULT_DETECTORS if detectors is None else detectors,
+            max_operations=max_operations,
+            weight_field=weight_field
+        )
+        self.templates: Optional[TemplateAccumulator] = None
+        if mine_templates:
+            self.templates = TemplateAccumulator(TemplateMiner(max_operations=max_operations))
+            self.engine.register(self.templates)
+        self.batches_processed = 0
+        self.elapsed_seconds = 0.0
+
+    @property
+    def traces_analyzed(self) -> int:
+        return self.engine.records
+
+    def update(self, batch: List[Dict[str, Any]]):
+        """Fold one batch of traces into the running detector state."""
+        started = time.perf_counter()
+        self._update(batch)
+        self.elapsed_seconds += time.perf_counter() - started
+
+    def _update(self, batch: List[Dict[str, Any]]):
+        if self.agent_name:
+            batch = [t for t in batch if t.get("agent") in (None, self.agent_name)]
+        self.engine.update(batch)
+        self.batches_processed += 1
+
+    def consume(self, traces: Iterable[Dict[str, Any]]) -> "StreamingTraceAnalyzer":
+        """Analyze an entire trace stream batch by batch.
+
+        Only the fields the detectors declare are kept from each trace.
+        Throughput is measured over wall-clock time, including reading and
+        decoding the stream.
+        """
+        fields = self.engine.fields + (("agent",) if self.agent_name else ())
+        started = time.perf_counter()
+        for batch in batched(project(traces, fields), self.batch_size):
+            self._update(batch)
+        self.elapsed_seconds += time.perf_counter() - started
+        return self
+
+    @property
+    def traces_per_second(self) -> float:
+        """Detector throughput over everything consumed so far."""
+        if self.elapsed_seconds == 0:
+            return 0.0
+        return self.traces_analyzed / self.elapsed_seconds
+
+    def patterns(self) -> List[Dict[str, Any]]:
+        """Return detected patterns with the fields of `TracePattern`."""
+        return self.engine.patterns()
+
+    def error_templates(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Return the most frequent error-message templates (empty unless mining is on)."""
+        if self.templates is None:
+            return []
+        return self.templates.miner.top(n)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return ingestion counters and throughput."""
+        return {
+            "traces_analyzed": self.traces_analyzed,
+            "batches_processed": self.batches_processed,
+            "elapsed_seconds": round(self.elapsed_seconds, 4),
+            "traces_per_second": round(self.traces_per_second, 1),
+        }
+
+
+def analyze_trace_source(source: str, agent_name: Optional[str] = None, batch_size: int = 1000) -> StreamingTraceAnalyzer:
+    """Stream a trace file or directory through the detectors."""
+    analyzer = StreamingTraceAnalyzer(agent_name=agent_name, batch_size=batch_size, mine_templates=True)
+    analyzer.consume(iter_traces(source))
+    logger.info(
+        f"Ingested {analyzer.traces_analyzed} traces from {source} "
+        f"({analyzer.traces_per_second:.0f} traces/sec)"
+    )
+    return analyzer
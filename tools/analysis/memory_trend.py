@@ -0,0 +1,233 @@
+"""Streaming memory-leak detection with online trend statistics.
+
+Each process keeps a sliding window of memory readings. The window maintains
+least-squares running sums (O(1) per reading) and the Mann-Kendall S
+statistic (O(log n) rank lookups per reading), so thousands of processes can
+be monitored continuously without rescanning history.
+"""
+
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from config import config
+
+
+@dataclass
+class LeakReport:
+    """Trend verdict for one process."""
+    process: str
+    leaking: bool
+    samples: int
+    current_percent: float
+    slope_per_hour: float
+    sen_slope_per_hour: Optional[float]
+    confidence: float
+    seconds_to_threshold: Optional[float]
+    threshold_percent: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "process": self.process,
+            "leaking": self.leaking,
+            "samples": self.samples,
+            "current_percent": round(self.current_percent, 2),
+            "slope_per_hour": round(self.slope_per_hour, 4),
+            "sen_slope_per_hour": None if self.sen_slope_per_hour is None else round(self.sen_slope_per_hour, 4),
+            "confidence": round(self.confidence, 4),
+            "seconds_to_threshold": None if self.seconds_to_threshold is None else round(self.seconds_to_threshold),
+            "threshold_percent": self.threshold_percent,
+        }
+
+
+def _normal_cdf(z: float) -> float:
+    return 0.5 * (1.0 + math.erf(z / math.sqrt(2.0)))
+
+
+class MemoryTrend:
+    """Sliding-window trend statistics for one memory series."""
+
+    def __init__(self, window: int = 120, interval_seconds: float = None):
+        if window < 3:
+            raise ValueError("window must hold at least 3 readings")
+        self.window = window
+        self.interval_seconds = interval_seconds or config.monitoring.check_interval_seconds
+        self._points: deque = deque()   # (x, y) with x relative to self._origin
+        self._sorted: List[float] = []  # window values kept sorted for rank lookups
+        self._origin: Optional[float] = None
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self._s = 0                     # Mann-Kendall S statistic
+        self._count = 0
+        self._since_rebase = 0
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def add(self, value: float, timestamp: Optional[float] = None):
+        """Add one reading; `timestamp` is in seconds (defaults to the sampling interval)."""
+        if timestamp is None:
+            timestamp = self._count * self.interval_seconds
+        if self._origin is None:
+            self._origin = timestamp
+        self._count += 1
+
+        if len(self._points) == self.window:
+            self._evict()
+
+        # New value is later than every value in the window
+        below = bisect_left(self._sorted, value)
+        above = len(self._sorted) - bisect_right(self._sorted, value)
+        self._s += below - above
+        insort(self._sorted, value)
+
+        x = timestamp - self._origin
+        self._points.append((x, value))
+        self._sx += x
+        self._sy += value
+        self._sxx += x * x
+        self._sxy += x * value
+
+        # Rebase x once per window so running sums do not lose precision
+        self._since_rebase += 1
+        if self._since_rebase >= self.window:
+            self._rebase()
+
+    def _evict(self):
+        x, y = self._points.popleft()
+        del self._sorted[bisect_left(self._sorted, y)]
+        # Oldest value is earlier than every remaining value
+        above = len(self._sorted) - bisect_right(self._sorted, y)
+        below = bisect_left(self._sorted, y)
+        self._s -= above - below
+        self._sx -= x
+        self._sy -= y
+        self._sxx -= x * x
+        self._sxy -= x * y
+
+    def _rebase(self):
+        shift = self._points[0][0]
+        self._origin += shift
+        self._points = deque((x - shift, y) for x, y in self._points)
+        self._sx = sum(x for x, _ in self._points)
+        self._sy = sum(y for _, y in self._points)
+        self._sxx = sum(x * x for x, _ in self._points)
+        self._sxy = sum(x * y for x, y in self._points)
+        self._since_rebase = 0
+
+    def slope(self) -> float:
+        """Least-squares slope in units per second."""
+        n = len(self._points)
+        denominator = n * self._sxx - self._sx * self._sx
+        if n < 2 or denominator <= 0:
+            return 0.0
+        return (n * self._sxy - self._sx * self._sy) / denominator
+
+    def fitted_last(self) -> float:
+        """Regression estimate of the latest reading."""
+        n = len(self._points)
+        if n == 0:
+            return 0.0
+        slope = self.slope()
+        intercept = (self._sy - slope * self._sx) / n
+        return intercept + slope * self._points[-1][0]
+
+    @property
+    def mann_kendall_s(self) -> int:
+        """Mann-Kendall S statistic of the current window."""
+        return self._s
+
+    def mann_kendall_confidence(self) -> float:
+        """One-sided confidence that the series trends upward."""
+        n = len(self._points)
+        if n < 3:
+            return 0.0
+        variance = n * (n - 1) * (2 * n + 5) / 18.0
+        if self._s > 0:
+            z = (self._s - 1) / math.sqrt(variance)
+        elif self._s < 0:
+            z = (self._s + 1) / math.sqrt(variance)
+        else:
+            z = 0.0
+        return _normal_cdf(z)
+
+    def sen_slope(self) -> float:
+        """Theil-Sen slope (median pairwise slope) in units per second; O(window^2)."""
+        points = list(self._points)
+        slopes = sorted(
+            (yj - yi) / (xj - xi)
+            for i, (xi, yi) in enumerate(points)
+            for xj, yj in points[i + 1:]
+            if xj != xi
+        )
+        if not slopes:
+            return 0.0
+        middle = len(slopes) // 2
+        if len(slopes) % 2:
+            return slopes[middle]
+        return (slopes[middle - 1] + slopes[middle]) / 2
+
+
+class MemoryLeakMonitor:
+    """Per-process streaming leak detection."""
+
+    def __init__(
+        self,
+        window: int = 120,
+        min_confidence: float = 0.95,
+        min_slope_per_hour: float = 0.5,
+        threshold_percent: float = None,
+        interval_seconds: float = None
+    ):
+        self.window = window
+        self.min_confidence = min_confidence
+        self.min_slope_per_hour = min_slope_per_hour
+        self.threshold_percent = threshold_percent or config.monitoring.memory_threshold_percent
+        self.interval_seconds = interval_seconds
+        self.trends: Dict[str, MemoryTrend] = {}
+
+    def observe(self, process: str, memory_percent: float, timestamp: Optional[float] = None):
+        """Record one memory reading for `process`."""
+        trend = self.trends.get(process)
+        if trend is None:
+            trend = self.trends[process] = MemoryTrend(self.window, self.interval_seconds)
+        trend.add(memory_percent, timestamp)
+
+    def report(self, process: str) -> LeakReport:
+        """Evaluate the current trend of one process."""
+        trend = self.trends[process]
+        slope_per_hour = trend.slope() * 3600
+        confidence = trend.mann_kendall_confidence()
+        leaking = confidence >= self.min_confidence and slope_per_hour > self.min_slope_per_hour
+
+        sen_slope_per_hour = None
+        seconds_to_threshold = None
+        current = trend.fitted_last()
+        if leaking:
+            # The robust slope is only worth its quadratic cost once a trend is significant
+            sen_slope_per_hour = trend.sen_slope() * 3600
+            rate = min(slope_per_hour, sen_slope_per_hour) / 3600
+            if current >= self.threshold_percent:
+                seconds_to_threshold = 0.0
+            elif rate > 0:
+                seconds_to_threshold = (self.threshold_percent - current) / rate
+
+        return LeakReport(
+            process=process,
+            leaking=leaking,
+            samples=len(trend),
+            current_percent=current,
+            slope_per_hour=slope_per_hour,
+            sen_slope_per_hour=sen_slope_per_hour,
+            confidence=confidence,
+            seconds_to_threshold=seconds_to_threshold,
+            threshold_percent=self.threshold_percent,
+        )
+
+    def leaks(self) -> List[LeakReport]:
+        """Reports for every leaking process, soonest to hit the threshold first."""
+        reports = [self.report(p) for p in self.trends]
+        leaking = [r for r in reports if r.leaking]
+        return sorted(leaking, key=lambda r: math.inf if r.seconds_to_threshold is None else r.seconds_to_threshold)
@@ -0,0 +1,161 @@
+"""Multivariate anomaly detection across correlated metrics.
+
+Each agent keeps a streaming mean vector and covariance matrix over its metric
+vector (e.g. response time, error rate, CPU). Observations are scored by
+Mahalanobis distance, so combinations that are unusual together are flagged
+even when every single metric is within its own range.
+
+Estimates are updated incrementally: exact running moments during warm-up,
+then an exponentially weighted update in which each observation's weight is
+capped Huber-style by its distance. One outlier therefore cannot drag the
+estimate toward itself. All agents share stacked `(agents, d)` and
+`(agents, d, d)` arrays, so scoring and updating a whole fleet is a handful
+of batched NumPy operations.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def chi2_quantile(confidence: float, dof: int) -> float:
+    """Approximate chi-square quantile (Wilson-Hilferty), accurate to ~1% for dof >= 2."""
+    z = NormalDist().inv_cdf(confidence)
+    h = 2.0 / (9.0 * dof)
+    return dof * (1.0 - h + z * math.sqrt(h)) ** 3
+
+
+class MultivariateDetector:
+    """Streaming robust covariance per agent with batched Mahalanobis scoring."""
+
+    def __init__(
+        self,
+        metrics: Sequence[str],
+        alpha: float = 0.02,
+        min_samples: int = 30,
+        confidence: float = 0.999,
+        huber_confidence: float = 0.99,
+        ridge: float = 1e-6,
+        capacity: int = 64
+    ):
+        self.metrics = list(metrics)
+        self.dim = len(self.metrics)
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.threshold = math.sqrt(chi2_quantile(confidence, self.dim))
+        self.huber_c = math.sqrt(chi2_quantile(huber_confidence, self.dim))
+        self.ridge = ridge
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.means = np.zeros((capacity, self.dim))
+        self.covariances = np.zeros((capacity, self.dim, self.dim))
+        self._agents: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def agent_index(self, agent: str) -> int:
+        """Row of the agent in the stacked arrays, allocated on first use."""
+        row = self._agents.get(agent)
+        if row is None:
+            row = self._agents[agent] = len(self._agents)
+            if row >= len(self.counts):
+                grow = len(self.counts)
+                self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+                self.means = np.concatenate([self.means, np.zeros((grow, self.dim))])
+                self.covariances = np.concatenate([self.covariances, np.zeros((grow, self.dim, self.dim))])
+        return row
+
+    def _rows(self, agents: Sequence[str]) -> np.ndarray:
+        return np.fromiter((self.agent_index(a) for a in agents), dtype=np.intp, count=len(agents))
+
+    def _solve(self, rows: np.ndarray, diff: np.ndarray) -> np.ndarray:
+        """Precision-times-diff for each row; the ridge keeps flat metrics invertible."""
+        cov = self.covariances[rows]
+        scale = np.maximum(np.trace(cov, axis1=1, axis2=2) / self.dim, 1.0)
+        cov = cov + (self.ridge * scale)[:, None, None] * np.eye(self.dim)
+        return np.linalg.solve(cov, diff[..., None])[..., 0]
+
+    def score(self, agents: Sequence[str], observations: Any) -> np.ndarray:
+        """Mahalanobis distance of each observation; NaN while the agent is warming up."""
+        x = np.asarray(observations, dtype=np.float64).reshape(len(agents), self.dim)
+        rows = self._rows(agents)
+        diff = x - self.means[rows]
+        distances = np.sqrt(np.maximum(np.einsum("ij,ij->i", diff, self._solve(rows, diff)), 0.0))
+        distances[self.counts[rows] < self.min_samples] = np.nan
+        return distances
+
+    def update(self, agents: Sequence[str], observations: Any, distances: Optional[np.ndarray] = None):
+        """Fold one observation per agent into the estimates.
+
+        Repeated agents in one call are applied in order, one round at a time.
+        """
+        x = np.asarray(observations, dtype=np.float64).reshape(len(agents), self.dim)
+        rows = self._rows(agents)
+        if len(np.unique(rows)) != len(rows):
+            seen: Dict[int, int] = {}
+            rounds = np.empty(len(rows), dtype=np.intp)
+            for i, row in enumerate(rows.tolist()):
+                rounds[i] = seen[row] = seen.get(row, -1) + 1
+            for i in range(rounds.max() + 1):
+                mask = rounds == i
+                self._update(rows[mask], x[mask], None if distances is None else distances[mask])
+            return
+        self._update(rows, x, distances)
+
+    def _update(self, rows: np.ndarray, x: np.ndarray, distances: Optional[np.ndarray]):
+        if distances is None:
+            diff = x - self.means[rows]
+            distances = np.sqrt(np.maximum(np.einsum("ij,ij->i", diff, self._solve(rows, diff)), 0.0))
+        counts = self.counts[rows] + 1
+        warming = counts <= self.min_samples
+
+        # Exact running moments while warming up, then a robust EW update
+        rate = np.where(warming, 1.0 / counts, self.alpha)
+        weight = np.where(warming, 1.0, np.minimum(1.0, self.huber_c / np.maximum(np.nan_to_num(distances), 1e-12)))
+        step = rate * weight
+
+        delta = x - self.means[rows]
+        means = self.means[rows] + step[:, None] * delta
+        # delta (x - new_mean)^T equals (1 - step) delta delta^T: with step = 1/n this is the
+        # exact Welford population covariance, otherwise the usual EW covariance update
+        outer = np.einsum("ij,ik->ijk", delta, x - means)
+        covariances = (1 - step)[:, None, None] * self.covariances[rows] + step[:, None, None] * outer
+        self.means[rows] = means
+        self.covariances[rows] = covariances
+        self.counts[rows] = counts
+
+    def observe(self, agents: Sequence[str], observations: Any) -> np.ndarray:
+        """Score the observations, then learn from them; returns the distances."""
+        distances = self.score(agents, observations)
+        self.update(agents, observations, distances)
+        return distances
+
+    def contributions(self, agent: str, observation: Any) -> Dict[str, float]:
+        """Share of the squared distance attributable to each metric."""
+        row = self.agent_index(agent)
+        diff = np.asarray(observation, dtype=np.float64).reshape(1, self.dim) - self.means[[row]]
+        terms = diff[0] * self._solve(np.array([row]), diff)[0]
+        total = terms.sum()
+        if total <= 0:
+            return {metric: 0.0 for metric in self.metrics}
+        return {metric: float(term / total) for metric, term in zip(self.metrics, terms)}
+
+    def anomalies(self, agents: Sequence[str], observations: Any, learn: bool = True) -> List[Dict[str, Any]]:
+        """Score a batch and describe every observation beyond the distance threshold."""
+        x = np.asarray(observations, dtype=np.float64).reshape(len(agents), self.dim)
+        distances = self.score(agents, x)
+        flagged = []
+        for i in np.flatnonzero(distances > self.threshold).tolist():
+            contributions = self.contributions(agents[i], x[i])
+            flagged.append({
+                "agent": agents[i],
+                "mahalanobis_distance": round(float(distances[i]), 2),
+                "threshold": round(self.threshold, 2),
+                "observation": dict(zip(self.metrics, x[i].tolist())),
+                "contributions": {m: round(c, 3) for m, c in contributions.items()},
+            })
+        if learn:
+            self.update(agents, x, distances)
+        return flagged
@@ -0,0 +1,186 @@
+"""Parallel sharded trace analysis across CPU cores.
+
+Input is split into shards (whole files, or byte ranges of large JSONL
+files). Each worker process reads its own shard from disk and returns a
+compact `PartialAggregate`; only those partials cross process boundaries and
+are merged in the parent. The detectors keep no per-trace state, so any
+split of the input merges to the sequential result.
+"""
+
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from tools.analysis.detector_engine import (
+    Accumulator, Detector, DetectorEngine, PatternStats, detected_patterns
+)
+from tools.analysis.ingestion import (
+    is_line_delimited, list_trace_files, read_jsonl_range, read_otlp_json
+)
+from tools.analysis.pattern_detection import DEFAULT_DETECTORS
+from tools.analysis.sketches import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+# (path, start byte, end byte); end of None means the whole file
+FileShard = Tuple[str, int, Optional[int]]
+
+
+@dataclass
+class PartialAggregate:
+    """Mergeable summary of one shard of traces."""
+    traces: int = 0
+    patterns: Dict[str, PatternStats] = field(default_factory=dict)
+    operations: Counter = field(default_factory=Counter)
+    error_types: Counter = field(default_factory=Counter)
+    durations: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def merge(self, other: "PartialAggregate") -> "PartialAggregate":
+        """Fold another partial into this one."""
+        self.traces += other.traces
+        for name, stats in other.patterns.items():
+            if name in self.patterns:
+                self.patterns[name].merge(stats)
+            else:
+                self.patterns[name] = stats
+        self.operations.update(other.operations)
+        self.error_types.update(other.error_types)
+        self.durations.merge(other.durations)
+        return self
+
+
+class _TraceProfile(Accumulator):
+    """Per-shard operation, error and latency profile."""
+
+    name = "trace_profile"
+    fields = ("operation", "error_type", "duration_ms")
+
+    def __init__(self):
+        self.operations: Counter = Counter()
+        self.error_types: Counter = Counter()
+        self.durations = QuantileSketch()
+
+    def update(self, operation, error_type, duration_ms):
+        self.operations[operation] += 1
+        if error_type:
+            self.error_types[error_type] += 1
+        if duration_ms is not None:
+            self.durations.add(duration_ms)
+
+    def result(self, total: int) -> "_TraceProfile":
+        return self
+
+
+def _read_shard(shard: FileShard) -> Iterator[Dict[str, Any]]:
+    path, start, end = shard
+    if end is None:
+        return read_otlp_json(path)
+    return read_jsonl_range(path, start, end)
+
+
+def analyze_shard(
+    shards: List[FileShard],
+    detectors: Optional[List[Detector]] = None,
+    batch_size: int = 1000
+) -> PartialAggregate:
+    """Worker entry point: analyze file shards and return a partial aggregate."""
+    detectors = DEFAULT_DETECTORS if detectors is None else detectors
+    profile = _TraceProfile()
+    engine = DetectorEngine(list(detectors) + [profile])
+    batch: List[Dict[str, Any]] = []
+    for shard in shards:
+        for trace in _read_shard(shard):
+            batch.append(trace)
+            if len(batch) >= batch_size:
+                engine.update(batch)
+                batch = []
+    if batch:
+        engine.update(batch)
+    return PartialAggregate(
+        traces=engine.total,
+        patterns={d.name: engine.stats(d.name) for d in detectors},
+        operations=profile.operations,
+        error_types=profile.error_types,
+        durations=profile.durations,
+    )
+
+
+def plan_file_shards(source: str, target_shards: int, min_shard_bytes: int = 4 * 1024 * 1024) -> List[FileShard]:
+    """Split trace files into roughly `target_shards` byte ranges of similar size."""
+    files = list_trace_files(source)
+    sizes = {path: os.path.getsize(path) for path in files}
+    shard_bytes = max(min_shard_bytes, sum(sizes.values()) // max(target_shards, 1) + 1)
+    shards: List[FileShard] = []
+    for path in files:
+        size = sizes[path]
+        if path.endswith(".gz") or size <= shard_bytes or not is_line_delimited(path):
+            shards.append((path, 0, None))
+            continue
+        for start in range(0, size, shard_bytes):
+            shards.append((path, start, min(start + shard_bytes, size)))
+    return shards
+
+
+class ParallelTraceAnalyzer:
+    """Fan trace analysis out over a process pool and reduce the partials."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        detectors: Optional[List[Detector]] = None,
+        min_shard_bytes: int = 4 * 1024 * 1024
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.detectors = DEFAULT_DETECTORS if detectors is None else detectors
+        self.min_shard_bytes = min_shard_bytes
+        self.elapsed_seconds = 0.0
+        self.shards = 0
+
+    def analyze(self, source: str) -> PartialAggregate:
+        """Analyze every trace under `source` and return the merged aggregate."""
+        started = time.perf_counter()
+        shards = plan_file_shards(source, self.workers * 4, self.min_shard_bytes)
+        self.shards = len(shards)
+        merged = PartialAggregate(patterns={d.name: PatternStats() for d in self.detectors})
+
+        if self.workers == 1 or len(shards) == 1:
+            for shard in shards:
+                merged.merge(analyze_shard([shard], self.detectors))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(analyze_shard, [shard], self.detectors) for shard in shards]
+                for future in as_completed(futures):
+                    merged.merge(future.result())
+
+        self.elapsed_seconds = time.perf_counter() - started
+        logger.info(
+            f"Analyzed {merged.traces} traces in {self.shards} shards on {self.workers} workers "
+            f"({merged.traces / self.elapsed_seconds if self.elapsed_seconds else 0:.0f} traces/sec)"
+        )
+        return merged
+
+    def summary(self, merged: PartialAggregate, top: int = 10) -> Dict[str, Any]:
+        """Render a merged aggregate as a JSON-friendly report."""
+        return {
+            "traces_analyzed": merged.traces,
+            "workers": self.workers,
+            "shards": self.shards,
+            "elapsed_seconds": round(self.elapsed_seconds, 4),
+            "traces_per_second": round(merged.traces / self.elapsed_seconds, 1) if self.elapsed_seconds else 0.0,
+            "patterns_detected": detected_patterns(self.detectors, merged.patterns, merged.traces),
+            "top_operations": merged.operations.most_common(top),
+            "error_types": dict(merged.error_types),
+            "duration_ms": {
+                f"p{int(q * 100)}": merged.durations.quantile(q) for q in (0.5, 0.95, 0.99)
+            },
+        }
+
+
+def analyze_parallel(source: str, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Analyze a trace file or directory on all cores and return a report."""
+    analyzer = ParallelTraceAnalyzer(workers=workers)
+    return analyzer.summary(analyzer.analyze(source))
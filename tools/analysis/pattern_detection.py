@@ -1,6 +1,27 @@
 """Analysis tools for pattern detection and anomaly identification."""
 
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Sequence
+
+import numpy as np
+
+from tools.analysis.detector_engine import DetectorEngine, MatchDetector
+from tools.analysis.memory_trend import MemoryTrend
+
+
+TIMEOUT_CASCADE = MatchDetector(
+    "timeout_cascade", "error_type", "timeout",
+    min_ratio=0.1,  # More than 10% timeouts
+    severity="critical",
+    recommendation="Implement circuit breaker pattern with exponential backoff"
+)
+
+API_RATE_LIMIT = MatchDetector(
+    "external_api_rate_limit", "status_code", 429,
+    severity="high",
+    recommendation="Implement rate limiting and request queuing"
+)
+
+DEFAULT_DETECTORS = [TIMEOUT_CASCADE, API_RATE_LIMIT]
 
 
 def detect_timeout_cascade(traces: List[Dict]) -> bool:
@@ -9,15 +30,20 @@ def detect_timeout_cascade(traces: List[Dict]) -> bool:
     return timeout_count > len(traces) * 0.1  # More than 10% timeouts
 
 
-def detect_memory_leak(memory_readings: List[float]) -> bool:
-    """Detect memory leak pattern."""
-    if len(memory_readings) < 2:
+def detect_memory_leak(memory_readings: List[float], min_confidence: float = 0.95, min_slope: float = 0.0) -> bool:
+    """Detect memory leak pattern (statistically significant upward trend).
+    
+    Uses a Mann-Kendall trend test plus a least-squares slope per reading, so
+    noisy drift is not flagged. For continuous per-process monitoring use
+    `memory_trend.MemoryLeakMonitor`, which updates incrementally.
+    """
+    if len(memory_readings) < 3:
         return False
     
-    # Check if memory is consistently increasing
-    increases = sum(1 for i in range(1, len(memory_readings))
-                   if memory_readings[i] > memory_readings[i-1])
-    return increases > len(memory_readings) * 0.7
+    trend = MemoryTrend(window=len(memory_readings), interval_seconds=1)
+    for reading in memory_readings:
+        trend.add(reading)
+    return trend.mann_kendall_confidence() >= min_confidence and trend.slope() > min_slope
 
 
 def detect_api_rate_limit(traces: List[Dict]) -> bool:
@@ -26,8 +52,72 @@ def detect_api_rate_limit(traces: List[Dict]) -> bool:
     return rate_limit_count > 0
 
 
+def detect_patterns(traces: List[Dict], detectors: List[Any] = None) -> Dict[str, Any]:
+    """Run several detectors over traces in a single fused pass."""
+    engine = DetectorEngine(DEFAULT_DETECTORS if detectors is None else detectors, track_occurrences=False)
+    return engine.run(traces)
+
+
 def calculate_anomaly_score(current_value: float, mean: float, std_dev: float) -> float:
-    """Calculate anomaly score (standard deviations from mean)."""
+    """Calculate anomaly score (standard deviations from mean).
+    
+    Scalar form of `calculate_anomaly_scores`; use that to score many values.
+    """
     if std_dev == 0:
         return 0.0
     return abs(current_value - mean) / std_dev
+
+
+SEVERITIES = np.array(["normal", "high", "critical"])
+
+
+def calculate_anomaly_scores(current: Any, means: Any, std_devs: Any) -> np.ndarray:
+    """Calculate anomaly scores for whole agents x metrics matrices at once.
+    
+    Inputs broadcast against each other. Zero (or missing) std_dev scores 0,
+    as in `calculate_anomaly_score`.
+    """
+    current = np.asarray(current, dtype=np.float64)
+    means = np.asarray(means, dtype=np.float64)
+    std_devs = np.asarray(std_devs, dtype=np.float64)
+    shape = np.broadcast_shapes(current.shape, means.shape, std_devs.shape)
+    scores = np.zeros(shape)
+    valid = np.broadcast_to(std_devs > 0, shape)
+    np.divide(np.abs(current - means), std_devs, out=scores, where=valid)
+    return scores
+
+
+def classify_anomaly_scores(scores: np.ndarray, threshold: float = 3.0) -> np.ndarray:
+    """Map scores to severity codes: 0 normal, 1 high (>= threshold), 2 critical (>= 2x threshold).
+    
+    Index `SEVERITIES` with the result for the labels.
+    """
+    return (scores >= threshold).astype(np.int8) + (scores >= 2 * threshold)
+
+
+def top_anomalies(
+    scores: np.ndarray,
+    k: int = 10,
+    threshold: float = 3.0,
+    agents: Optional[Sequence[str]] = None,
+    metrics: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """Return the `k` highest scores at or above `threshold`, highest first."""
+    flat = scores.ravel()
+    candidates = np.flatnonzero(flat >= threshold)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(flat[candidates], -k)[-k:]]
+    candidates = candidates[np.argsort(flat[candidates])[::-1]]
+    
+    anomalies = []
+    columns = scores.shape[1] if scores.ndim > 1 else 1
+    for index in candidates.tolist():
+        row, column = divmod(index, columns)
+        score = float(flat[index])
+        anomalies.append({
+            "agent": agents[row] if agents is not None else row,
+            "metric": metrics[column] if metrics is not None else column,
+            "std_deviations": score,
+            "severity": "critical" if score >= 2 * threshold else "high",
+        })
+    return anomalies
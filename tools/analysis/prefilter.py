@@ -0,0 +1,145 @@
+"""Deterministic statistical pre-filter in front of the LLM anomaly detector.
+
+Most agents have nothing anomalous most of the time, and every call to the
+`anomaly_detector` agent costs a full model turn. `AnomalyPrefilter` scores
+each agent's current metrics against its learned baselines (z-scores via
+`calculate_anomaly_scores`) and only escalates agents whose worst score
+crosses the threshold, or which breach a `MonitoringConfig` limit while
+their baselines are still warming up. Everything else gets an immediate
+structured "no anomaly" result, and its samples are folded into the
+baselines. Escalated samples are not learned, so a change-point detector
+watches every sample and rebases a baseline once a level shift is confirmed.
+"""
+
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import config
+from tools.analysis.baselines import BaselineStore
+from tools.analysis.change_point import ChangePointMonitor
+from tools.analysis.pattern_detection import calculate_anomaly_scores
+
+logger = logging.getLogger(__name__)
+
+# Upper limits from MonitoringConfig that count as failure: the pre-filter applies them while an
+# agent has no usable baseline yet, and the anomaly detector forecasts time to reach them
+STATIC_LIMITS = {
+    "response_time_ms": config.monitoring.response_time_threshold_ms,
+    "error_rate_percent": config.monitoring.error_rate_threshold_percent,
+    "cpu_utilization": config.monitoring.cpu_threshold_percent,
+    "memory_utilization": config.monitoring.memory_threshold_percent,
+}
+
+
+@dataclass
+class PrefilterDecision:
+    """Outcome of pre-filtering one agent."""
+    agent_name: str
+    escalate: bool
+    max_score: Optional[float]
+    scores: Dict[str, Optional[float]]
+    reasons: List[str] = field(default_factory=list)
+
+    def no_anomaly_result(self) -> Dict[str, Any]:
+        """Structured result returned instead of an LLM call."""
+        return {
+            "analysis_type": "statistical_prefilter",
+            "timestamp": datetime.now().isoformat(),
+            "agent_name": self.agent_name,
+            "anomalies": [],
+            "status": "no_anomaly",
+            "max_std_deviations": self.max_score,
+            "scores": self.scores,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return asdict(self)
+
+
+class AnomalyPrefilter:
+    """Gate anomaly analysis on locally computed z-scores."""
+
+    def __init__(
+        self,
+        store: Optional[BaselineStore] = None,
+        threshold: Optional[float] = None,
+        learn: bool = True,
+        static_limits: Optional[Dict[str, float]] = None,
+        change_monitor: Optional[ChangePointMonitor] = None
+    ):
+        self.store = store if store is not None else BaselineStore()
+        self.threshold = config.analysis.prefilter_z_threshold if threshold is None else threshold
+        self.learn = learn
+        self.change_monitor = change_monitor if change_monitor is not None else ChangePointMonitor()
+        self.static_limits = STATIC_LIMITS if static_limits is None else static_limits
+        self.gated = 0
+        self.escalated = 0
+
+    def evaluate(self, agent_name: str, observations: Dict[str, float]) -> PrefilterDecision:
+        """Decide whether one agent needs the LLM."""
+        return self.evaluate_fleet({agent_name: observations})[0]
+
+    def evaluate_fleet(self, fleet: Dict[str, Dict[str, float]]) -> List[PrefilterDecision]:
+        """Decide for many agents at once; scores are computed in one vectorized pass."""
+        keys = [(agent, metric) for agent, observations in fleet.items() for metric in observations]
+        baselines = [self.store.get(agent, metric) for agent, metric in keys]
+        ready = np.array([b is not None and b.count >= self.store.min_samples for b in baselines], dtype=bool)
+        values = np.array([fleet[agent][metric] for agent, metric in keys], dtype=np.float64)
+        means = np.array([b.mean if b is not None else 0.0 for b in baselines])
+        std_devs = np.array([b.std_dev if b is not None else 0.0 for b in baselines])
+        scores = calculate_anomaly_scores(values, means, std_devs)
+
+        decisions: List[PrefilterDecision] = []
+        index = 0
+        for agent, observations in fleet.items():
+            agent_scores: Dict[str, Optional[float]] = {}
+            reasons = []
+            for metric, value in observations.items():
+                if ready[index]:
+                    score = round(float(scores[index]), 2)
+                    agent_scores[metric] = score
+                    if score >= self.threshold:
+                        reasons.append(f"{metric} is {score} std devs from baseline")
+                else:
+                    agent_scores[metric] = None
+                    limit = self.static_limits.get(metric)
+                    if limit is not None and value >= limit:
+                        reasons.append(f"{metric} {value} exceeds limit {limit} (baseline warming up)")
+                index += 1
+            known = [s for s in agent_scores.values() if s is not None]
+            decision = PrefilterDecision(agent, bool(reasons), max(known) if known else None, agent_scores, reasons)
+            self._record(decision, observations)
+            decisions.append(decision)
+        return decisions
+
+    def _record(self, decision: PrefilterDecision, observations: Dict[str, float]):
+        if self.learn:
+            self._follow_level_shifts(decision.agent_name, observations)
+        if decision.escalate:
+            self.escalated += 1
+            logger.info(f"Escalating {decision.agent_name} to anomaly detector: {'; '.join(decision.reasons)}")
+            return
+        self.gated += 1
+        if self.learn:
+            self.store.observe_many(decision.agent_name, observations)
+
+    def _follow_level_shifts(self, agent_name: str, observations: Dict[str, float]):
+        for metric, value in observations.items():
+            change = self.change_monitor.observe(agent_name, metric, value)
+            if change is not None and self.store.rebase(agent_name, metric, change.new_level) is not None:
+                logger.info(f"Rebased {agent_name} {metric} baseline to {change.new_level:.4g} after a level shift")
+
+    def stats(self) -> Dict[str, Any]:
+        """Gated vs. escalated counters."""
+        total = self.gated + self.escalated
+        return {
+            "evaluated": total,
+            "gated": self.gated,
+            "escalated": self.escalated,
+            "gate_rate": round(self.gated / total, 4) if total else 0.0,
+        }
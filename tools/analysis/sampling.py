@@ -0,0 +1,238 @@
+"""Tail-based trace sampling that always keeps errors and slow traces.
+
+Spans are buffered per trace until the root span arrives or the trace has
+waited `decision_wait_seconds`. Then the whole trace is either kept or
+dropped:
+
+- traces with an error, a 429 or latency above the per-operation p99 are
+  always kept, with weight 1;
+- other traces go through a per-operation reservoir, and each trace kept
+  from it carries weight `seen / kept`, so counts and rates computed with
+  `DetectorEngine(weight_field="sample_weight")` stay unbiased.
+
+Spans held in memory, pending or in a reservoir, are bounded by
+`max_buffered_spans`. When the bound is hit, the reservoir window is closed
+early if it holds spans (its samples are emitted with their weights so far);
+otherwise the oldest pending trace is decided early with the spans it has.
+Spans beyond `max_spans_per_trace` are dropped, but they still mark the trace
+as interesting if they carry an error. Reservoirs hold at most
+`reservoir_size` traces per operation until `close_window` emits them.
+Latency profiles are kept for the `max_operations` most recently seen
+operations, so memory does not grow with operation cardinality.
+"""
+
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from tools.analysis.ingestion import to_status_code
+from tools.analysis.sketches import QuantileSketch
+
+
+@dataclass
+class SampledTrace:
+    """A sampling decision for one complete (or timed out) trace."""
+    trace_id: Any
+    spans: List[Dict[str, Any]]
+    weight: float
+    reason: str  # "error", "rate_limited", "slow" or "reservoir"
+
+
+@dataclass
+class _PendingTrace:
+    first_seen: float
+    spans: List[Dict[str, Any]] = field(default_factory=list)
+    root: Optional[Dict[str, Any]] = None
+    reason: Optional[str] = None
+
+
+@dataclass
+class _Reservoir:
+    seen: int = 0
+    items: List[SampledTrace] = field(default_factory=list)
+
+
+@dataclass
+class _LatencyProfile:
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+    threshold_ms: Optional[float] = None
+
+
+def _span_reason(span: Dict[str, Any]) -> Optional[str]:
+    status_code = to_status_code(span.get("status_code"))
+    if status_code == 429:
+        return "rate_limited"
+    if span.get("error_type") or status_code >= 500:
+        return "error"
+    return None
+
+
+class TailSampler:
+    """Buffer spans per trace and keep every interesting trace plus a weighted sample of the rest."""
+
+    def __init__(
+        self,
+        decision_wait_seconds: float = 30.0,
+        max_buffered_spans: int = 100_000,
+        max_spans_per_trace: int = 1_000,
+        reservoir_size: int = 100,
+        latency_quantile: float = 0.99,
+        min_latency_samples: int = 100,
+        max_operations: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None
+    ):
+        self.decision_wait_seconds = decision_wait_seconds
+        self.max_buffered_spans = max_buffered_spans
+        self.max_spans_per_trace = max_spans_per_trace
+        self.reservoir_size = reservoir_size
+        self.latency_quantile = latency_quantile
+        self.min_latency_samples = min_latency_samples
+        self.max_operations = max_operations
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._pending: "OrderedDict[Any, _PendingTrace]" = OrderedDict()
+        self._reservoirs: Dict[str, _Reservoir] = {}
+        self._latency: "OrderedDict[str, _LatencyProfile]" = OrderedDict()
+        self.buffered_spans = 0  # in pending traces
+        self.reservoir_spans = 0  # in reservoir samples not yet emitted
+        self.stats = {
+            "traces_decided": 0,
+            "kept_interesting": 0,
+            "kept_reservoir": 0,
+            "dropped": 0,
+            "decided_early": 0,
+            "spans_truncated": 0,
+            "windows_closed_early": 0,
+        }
+
+    def add(self, span: Dict[str, Any], now: Optional[float] = None) -> List[SampledTrace]:
+        """Buffer one span; returns traces kept by decisions this call triggered."""
+        now = self.clock() if now is None else now
+        trace_id = span.get("trace_id")
+        pending = self._pending.get(trace_id)
+        if pending is None:
+            pending = self._pending[trace_id] = _PendingTrace(first_seen=now)
+
+        reason = _span_reason(span)
+        if reason and pending.reason != "error":
+            pending.reason = reason
+        if len(pending.spans) < self.max_spans_per_trace:
+            pending.spans.append(span)
+            self.buffered_spans += 1
+        else:
+            self.stats["spans_truncated"] += 1
+
+        kept: List[SampledTrace] = []
+        if span.get("parent_id") is None:
+            pending.root = span
+            kept.extend(self._decide(trace_id))
+        while self.buffered_spans + self.reservoir_spans > self.max_buffered_spans:
+            if self.reservoir_spans:
+                self.stats["windows_closed_early"] += 1
+                kept.extend(self.close_window())
+            elif self._pending:
+                self.stats["decided_early"] += 1
+                kept.extend(self._decide(next(iter(self._pending))))
+            else:
+                break
+        return kept
+
+    def extend(self, spans: Iterable[Dict[str, Any]], now: Optional[float] = None) -> List[SampledTrace]:
+        """Buffer many spans."""
+        kept: List[SampledTrace] = []
+        for span in spans:
+            kept.extend(self.add(span, now))
+        return kept
+
+    def expire(self, now: Optional[float] = None) -> List[SampledTrace]:
+        """Decide every trace that has waited longer than `decision_wait_seconds`."""
+        now = self.clock() if now is None else now
+        kept: List[SampledTrace] = []
+        # Pending traces are in arrival order, so stop at the first young one
+        while self._pending:
+            trace_id, pending = next(iter(self._pending.items()))
+            if now - pending.first_seen < self.decision_wait_seconds:
+                break
+            kept.extend(self._decide(trace_id))
+        return kept
+
+    def flush(self) -> List[SampledTrace]:
+        """Decide all pending traces and close the reservoir window."""
+        kept: List[SampledTrace] = []
+        while self._pending:
+            kept.extend(self._decide(next(iter(self._pending))))
+        return kept + self.close_window()
+
+    def close_window(self) -> List[SampledTrace]:
+        """Emit the reservoir samples of the current window with their weights."""
+        kept: List[SampledTrace] = []
+        for reservoir in self._reservoirs.values():
+            if not reservoir.items:
+                continue
+            weight = reservoir.seen / len(reservoir.items)
+            for sampled in reservoir.items:
+                sampled.weight = weight
+                kept.append(sampled)
+        self.stats["kept_reservoir"] += len(kept)
+        self._reservoirs = {}
+        self.reservoir_spans = 0
+        return kept
+
+    def _decide(self, trace_id: Any) -> List[SampledTrace]:
+        pending = self._pending.pop(trace_id)
+        self.buffered_spans -= len(pending.spans)
+        self.stats["traces_decided"] += 1
+
+        root = pending.root or min(pending.spans, key=lambda s: str(s.get("timestamp")))
+        operation = root.get("operation") or "unknown"
+        duration_ms = root.get("duration_ms") or max((s.get("duration_ms") or 0) for s in pending.spans)
+        reason = pending.reason
+        if reason is None and self._is_slow(operation, duration_ms):
+            reason = "slow"
+
+        if reason is not None:
+            self.stats["kept_interesting"] += 1
+            return [SampledTrace(trace_id, pending.spans, 1.0, reason)]
+
+        reservoir = self._reservoirs.get(operation)
+        if reservoir is None:
+            reservoir = self._reservoirs[operation] = _Reservoir()
+        reservoir.seen += 1
+        sampled = SampledTrace(trace_id, pending.spans, 1.0, "reservoir")
+        if len(reservoir.items) < self.reservoir_size:
+            reservoir.items.append(sampled)
+            self.reservoir_spans += len(sampled.spans)
+        else:
+            slot = self.rng.randrange(reservoir.seen)
+            if slot < self.reservoir_size:
+                self.reservoir_spans += len(sampled.spans) - len(reservoir.items[slot].spans)
+                reservoir.items[slot] = sampled
+            self.stats["dropped"] += 1
+        return []
+
+    def _is_slow(self, operation: str, duration_ms: float) -> bool:
+        """Compare against the operation's latency quantile, then learn from this trace."""
+        profile = self._latency.get(operation)
+        if profile is None:
+            profile = self._latency[operation] = _LatencyProfile()
+            if len(self._latency) > self.max_operations:
+                self._latency.popitem(last=False)  # least recently seen operation
+        else:
+            self._latency.move_to_end(operation)
+        slow = profile.threshold_ms is not None and duration_ms > profile.threshold_ms
+        profile.sketch.add(duration_ms)
+        count = profile.sketch.count
+        # Refresh the cached threshold every 64 traces once warmed up
+        if count >= self.min_latency_samples and count % 64 == 0:
+            profile.threshold_ms = profile.sketch.quantile(self.latency_quantile)
+        return slow
+
+
+def weighted_spans(sampled: Iterable[SampledTrace], weight_field: str = "sample_weight") -> Iterator[Dict[str, Any]]:
+    """Flatten sampled traces into spans tagged with their sampling weight."""
+    for trace in sampled:
+        for span in trace.spans:
+            yield {**span, weight_field: trace.weight}
@@ -0,0 +1,180 @@
+"""Seasonal (hour-of-week) baselines for anomaly detection.
+
+Every agent x metric series gets `buckets` seasonal buckets (168 hour-of-week
+buckets by default), each holding a streaming count/mean/M2. All series live
+in one contiguous `(series, buckets, 3)` NumPy array, so memory per series is
+fixed (2 KB at the default float32 with 168 buckets) and the bucket for a
+timestamp is found with arithmetic alone. `save` writes the whole array;
+`save_if_due` limits that to once per interval, and only after changes.
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.analysis.ingestion import to_epoch_seconds
+
+# 1970-01-01 was a Thursday; shift so bucket 0 starts on Monday 00:00 UTC
+_EPOCH_WEEKDAY_OFFSET = 3 * 86400
+
+COUNT, MEAN, M2 = 0, 1, 2
+
+
+def _epoch(timestamp: Any) -> float:
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return to_epoch_seconds(timestamp)
+
+
+class SeasonalBaselines:
+    """Per-series, per-bucket streaming mean/variance in one contiguous array."""
+
+    def __init__(
+        self,
+        buckets: int = 168,
+        bucket_seconds: int = 3600,
+        min_samples: int = 5,
+        capacity: int = 64,
+        dtype: Any = np.float32,
+        clock=time.monotonic
+    ):
+        self.buckets = buckets
+        self.bucket_seconds = bucket_seconds
+        self.period_seconds = buckets * bucket_seconds
+        self.min_samples = min_samples
+        self.stats = np.zeros((capacity, buckets, 3), dtype=dtype)
+        self.clock = clock
+        self.dirty = False  # changed since the last save
+        self._saved_at = clock()
+        self._series: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    @property
+    def bytes_per_series(self) -> int:
+        return self.buckets * 3 * self.stats.itemsize
+
+    def bucket(self, timestamp: Any) -> int:
+        """Seasonal bucket of a timestamp (hour of week, Monday 00:00 UTC = 0)."""
+        return int(((_epoch(timestamp) + _EPOCH_WEEKDAY_OFFSET) % self.period_seconds) // self.bucket_seconds)
+
+    def buckets_for(self, epoch_seconds: Any) -> np.ndarray:
+        """Vectorized `bucket` for an array of epoch seconds."""
+        epoch_seconds = np.asarray(epoch_seconds, dtype=np.float64)
+        return (((epoch_seconds + _EPOCH_WEEKDAY_OFFSET) % self.period_seconds) // self.bucket_seconds).astype(np.intp)
+
+    def series_id(self, agent: str, metric: str, create: bool = True) -> Optional[int]:
+        """Row of the series in `stats`, allocated on first use when `create` is set."""
+        key = (agent, metric)
+        row = self._series.get(key)
+        if row is None and create:
+            row = self._series[key] = len(self._series)
+            if row >= len(self.stats):
+                grown = np.zeros((2 * len(self.stats), self.buckets, 3), dtype=self.stats.dtype)
+                grown[:len(self.stats)] = self.stats
+                self.stats = grown
+        return row
+
+    def observe(self, agent: str, metric: str, value: float, timestamp: Any):
+        """Fold one sample into the bucket matching `timestamp`."""
+        cell = self.stats[self.series_id(agent, metric), self.bucket(timestamp)]
+        count = cell[COUNT] + 1
+        delta = value - cell[MEAN]
+        mean = cell[MEAN] + delta / count
+        cell[M2] += delta * (value - mean)
+        cell[MEAN] = mean
+        cell[COUNT] = count
+        self.dirty = True
+
+    def shift(self, agent: str, metric: str, delta: float):
+        """Move every bucket of a series by `delta`, e.g. after a confirmed level shift; the seasonal shape is kept."""
+        row = self.series_id(agent, metric, create=False)
+        if row is None:
+            return
+        seen = self.stats[row, :, COUNT] > 0
+        self.stats[row, seen, MEAN] += delta
+        self.dirty = True
+
+    def baseline(self, agent: str, metric: str, timestamp: Any) -> Optional[Dict[str, float]]:
+        """Mean, std_dev and sample count of the matching bucket, or None if unseen."""
+        row = self.series_id(agent, metric, create=False)
+        if row is None:
+            return None
+        count, mean, m2 = self.stats[row, self.bucket(timestamp)].tolist()
+        std_dev = (m2 / (count - 1)) ** 0.5 if count > 1 else 0.0
+        return {"bucket": self.bucket(timestamp), "mean": mean, "std_dev": std_dev, "samples": int(count)}
+
+    def score(self, agent: str, metric: str, value: float, timestamp: Any) -> Optional[float]:
+        """Z-score against the matching bucket, or None while it has fewer than `min_samples`."""
+        baseline = self.baseline(agent, metric, timestamp)
+        if baseline is None or baseline["samples"] < self.min_samples:
+            return None
+        if baseline["std_dev"] == 0:
+            return 0.0
+        return abs(value - baseline["mean"]) / baseline["std_dev"]
+
+    def score_batch(self, series: Sequence[int], epoch_seconds: Any, values: Any) -> np.ndarray:
+        """Z-scores for many (series, time, value) observations; NaN where a bucket is too young."""
+        cells = self.stats[np.asarray(series, dtype=np.intp), self.buckets_for(epoch_seconds)].astype(np.float64)
+        count, mean, m2 = cells[:, COUNT], cells[:, MEAN], cells[:, M2]
+        variance = np.divide(m2, count - 1, out=np.zeros_like(m2), where=count > 1)
+        std_dev = np.sqrt(variance)
+        scores = np.zeros_like(mean)
+        np.divide(np.abs(np.asarray(values, dtype=np.float64) - mean), std_dev, out=scores, where=std_dev > 0)
+        scores[count < self.min_samples] = np.nan
+        return scores
+
+    def save(self, path: str):
+        """Write the array and series index atomically (temp file, then rename)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".seasonal-", suffix=".npz", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                np.savez(
+                    handle,
+                    stats=self.stats[:len(self._series)],
+                    meta=np.array(json.dumps({
+                        "buckets": self.buckets,
+                        "bucket_seconds": self.bucket_seconds,
+                        "min_samples": self.min_samples,
+                        "series": [[agent, metric] for agent, metric in self._series],
+                    }))
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.dirty = False
+        self._saved_at = self.clock()
+
+    def save_if_due(self, path: str, interval_seconds: float) -> bool:
+        """Save to `path` if anything changed and `interval_seconds` passed since the last save."""
+        if not self.dirty or self.clock() - self._saved_at < interval_seconds:
+            return False
+        self.save(path)
+        return True
+
+    @classmethod
+    def load(cls, path: str) -> "SeasonalBaselines":
+        """Load baselines written by `save`."""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            stats = data["stats"]
+        baselines = cls(
+            buckets=meta["buckets"],
+            bucket_seconds=meta["bucket_seconds"],
+            min_samples=meta["min_samples"],
+            capacity=max(len(stats), 1),
+            dtype=stats.dtype
+        )
+        baselines.stats[:len(stats)] = stats
+        baselines._series = {(agent, metric): row for row, (agent, metric) in enumerate(meta["series"])}
+        return baselines
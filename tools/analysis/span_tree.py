@@ -0,0 +1,225 @@
+"""Span-tree reconstruction and critical-path analysis for multi-step workflows.
+
+Flat spans (trace_id, span_id, parent_id) are grouped into trees with hash
+lookups in a single pass, in whatever order they arrive. All tree walks use
+explicit stacks, so deep workflows never hit Python's recursion limit.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tools.analysis.ingestion import to_epoch_seconds
+
+
+class Span:
+    """One span in a reconstructed tree."""
+
+    __slots__ = ("span_id", "parent_id", "operation", "start", "end", "error", "children")
+
+    def __init__(self, span_id: Any, parent_id: Any, operation: str, start: float, end: float, error: bool):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.operation = operation
+        self.start = start
+        self.end = end
+        self.error = error
+        self.children: List["Span"] = []
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) * 1000
+
+    @classmethod
+    def from_trace(cls, trace: Dict[str, Any]) -> "Span":
+        """Build a span from a flat trace dict (see `ingestion.otlp_span_to_trace`)."""
+        start = to_epoch_seconds(trace.get("timestamp")) or 0.0
+        duration_ms = trace.get("duration_ms") or 0.0
+        error = bool(trace.get("error_type")) or (trace.get("status_code") or 0) >= 400
+        return cls(
+            trace.get("span_id"),
+            trace.get("parent_id"),
+            trace.get("operation") or "unknown",
+            start,
+            start + duration_ms / 1000,
+            error,
+        )
+
+
+class SpanTree:
+    """All spans of one trace linked into a tree (or forest, if parents are missing)."""
+
+    def __init__(self, trace_id: Any, spans: List[Span]):
+        self.trace_id = trace_id
+        self.spans = spans
+        by_id = {span.span_id: span for span in spans}
+        self.roots: List[Span] = []
+        for span in spans:
+            parent = by_id.get(span.parent_id) if span.parent_id is not None else None
+            if parent is None or parent is span:
+                self.roots.append(span)  # true root, or orphan whose parent never arrived
+            else:
+                parent.children.append(span)
+
+    @property
+    def start(self) -> float:
+        return min(span.start for span in self.spans)
+
+    @property
+    def end(self) -> float:
+        return max(span.end for span in self.spans)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) * 1000
+
+    def walk(self) -> Iterator[Span]:
+        """Depth-first pre-order walk over every reachable span."""
+        stack = list(reversed(self.roots))
+        while stack:
+            span = stack.pop()
+            yield span
+            stack.extend(reversed(span.children))
+
+    def self_time_ms(self, span: Span) -> float:
+        """Span duration not covered by any of its children."""
+        covered = 0.0
+        cursor = span.start
+        for child in sorted(span.children, key=lambda c: c.start):
+            child_start = max(child.start, cursor)
+            child_end = min(child.end, span.end)
+            if child_end > child_start:
+                covered += child_end - child_start
+                cursor = child_end
+        return max(0.0, span.duration_ms - covered * 1000)
+
+    def critical_path(self) -> List[Tuple[Span, float]]:
+        """
+        Spans on the critical path with the milliseconds each is critical for.
+
+        Working back from the end of a span, the child that finishes last is
+        critical; time before that child started is attributed to the next
+        child that finished before it, and remaining gaps to the span itself.
+        """
+        critical: Dict[int, float] = defaultdict(float)
+        order: List[Span] = []
+        # Virtual root over all real roots so orphaned subtrees are included
+        stack: List[Tuple[Optional[Span], List[Span], float, float]] = [(None, self.roots, self.start, self.end)]
+        while stack:
+            span, children, window_start, window_end = stack.pop()
+            cursor = window_end
+            for child in sorted(children, key=lambda c: c.end, reverse=True):
+                if cursor <= window_start:
+                    break
+                if child.start >= cursor:
+                    continue  # ran concurrently with a later critical child
+                child_end = min(child.end, cursor)
+                if span is not None:
+                    critical[id(span)] += cursor - child_end
+                child_start = max(child.start, window_start)
+                stack.append((child, child.children, child_start, child_end))
+                cursor = child_start
+            if span is not None:
+                critical[id(span)] += cursor - window_start
+                order.append(span)
+        order.sort(key=lambda s: s.start)
+        return [(span, critical[id(span)] * 1000) for span in order]
+
+    def error_root_causes(self) -> List[Span]:
+        """Failed spans none of whose children failed (where errors originate)."""
+        return [span for span in self.walk() if span.error and not any(c.error for c in span.children)]
+
+
+class SpanTreeBuilder:
+    """Collect flat spans in any order and emit one tree per trace."""
+
+    def __init__(self):
+        self._spans: Dict[Any, List[Span]] = defaultdict(list)
+
+    def add(self, trace: Dict[str, Any]):
+        """Add one flat span."""
+        self._spans[trace.get("trace_id")].append(Span.from_trace(trace))
+
+    def extend(self, traces: Iterable[Dict[str, Any]]) -> "SpanTreeBuilder":
+        """Add many flat spans."""
+        for trace in traces:
+            self.add(trace)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def trees(self) -> Iterator[SpanTree]:
+        """Emit and release one tree per trace."""
+        while self._spans:
+            trace_id, spans = self._spans.popitem()
+            yield SpanTree(trace_id, spans)
+
+
+@dataclass
+class OperationStats:
+    """Per-operation aggregate across traces."""
+    spans: int = 0
+    total_ms: float = 0.0
+    self_ms: float = 0.0
+    critical_ms: float = 0.0
+    errors: int = 0
+    root_cause_errors: int = 0
+
+
+class CriticalPathAggregator:
+    """Aggregate critical-path time, self time and error origins per operation."""
+
+    def __init__(self):
+        self.operations: Dict[str, OperationStats] = defaultdict(OperationStats)
+        self.traces = 0
+        self.failed_traces = 0
+        self.end_to_end_ms = 0.0
+
+    def add(self, tree: SpanTree):
+        """Fold one trace into the aggregate."""
+        self.traces += 1
+        self.end_to_end_ms += tree.duration_ms
+        for span in tree.walk():
+            stats = self.operations[span.operation]
+            stats.spans += 1
+            stats.total_ms += span.duration_ms
+            stats.self_ms += tree.self_time_ms(span)
+            if span.error:
+                stats.errors += 1
+        for span, critical_ms in tree.critical_path():
+            self.operations[span.operation].critical_ms += critical_ms
+        root_causes = tree.error_root_causes()
+        for span in root_causes:
+            self.operations[span.operation].root_cause_errors += 1
+        if any(root.error for root in tree.roots) or root_causes:
+            self.failed_traces += 1
+
+    def summary(self, top: int = 10) -> Dict[str, Any]:
+        """Operations ranked by their share of end-to-end latency on the critical path."""
+        ranked = sorted(self.operations.items(), key=lambda item: item[1].critical_ms, reverse=True)
+        return {
+            "traces": self.traces,
+            "failed_traces": self.failed_traces,
+            "mean_end_to_end_ms": round(self.end_to_end_ms / self.traces, 2) if self.traces else 0.0,
+            "operations": [
+                {
+                    "operation": operation,
+                    "spans": stats.spans,
+                    "critical_path_share": round(stats.critical_ms / self.end_to_end_ms, 4) if self.end_to_end_ms else 0.0,
+                    "mean_critical_ms": round(stats.critical_ms / self.traces, 2),
+                    "mean_self_ms": round(stats.self_ms / stats.spans, 2),
+                    "errors": stats.errors,
+                    "root_cause_errors": stats.root_cause_errors,
+                }
+                for operation, stats in ranked[:top]
+            ],
+        }
+
+
+def analyze_span_trees(traces: Iterable[Dict[str, Any]], top: int = 10) -> Dict[str, Any]:
+    """Rebuild span trees from flat traces and aggregate critical paths per operation."""
+    aggregator = CriticalPathAggregator()
+    for tree in SpanTreeBuilder().extend(traces).trees():
+        aggregator.add(tree)
+    return aggregator.summary(top=top)
@@ -0,0 +1,205 @@
+"""Online error-message template mining (Drain-style) for pattern fingerprinting.
+
+Free-text error messages that differ only in IDs and numbers are folded into
+one template, e.g. "Timeout after <*> ms calling <*>". Each message walks a
+fixed-depth parse tree (token count, then the first few tokens) to a small
+leaf of candidate templates, so matching costs roughly the same whatever the
+number of templates seen. Exact repeats are answered from a bounded cache.
+"""
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.analysis.detector_engine import Accumulator
+
+WILDCARD = "<*>"
+
+# Tokens that are almost always variables: UUIDs, hex ids, IPs, numbers with units
+_VARIABLE_PATTERNS = [
+    re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"),
+    re.compile(r"^(0x)?[0-9a-fA-F]{12,}$"),
+    re.compile(r"^\d{1,3}(\.\d{1,3}){3}(:\d+)?$"),
+    re.compile(r"^[-+]?\d+(\.\d+)?[a-zA-Z%]{0,3}$"),
+]
+_TRIM = ",;:()[]{}'\""
+
+
+def _tokenize(message: str) -> List[str]:
+    tokens = []
+    for token in message.split():
+        core = token.strip(_TRIM) or token
+        if any(p.match(core) for p in _VARIABLE_PATTERNS):
+            tokens.append(WILDCARD)
+        else:
+            tokens.append(token)
+    return tokens
+
+
+@dataclass
+class Template:
+    """One mined template and its occurrence statistics."""
+    template_id: str
+    tokens: List[str]
+    count: int = 0
+    first_occurrence: Optional[str] = None
+    last_occurrence: Optional[str] = None
+    affected_operations: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "template_id": self.template_id,
+            "template": self.text,
+            "frequency": self.count,
+            "first_occurrence": self.first_occurrence,
+            "last_occurrence": self.last_occurrence,
+            "affected_operations": list(self.affected_operations),
+        }
+
+
+@dataclass
+class TemplateMatch:
+    """Result of mining one message."""
+    template_id: str
+    template: str
+    parameters: List[str]
+    is_new: bool
+
+
+class TemplateMiner:
+    """Drain-style online template miner with a fixed-depth parse tree."""
+
+    def __init__(
+        self,
+        depth: int = 4,
+        similarity_threshold: float = 0.5,
+        max_children: int = 100,
+        max_templates_per_leaf: int = 32,
+        cache_size: int = 10_000,
+        max_operations: int = 20
+    ):
+        self.prefix_tokens = max(1, depth - 2)
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.max_templates_per_leaf = max_templates_per_leaf
+        self.cache_size = cache_size
+        self.max_operations = max_operations
+        self.templates: Dict[str, Template] = {}
+        self._tree: Dict[Any, Any] = {}
+        self._cache: "OrderedDict[Tuple[str, ...], Template]" = OrderedDict()
+        self._next_id = 1
+        self.cache_hits = 0
+        self.messages = 0
+
+    def add(self, message: str, timestamp: Any = None, operation: Optional[str] = None) -> TemplateMatch:
+        """Mine one message and record the occurrence against its template."""
+        self.messages += 1
+        raw = message.split()
+        tokens = _tokenize(message)
+        key = tuple(tokens)
+        is_new = False
+
+        template = self._cache.get(key)
+        if template is not None and template.template_id in self.templates:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+        else:
+            leaf = self._leaf(tokens)
+            template = self._best_match(leaf, tokens)
+            if template is None:
+                template = self._create(leaf, tokens)
+                is_new = True
+            else:
+                self._merge(template, tokens)
+            self._cache[key] = template
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        self._record(template, timestamp, operation)
+        parameters = [raw[i] for i, t in enumerate(template.tokens) if t == WILDCARD and i < len(raw)]
+        return TemplateMatch(template.template_id, template.text, parameters, is_new)
+
+    def _leaf(self, tokens: List[str]) -> List[Template]:
+        """Walk (or grow) the parse tree: token count, then the first tokens."""
+        node = self._tree.setdefault(len(tokens), {})
+        for token in tokens[:self.prefix_tokens]:
+            if any(ch.isdigit() for ch in token):
+                token = WILDCARD
+            child = node.get(token)
+            if child is None:
+                if len(node) >= self.max_children:
+                    token = WILDCARD  # overflow bucket keeps the tree bounded
+                    child = node.get(token)
+                if child is None:
+                    child = node[token] = {}
+            node = child
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf: List[Template], tokens: List[str]) -> Optional[Template]:
+        best, best_score = None, -1.0
+        for template in leaf:
+            same = sum(1 for a, b in zip(template.tokens, tokens) if a == b or a == WILDCARD)
+            score = same / len(tokens) if tokens else 1.0
+            if score > best_score:
+                best, best_score = template, score
+        if best is not None and best_score >= self.similarity_threshold:
+            # Move to front so hot templates are compared first
+            leaf.remove(best)
+            leaf.insert(0, best)
+            return best
+        return None
+
+    def _create(self, leaf: List[Template], tokens: List[str]) -> Template:
+        template = Template(f"tpl_{self._next_id}", list(tokens))
+        self._next_id += 1
+        leaf.insert(0, template)
+        self.templates[template.template_id] = template
+        if len(leaf) > self.max_templates_per_leaf:
+            evicted = leaf.pop()  # least recently matched
+            self.templates.pop(evicted.template_id, None)
+        return template
+
+    @staticmethod
+    def _merge(template: Template, tokens: List[str]):
+        for i, (current, token) in enumerate(zip(template.tokens, tokens)):
+            if current != token and current != WILDCARD:
+                template.tokens[i] = WILDCARD
+
+    def _record(self, template: Template, timestamp: Any, operation: Optional[str]):
+        template.count += 1
+        if timestamp is not None:
+            if template.first_occurrence is None:
+                template.first_occurrence = str(timestamp)
+            template.last_occurrence = str(timestamp)
+        if (operation and operation not in template.affected_operations
+                and len(template.affected_operations) < self.max_operations):
+            template.affected_operations.append(operation)
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Most frequent templates first."""
+        ranked = sorted(self.templates.values(), key=lambda t: t.count, reverse=True)
+        return [template.to_dict() for template in ranked[:n]]
+
+
+class TemplateAccumulator(Accumulator):
+    """Detector-engine accumulator that mines the error messages of failed traces."""
+
+    name = "error_templates"
+    fields = ("error_message", "timestamp", "operation")
+
+    def __init__(self, miner: Optional[TemplateMiner] = None, top: int = 10):
+        self.miner = miner or TemplateMiner()
+        self.top_n = top
+
+    def update(self, error_message, timestamp, operation):
+        if error_message:
+            self.miner.add(str(error_message), timestamp, operation)
+
+    def result(self, total: int) -> List[Dict[str, Any]]:
+        return self.miner.top(self.top_n)
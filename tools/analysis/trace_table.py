@@ -0,0 +1,186 @@
+"""Columnar in-memory trace store for ad-hoc pattern queries.
+
+Numeric fields are held in NumPy arrays and categorical fields are
+dictionary-encoded into integer codes with a sorted index, so filters and
+counts are vectorized instead of scanning a list of dicts.
+
+Example:
+    table = TraceTable.from_traces(traces)
+    table.count(error_type="timeout")
+    table.count(status_code=429, operation=["api_call_1", "api_call_2"])
+    table.group_counts("operation", table.filter(error_type="timeout"))
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.analysis.ingestion import to_epoch_seconds, to_status_code
+
+NUMERIC_COLUMNS = ("timestamp", "duration_ms", "status_code")
+CATEGORICAL_COLUMNS = ("error_type", "operation", "agent")
+
+
+class CategoricalColumn:
+    """Dictionary-encoded column with a sorted index over its codes."""
+
+    def __init__(self, codes: np.ndarray, categories: List[Any]):
+        self.codes = codes
+        self.categories = categories
+        self._lookup = {value: code for code, value in enumerate(categories)}
+        # Sorted index: rows of category c are order[offsets[c]:offsets[c + 1]]
+        self._order = np.argsort(codes, kind="stable")
+        self._offsets = np.searchsorted(codes[self._order], np.arange(len(categories) + 1))
+
+    def code(self, value: Any) -> int:
+        """Return the integer code of `value`, or -1 if it never occurs."""
+        return self._lookup.get(value, -1)
+
+    def rows(self, value: Any) -> np.ndarray:
+        """Row numbers holding `value`, from the sorted index."""
+        code = self.code(value)
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        return self._order[self._offsets[code]:self._offsets[code + 1]]
+
+    def count(self, value: Any) -> int:
+        """Number of rows holding `value` in O(1)."""
+        code = self.code(value)
+        if code < 0:
+            return 0
+        return int(self._offsets[code + 1] - self._offsets[code])
+
+    def mask(self, values: Any) -> np.ndarray:
+        """Boolean row mask for one value or a list of values."""
+        if isinstance(values, (list, tuple, set, frozenset)):
+            codes = [c for c in (self.code(v) for v in values) if c >= 0]
+            return np.isin(self.codes, codes)
+        return self.codes == self.code(values)
+
+    def decode(self, rows: Optional[np.ndarray] = None) -> List[Any]:
+        """Decode the codes of `rows` (all rows by default) back to values."""
+        codes = self.codes if rows is None else self.codes[rows]
+        return [self.categories[c] for c in codes]
+
+
+class TraceTable:
+    """Immutable columnar table of trace spans."""
+
+    def __init__(self, numeric: Dict[str, np.ndarray], categorical: Dict[str, CategoricalColumn]):
+        self.numeric = numeric
+        self.categorical = categorical
+
+    @classmethod
+    def from_traces(cls, traces: Iterable[Dict[str, Any]]) -> "TraceTable":
+        """Build a table from trace dicts in one pass."""
+        timestamps: List[float] = []
+        durations: List[float] = []
+        status_codes: List[int] = []
+        encoders: Dict[str, Dict[Any, int]] = {name: {} for name in CATEGORICAL_COLUMNS}
+        codes: Dict[str, List[int]] = {name: [] for name in CATEGORICAL_COLUMNS}
+
+        for trace in traces:
+            get = trace.get
+            timestamp = to_epoch_seconds(get("timestamp"))
+            timestamps.append(np.nan if timestamp is None else timestamp)
+            duration = get("duration_ms")
+            durations.append(np.nan if duration is None else float(duration))
+            status_codes.append(to_status_code(get("status_code")))
+            for name in CATEGORICAL_COLUMNS:
+                encoder = encoders[name]
+                value = get(name)
+                code = encoder.get(value)
+                if code is None:
+                    code = encoder[value] = len(encoder)
+                codes[name].append(code)
+
+        numeric = {
+            "timestamp": np.asarray(timestamps, dtype=np.float64),
+            "duration_ms": np.asarray(durations, dtype=np.float64),
+            "status_code": np.asarray(status_codes, dtype=np.int32),
+        }
+        categorical = {
+            name: CategoricalColumn(np.asarray(codes[name], dtype=np.int32), list(encoders[name]))
+            for name in CATEGORICAL_COLUMNS
+        }
+        return cls(numeric, categorical)
+
+    def __len__(self) -> int:
+        return len(self.numeric["status_code"])
+
+    def filter(self, **conditions: Any) -> np.ndarray:
+        """
+        Return a boolean row mask matching every condition.
+
+        Categorical columns take a value or a list of values. Numeric columns
+        take a value, a list of values, or a `(low, high)` tuple for an
+        inclusive range (either bound may be None).
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, condition in conditions.items():
+            mask &= self._condition_mask(name, condition)
+        return mask
+
+    def _condition_mask(self, name: str, condition: Any) -> np.ndarray:
+        if name in self.categorical:
+            return self.categorical[name].mask(condition)
+        if name not in self.numeric:
+            raise KeyError(f"Unknown trace column '{name}'")
+        column = self.numeric[name]
+        if isinstance(condition, tuple):
+            low, high = condition
+            mask = np.ones(len(column), dtype=bool)
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+            return mask
+        if isinstance(condition, (list, set, frozenset)):
+            return np.isin(column, list(condition))
+        return column == condition
+
+    def count(self, **conditions: Any) -> int:
+        """Count rows matching every condition."""
+        if len(conditions) == 1:
+            (name, value), = conditions.items()
+            if name in self.categorical and not isinstance(value, (list, tuple, set, frozenset)):
+                return self.categorical[name].count(value)
+        return int(np.count_nonzero(self.filter(**conditions)))
+
+    def group_counts(self, column: str, mask: Optional[np.ndarray] = None) -> Dict[Any, int]:
+        """Count rows per value of a categorical column, optionally within `mask`."""
+        encoded = self.categorical[column]
+        codes = encoded.codes if mask is None else encoded.codes[mask]
+        counts = np.bincount(codes, minlength=len(encoded.categories))
+        return {encoded.categories[c]: int(n) for c, n in enumerate(counts) if n}
+
+    def percentile(self, column: str, q: Sequence[float], mask: Optional[np.ndarray] = None) -> List[float]:
+        """Percentiles of a numeric column, ignoring missing values."""
+        values = self.numeric[column] if mask is None else self.numeric[column][mask]
+        if values.size == 0:
+            return [float("nan")] * len(q)
+        return [float(v) for v in np.nanpercentile(values, q)]
+
+    def time_range(self, mask: Optional[np.ndarray] = None) -> Tuple[float, float]:
+        """First and last timestamp (Unix seconds) of the selected rows."""
+        values = self.numeric["timestamp"] if mask is None else self.numeric["timestamp"][mask]
+        if values.size == 0 or np.all(np.isnan(values)):
+            return (float("nan"), float("nan"))
+        return (float(np.nanmin(values)), float(np.nanmax(values)))
+
+    def take(self, mask: np.ndarray) -> "TraceTable":
+        """Return a new table holding only the selected rows."""
+        numeric = {name: column[mask] for name, column in self.numeric.items()}
+        categorical = {
+            name: CategoricalColumn(column.codes[mask], column.categories)
+            for name, column in self.categorical.items()
+        }
+        return TraceTable(numeric, categorical)
+
+    def run_detectors(self, detectors: Iterable[Any]) -> Dict[str, bool]:
+        """Evaluate equality detectors (see `detector_engine.MatchDetector`) with vectorized counts."""
+        total = len(self)
+        return {
+            d.name: d.detected(self.count(**{d.field_name: d.value}), total)
+            for d in detectors
+        }
@@ -0,0 +1,189 @@
+"""In-process OpenTelemetry span processor that feeds the detectors directly.
+
+Register `DetectorSpanProcessor` on a `TracerProvider` in a monitored agent
+(or in the guardian itself). `on_end` only appends a small tuple projection of
+the span to a bounded ring buffer; a background thread drains the buffer in
+batches into the trace detectors and the metrics collector. Spans never leave
+the process to be exported and re-imported. A batch the detectors fail on
+is logged and counted, and the consumer moves on to the next one.
+
+Example:
+    provider = TracerProvider()
+    processor = DetectorSpanProcessor()
+    provider.add_span_processor(processor)
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.trace import StatusCode
+
+from tools.analysis.ingestion import StreamingTraceAnalyzer, nanos_to_iso
+from utils import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+# (trace_id, span_id, parent_id, name, start_ns, end_ns, http_status, error_type, status_error, status_description, resource attributes)
+SpanProjection = Tuple[int, int, Optional[int], str, int, int, Any, Any, bool, Optional[str], Any]
+
+
+class SpanRingBuffer:
+    """
+    Bounded buffer of span projections.
+
+    `deque.append` and `deque.popleft` are atomic under the GIL, so producers
+    on any thread never take a lock. When full, the oldest projection is
+    overwritten and counted as dropped.
+    """
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self._items: deque = deque(maxlen=capacity)
+        self.dropped = 0  # approximate under concurrent producers
+
+    def push(self, item: SpanProjection):
+        """Append one projection (producer side, any thread)."""
+        if len(self._items) == self.capacity:
+            self.dropped += 1
+        self._items.append(item)
+
+    def drain(self, limit: int) -> List[SpanProjection]:
+        """Pop up to `limit` projections, oldest first (single consumer)."""
+        items = []
+        popleft = self._items.popleft
+        try:
+            for _ in range(limit):
+                items.append(popleft())
+        except IndexError:
+            pass
+        return items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def projection_to_trace(item: SpanProjection) -> Dict[str, Any]:
+    """Expand a span projection into the flat trace dict used by the detectors."""
+    trace_id, span_id, parent_id, name, start_ns, end_ns, http_status, error_type, status_error, description, resource = item
+    if error_type is None and status_error:
+        error_type = "error"
+    return {
+        "trace_id": format(trace_id, "032x"),
+        "span_id": format(span_id, "016x"),
+        "parent_id": format(parent_id, "016x") if parent_id is not None else None,
+        "agent": resource.get("service.name") if resource is not None else None,
+        "operation": name,
+        "timestamp": nanos_to_iso(start_ns),
+        "duration_ms": (end_ns - start_ns) / 1e6,
+        "status_code": http_status,
+        "error_type": error_type,
+        "error_message": description if status_error else None,
+    }
+
+
+class DetectorSpanProcessor(SpanProcessor):
+    """Span processor that hands finished spans to the detectors in batches."""
+
+    def __init__(
+        self,
+        analyzer: Optional[StreamingTraceAnalyzer] = None,
+        metrics: Optional[MetricsCollector] = None,
+        capacity: int = 65536,
+        batch_size: int = 1000,
+        flush_interval_seconds: float = 1.0,
+        on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        metrics_window: int = 1024
+    ):
+        self.analyzer = analyzer or StreamingTraceAnalyzer()
+        # Per-batch samples are kept for the latest `metrics_window` batches; totals are in `stats`
+        self.metrics = metrics or MetricsCollector(max_samples=metrics_window)
+        self.stats = {"spans": 0, "span_errors": 0, "batches": 0, "failed_batches": 0}
+        self.buffer = SpanRingBuffer(capacity)
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.on_batch = on_batch
+        self._lock = threading.Lock()  # serializes consumers (worker vs. force_flush)
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="detector-span-consumer", daemon=True)
+        self._worker.start()
+
+    def on_start(self, span, parent_context=None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        """Project the span and push it to the ring buffer; never blocks."""
+        context = span.context
+        parent = span.parent
+        attributes = span.attributes
+        status = span.status
+        self.buffer.push((
+            context.trace_id,
+            context.span_id,
+            parent.span_id if parent is not None else None,
+            span.name,
+            span.start_time,
+            span.end_time,
+            attributes.get("http.response.status_code") or attributes.get("http.status_code"),
+            attributes.get("error.type"),
+            status.status_code is StatusCode.ERROR,
+            status.description,
+            span.resource.attributes,
+        ))
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval_seconds):
+            self._drain_safely()
+        self._drain_safely()
+
+    def _drain_safely(self):
+        # The consumer thread must outlive any bad batch, or every later span is dropped
+        try:
+            self._drain()
+        except Exception:
+            logger.exception("Span consumer failed to drain the buffer")
+
+    def _drain(self) -> int:
+        """Feed everything currently buffered to the detectors; returns spans consumed."""
+        consumed = 0
+        with self._lock:
+            while True:
+                items = self.buffer.drain(self.batch_size)
+                if not items:
+                    break
+                self._process([projection_to_trace(item) for item in items])
+                consumed += len(items)
+        return consumed
+
+    def _process(self, batch: List[Dict[str, Any]]):
+        self.stats["batches"] += 1
+        try:
+            self.analyzer.update(batch)
+        except Exception:
+            self.stats["failed_batches"] += 1
+            logger.exception(f"Trace detectors failed on a batch of {len(batch)} spans; skipping it")
+        errors = sum(1 for t in batch if t["error_type"])
+        self.stats["spans"] += len(batch)
+        self.stats["span_errors"] += errors
+        self.metrics.record("otel.spans", len(batch))
+        self.metrics.record("otel.span_errors", errors)
+        self.metrics.record("otel.mean_span_duration_ms", sum(t["duration_ms"] for t in batch) / len(batch))
+        if self.on_batch is not None:
+            try:
+                self.on_batch(batch)
+            except Exception:
+                logger.exception("Span batch callback failed")
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Synchronously feed all buffered spans to the detectors."""
+        self._drain()
+        return True
+
+    def shutdown(self) -> None:
+        """Stop the consumer thread after draining the buffer."""
+        self._stopped.set()
+        self._worker.join()
+        if self.buffer.dropped:
+            logger.warning(f"Dropped {self.buffer.dropped} spans because the ring buffer was full")
@@ -0,0 +1,321 @@
+"""Content-addressed, incremental checkpoint store for agent state.
+
+State is split into content-defined chunks: a rolling sum of per-byte
+random values over a 48-byte window marks a boundary wherever its low bits
+are zero, so an insertion only moves the boundaries next to it. Each chunk
+is stored once under its SHA-256 in `chunks/`, and a checkpoint is a small
+JSON manifest listing its chunks. Writing a checkpoint stores only chunks
+that no earlier checkpoint contained, so the bytes written scale with how
+much changed. Restores memory-map the chunk files one at a time and copy
+each one straight into the output buffer or file, without intermediate
+copies.
+
+Layout under `root`:
+    chunks/<first two hex digits>/<sha256>
+    manifests/<agent>/<checkpoint_id>.json
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_WINDOW = 48
+_BLOCK = 1 << 20
+# Fixed seed: boundaries must be identical across processes and restarts
+_BYTE_VALUES = np.random.default_rng(0x6A09E667).integers(0, 2 ** 32, 256, dtype=np.uint64).astype(np.uint32)
+
+
+def chunk_boundaries(data: Any, average: int = 65536, minimum: Optional[int] = None,
+                     maximum: Optional[int] = None) -> List[int]:
+    """End offsets of the content-defined chunks of `data`.
+
+    `average` must be a power of two; chunks are kept between `minimum`
+    (default average/4) and `maximum` (default average*4) bytes.
+    """
+    if average <= 0 or average & (average - 1) or average > 2 ** 31:
+        raise ValueError("average chunk size must be a power of two")
+    minimum = average // 4 if minimum is None else minimum
+    maximum = average * 4 if maximum is None else maximum
+    raw = np.frombuffer(data, dtype=np.uint8)
+    size = len(raw)
+    mask = np.uint32(average - 1)
+
+    candidates = []
+    for start in range(0, size, _BLOCK):
+        low = max(start - _WINDOW, 0)
+        sums = np.cumsum(np.take(_BYTE_VALUES, raw[low:start + _BLOCK]), dtype=np.uint32)
+        if len(sums) <= _WINDOW:
+            break
+        # Sum of the window ending at byte low + _WINDOW + i; uint32 arithmetic wraps,
+        # which keeps the differences exact
+        window = sums[_WINDOW:] - sums[:-_WINDOW]
+        hits = np.flatnonzero((window & mask) == 0)
+        candidates.extend((hits + low + _WINDOW + 1).tolist())  # cut after the window's last byte
+
+    cuts: List[int] = []
+    last = 0
+    for cut in candidates:
+        while cut - last > maximum:
+            last += maximum
+            cuts.append(last)
+        if cut - last >= minimum:
+            cuts.append(cut)
+            last = cut
+    while size - last > maximum:
+        last += maximum
+        cuts.append(last)
+    if last < size:
+        cuts.append(size)
+    return cuts
+
+
+@dataclass
+class CheckpointManifest:
+    """Chunk list of one checkpoint."""
+    agent_name: str
+    checkpoint_id: str
+    size: int
+    chunks: List[Tuple[str, int]]  # (sha256, length) in order
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CheckpointManifest":
+        data = dict(data)
+        data["chunks"] = [tuple(chunk) for chunk in data["chunks"]]
+        return cls(**data)
+
+
+@dataclass
+class CheckpointWrite:
+    """What writing a checkpoint cost."""
+    checkpoint_id: str
+    size: int
+    chunks: int
+    new_chunks: int
+    bytes_written: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return asdict(self)
+
+
+class CheckpointView:
+    """Chunks of one checkpoint, memory-mapped one at a time; close (or use as a context manager) when done.
+
+    Only the chunk being read is mapped, so a view holds at most one file
+    descriptor however many chunks the checkpoint has.
+    """
+
+    def __init__(self, manifest: CheckpointManifest, paths: List[str]):
+        self.manifest = manifest
+        self._paths = paths
+        self._current: Optional[mmap.mmap] = None
+
+    def __len__(self) -> int:
+        return self.manifest.size
+
+    def __enter__(self) -> "CheckpointView":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def chunks(self) -> Iterator[memoryview]:
+        """Chunks in order, as zero-copy views of the mapped files.
+
+        Each view is released, and its map closed, when the next chunk is requested.
+        """
+        for path in self._paths:
+            with open(path, "rb") as handle:
+                self._current = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(self._current)
+            try:
+                yield view
+            finally:
+                view.release()
+                self.close()
+
+    def readinto(self, buffer: Any) -> int:
+        """Copy the state into a writable buffer of at least `len(self)` bytes."""
+        target = memoryview(buffer).cast("B")
+        offset = 0
+        for chunk in self.chunks():
+            with chunk:
+                target[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+        return offset
+
+    def write_to(self, handle) -> int:
+        """Stream the state to a binary file object."""
+        written = 0
+        for chunk in self.chunks():
+            with chunk:
+                written += handle.write(chunk)
+        return written
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+class CheckpointStore:
+    """Deduplicating checkpoint store on the local filesystem."""
+
+    def __init__(self, root: Optional[str] = None, average_chunk_bytes: Optional[int] = None):
+        self.root = os.path.abspath(root or config.recovery.checkpoint_dir or "checkpoints")
+        self.average_chunk_bytes = average_chunk_bytes or config.recovery.checkpoint_chunk_bytes
+        self._chunk_dir = os.path.join(self.root, "chunks")
+        self._manifest_dir = os.path.join(self.root, "manifests")
+
+    def write(self, agent_name: str, checkpoint_id: str, state: Any,
+              metadata: Optional[Dict[str, Any]] = None) -> CheckpointWrite:
+        """Store `state` (any bytes-like object) as a checkpoint, writing only new chunks."""
+        data = memoryview(state).cast("B")
+        chunks: List[Tuple[str, int]] = []
+        new_chunks = bytes_written = 0
+        start = 0
+        for end in chunk_boundaries(data, self.average_chunk_bytes):
+            piece = data[start:end]
+            digest = hashlib.sha256(piece).hexdigest()
+            if self._write_chunk(digest, piece):
+                new_chunks += 1
+                bytes_written += len(piece)
+            chunks.append((digest, len(piece)))
+            start = end
+
+        manifest = CheckpointManifest(agent_name, checkpoint_id, len(data), chunks, metadata=metadata or {})
+        self._atomic_write(self._manifest_path(agent_name, checkpoint_id),
+                           json.dumps(manifest.to_dict(), separators=(",", ":")).encode())
+        logger.info(
+            f"Checkpoint {checkpoint_id} for {agent_name}: {len(data)} bytes in {len(chunks)} chunks, "
+            f"{new_chunks} new ({bytes_written} bytes written)"
+        )
+        return CheckpointWrite(checkpoint_id, len(data), len(chunks), new_chunks, bytes_written)
+
+    def manifest(self, agent_name: str, checkpoint_id: str) -> CheckpointManifest:
+        """Manifest of a checkpoint; raises KeyError if it does not exist."""
+        try:
+            with open(self._manifest_path(agent_name, checkpoint_id)) as handle:
+                return CheckpointManifest.from_dict(json.load(handle))
+        except FileNotFoundError:
+            raise KeyError(f"No checkpoint {checkpoint_id} for {agent_name}") from None
+
+    def checkpoints(self, agent_name: str) -> List[str]:
+        """Checkpoint ids of an agent, oldest first."""
+        directory = os.path.join(self._manifest_dir, _component(agent_name))
+        if not os.path.isdir(directory):
+            return []
+        names = [name for name in os.listdir(directory) if name.endswith(".json")]
+        names.sort(key=lambda name: (os.stat(os.path.join(directory, name)).st_mtime_ns, name))
+        return [name[:-len(".json")] for name in names]
+
+    def latest(self, agent_name: str) -> Optional[str]:
+        checkpoints = self.checkpoints(agent_name)
+        return checkpoints[-1] if checkpoints else None
+
+    def open(self, agent_name: str, checkpoint_id: str) -> CheckpointView:
+        """View of a checkpoint's chunks; they are mapped as they are read."""
+        manifest = self.manifest(agent_name, checkpoint_id)
+        return CheckpointView(manifest, [self._chunk_path(digest) for digest, _ in manifest.chunks])
+
+    def restore(self, agent_name: str, checkpoint_id: str) -> bytearray:
+        """Reassemble a checkpoint in memory."""
+        with self.open(agent_name, checkpoint_id) as view:
+            state = bytearray(len(view))
+            view.readinto(state)
+        return state
+
+    def restore_to(self, agent_name: str, checkpoint_id: str, path: str) -> int:
+        """Reassemble a checkpoint into `path`, replacing it atomically; returns bytes written."""
+        with self.open(agent_name, checkpoint_id) as view:
+            return self._atomic_write(path, view)
+
+    def verify(self, agent_name: str, checkpoint_id: str) -> bool:
+        """Re-hash every chunk of a checkpoint."""
+        try:
+            with self.open(agent_name, checkpoint_id) as view:
+                for (digest, length), chunk in zip(view.manifest.chunks, view.chunks()):
+                    with chunk:
+                        if len(chunk) != length or hashlib.sha256(chunk).hexdigest() != digest:
+                            return False
+        except (KeyError, OSError, ValueError):
+            return False
+        return True
+
+    def delete(self, agent_name: str, checkpoint_id: str):
+        """Remove a checkpoint's manifest; run `collect_garbage` to free its chunks."""
+        try:
+            os.remove(self._manifest_path(agent_name, checkpoint_id))
+        except FileNotFoundError:
+            pass
+
+    def collect_garbage(self) -> int:
+        """Delete chunks no manifest refers to; returns the number removed."""
+        referenced = set()
+        for directory, _, files in os.walk(self._manifest_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    with open(os.path.join(directory, name)) as handle:
+                        referenced.update(digest for digest, _ in json.load(handle)["chunks"])
+        removed = 0
+        for directory, _, files in os.walk(self._chunk_dir):
+            for name in files:
+                if name not in referenced:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+        return removed
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self._chunk_dir, digest[:2], digest)
+
+    def _manifest_path(self, agent_name: str, checkpoint_id: str) -> str:
+        return os.path.join(self._manifest_dir, _component(agent_name), f"{_component(checkpoint_id)}.json")
+
+    def _write_chunk(self, digest: str, piece: memoryview) -> bool:
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return False
+        self._atomic_write(path, piece)
+        return True
+
+    def _atomic_write(self, path: str, content: Any) -> int:
+        """Temp file in the same directory, fsync, then rename; `content` is bytes or a CheckpointView."""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                written = content.write_to(handle) if isinstance(content, CheckpointView) else handle.write(content)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return written
+
+
+def _component(name: str) -> str:
+    """Reject names that would escape their directory."""
+    if not name or name in (".", "..") or "/" in name or os.sep in name:
+        raise ValueError(f"Invalid checkpoint path component: {name!r}")
+    return name
@@ -0,0 +1,268 @@
+"""Async DAG executor for recovery plans.
+
+`build_recovery_plan` returns action names; `build_recovery_dag` binds them to
+the recovery coroutines with their dependencies (rollback after the circuit
+breaker, restore after rollback, notifications alongside the rollback), and
+`RecoveryExecutor` runs the DAG with independent steps in parallel. Each step
+gets a timeout and up to `max_attempts` tries, and every attempt is timed, so
+time to recovery is the DAG's critical path rather than the sum of steps.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import config
+from tools.recovery.incident_response import (
+    activate_circuit_breaker,
+    notify_operations_team,
+    restore_checkpoint,
+    restore_destination,
+    rollback_to_version
+)
+from tools.recovery.ledger import RecoveryLedger
+
+logger = logging.getLogger(__name__)
+
+# Ordering constraints between plan actions; dependencies absent from a plan are ignored
+DEFAULT_DEPENDENCIES = {
+    "rollback": ["circuit_breaker"],
+    "restore": ["rollback"],
+    "notify": ["circuit_breaker"],
+    "escalate": ["circuit_breaker"],
+}
+
+
+@dataclass
+class PlanStep:
+    """One node of the recovery DAG."""
+    name: str
+    action: Callable[[], Awaitable[Any]]
+    depends_on: List[str] = field(default_factory=list)
+    timeout_seconds: Optional[float] = None
+    details: str = ""
+
+
+@dataclass
+class StepResult:
+    """Measured outcome of one step."""
+    name: str
+    status: str  # "completed", "failed", "timed_out" or "skipped"
+    attempts: int
+    duration_ms: float
+    started_at_ms: float  # offset from the start of the run
+    depends_on: List[str]
+    details: str = ""
+    error: Optional[str] = None
+
+
+@dataclass
+class ExecutionReport:
+    """Outcome of a whole recovery run."""
+    steps: List[StepResult]
+    total_ms: float
+    critical_path_ms: float
+    sum_of_steps_ms: float
+
+    @property
+    def successful(self) -> bool:
+        return all(step.status == "completed" for step in self.steps)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "steps": [asdict(step) for step in self.steps],
+            "total_ms": round(self.total_ms, 2),
+            "critical_path_ms": round(self.critical_path_ms, 2),
+            "sum_of_steps_ms": round(self.sum_of_steps_ms, 2),
+            "successful": self.successful,
+        }
+
+
+async def _no_op() -> bool:
+    return True
+
+
+def build_recovery_dag(
+    plan: List[str],
+    agent_name: str,
+    version: str,
+    checkpoint_id: str,
+    dependencies: Optional[Dict[str, List[str]]] = None,
+    ledger: Optional[RecoveryLedger] = None
+) -> List[PlanStep]:
+    """Bind plan actions to recovery coroutines and dependency edges.
+
+    With a `ledger`, state-changing actions are deduplicated per
+    (agent, action, target) across concurrent incidents. When a dependency
+    is not in the plan, the step depends on that dependency's own
+    dependencies instead, so dropping an action keeps the ordering around it.
+    """
+    dependencies = DEFAULT_DEPENDENCIES if dependencies is None else dependencies
+    message = f"Automated recovery in progress for {agent_name}"
+
+    def idempotent(action: str, target: str, factory: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        if ledger is None:
+            return factory
+
+        async def run() -> Any:
+            return (await ledger.run(agent_name, action, target, factory)).value
+        return run
+
+    actions = {
+        "circuit_breaker": (idempotent("circuit_breaker", "", lambda: activate_circuit_breaker(agent_name)),
+                            "Circuit breaker activated to prevent cascade failures"),
+        "rollback": (idempotent("rollback", version, lambda: rollback_to_version(agent_name, version)),
+                     f"Rolled back to {version}"),
+        "restore": (idempotent("restore", checkpoint_id, lambda: restore_checkpoint(agent_name, checkpoint_id)),
+                    _restore_details(agent_name, checkpoint_id)),
+        "notify": (lambda: notify_operations_team(message, "slack"), "Notified ops team via Slack"),
+        "escalate": (lambda: notify_operations_team(message, "pagerduty"), "Escalated via PagerDuty"),
+    }
+    steps = []
+    for name in plan:
+        action, details = actions.get(name, (_no_op, f"{name} recorded"))
+        depends_on = _planned_dependencies(name, plan, dependencies)
+        steps.append(PlanStep(name, action, depends_on, details=details))
+    return steps
+
+
+def _restore_details(agent_name: str, checkpoint_id: str) -> str:
+    if not config.recovery.checkpoint_dir:
+        return "No checkpoint store configured; state not restored"
+    destination = restore_destination(agent_name)
+    if destination is None:
+        return f"Checkpoint {checkpoint_id} verified; no state destination configured, state not restored"
+    return f"Restored state from {checkpoint_id} to {destination}"
+
+
+def _planned_dependencies(name: str, plan: List[str], dependencies: Dict[str, List[str]]) -> List[str]:
+    """Dependencies of `name` among planned actions, looking through unplanned ones."""
+    found: List[str] = []
+    visited = {name}
+    stack = list(reversed(dependencies.get(name, [])))
+    while stack:
+        dependency = stack.pop()
+        if dependency in visited:
+            continue
+        visited.add(dependency)
+        if dependency in plan:
+            found.append(dependency)
+        else:
+            stack.extend(reversed(dependencies.get(dependency, [])))
+    return found
+
+
+def _check_dag(steps: List[PlanStep]):
+    names = {step.name for step in steps}
+    if len(names) != len(steps):
+        raise ValueError("Recovery plan contains duplicate step names")
+    graph = {step.name: step.depends_on for step in steps}
+    for name, deps in graph.items():
+        missing = [d for d in deps if d not in names]
+        if missing:
+            raise ValueError(f"Step {name} depends on unknown steps {missing}")
+    # Kahn's algorithm: every step must be reachable from the dependency-free ones
+    remaining = {name: len(deps) for name, deps in graph.items()}
+    ready = [name for name, count in remaining.items() if count == 0]
+    visited = 0
+    while ready:
+        current = ready.pop()
+        visited += 1
+        for name, deps in graph.items():
+            if current in deps:
+                remaining[name] -= 1
+                if remaining[name] == 0:
+                    ready.append(name)
+    if visited != len(steps):
+        raise ValueError("Recovery plan has a dependency cycle")
+
+
+class RecoveryExecutor:
+    """Run a recovery DAG with per-step timeouts and retries."""
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        step_timeout_seconds: float = 30.0,
+        retry_backoff_seconds: float = 0.1
+    ):
+        self.max_attempts = config.recovery.max_recovery_attempts if max_attempts is None else max_attempts
+        self.step_timeout_seconds = step_timeout_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+
+    async def run(self, steps: List[PlanStep]) -> ExecutionReport:
+        """Execute every step once its dependencies have completed."""
+        _check_dag(steps)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        done: Dict[str, asyncio.Future] = {step.name: loop.create_future() for step in steps}
+
+        async def run_step(step: PlanStep) -> StepResult:
+            try:
+                upstream = [await done[d] for d in step.depends_on]
+                if any(result.status != "completed" for result in upstream):
+                    failed = [r.name for r in upstream if r.status != "completed"]
+                    result = StepResult(step.name, "skipped", 0, 0.0, (time.perf_counter() - started) * 1000,
+                                        step.depends_on, step.details, f"Dependencies did not complete: {failed}")
+                else:
+                    result = await self._attempt(step, started)
+            except Exception as e:  # never leave dependents waiting
+                result = StepResult(step.name, "failed", 0, 0.0, 0.0, step.depends_on, step.details, str(e))
+            done[step.name].set_result(result)
+            return result
+
+        results = await asyncio.gather(*(run_step(step) for step in steps))
+        total_ms = (time.perf_counter() - started) * 1000
+        report = ExecutionReport(list(results), total_ms, _critical_path_ms(results), sum(r.duration_ms for r in results))
+        logger.info(
+            f"Recovery DAG finished in {total_ms:.0f}ms (critical path {report.critical_path_ms:.0f}ms, "
+            f"sum of steps {report.sum_of_steps_ms:.0f}ms), success={report.successful}"
+        )
+        return report
+
+    async def _attempt(self, step: PlanStep, run_started: float) -> StepResult:
+        timeout = step.timeout_seconds or self.step_timeout_seconds
+        step_started = time.perf_counter()
+        status, error = "failed", None
+        attempts = 0
+        while attempts < self.max_attempts:
+            attempts += 1
+            try:
+                outcome = await asyncio.wait_for(step.action(), timeout)
+                if outcome is not False:
+                    status, error = "completed", None
+                    break
+                status, error = "failed", "Action reported failure"
+            except asyncio.TimeoutError:
+                status, error = "timed_out", f"Timed out after {timeout}s"
+            except Exception as e:
+                status, error = "failed", str(e)
+            logger.warning(f"Recovery step {step.name} attempt {attempts}/{self.max_attempts} failed: {error}")
+            if attempts < self.max_attempts:
+                await asyncio.sleep(self.retry_backoff_seconds * 2 ** (attempts - 1))
+        finished = time.perf_counter()
+        return StepResult(
+            step.name, status, attempts,
+            duration_ms=(finished - step_started) * 1000,
+            started_at_ms=(step_started - run_started) * 1000,
+            depends_on=step.depends_on,
+            details=step.details,
+            error=error
+        )
+
+
+def _critical_path_ms(results: List[StepResult]) -> float:
+    """Longest chain of measured step durations through the dependency edges."""
+    by_name = {result.name: result for result in results}
+    finish: Dict[str, float] = {}
+
+    def longest(name: str) -> float:
+        if name not in finish:
+            result = by_name[name]
+            finish[name] = result.duration_ms + max((longest(d) for d in result.depends_on), default=0.0)
+        return finish[name]
+
+    return max((longest(result.name) for result in results), default=0.0)
@@ -0,0 +1,185 @@
+"""Rate-limited, prioritized recovery of many agents at once.
+
+When a shared dependency fails, dozens of agents need a rollback together.
+`FleetRecoveryCoordinator` runs them through a bounded worker pool, takes a
+token from a per-platform `TokenBucket` before each call to the deployment
+backend, and serves the most severe incidents first. If the failure rate of
+the wave crosses `failure_rate_threshold` (after `min_results` outcomes), the
+wave halts and the remaining agents are reported as not attempted, since
+recoveries that are all failing usually mean the backend itself is down.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from utils import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_PRIORITY = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+@dataclass
+class RecoveryTarget:
+    """One agent to recover."""
+    agent_name: str
+    severity: str = "high"
+    platform: str = "cloud_run"
+    target_version: str = ""  # empty: the agent's last known good version
+
+
+@dataclass
+class FleetRecoveryResult:
+    """Outcome of one agent's recovery."""
+    agent_name: str
+    severity: str
+    platform: str
+    status: str  # "recovered", "failed", "timed_out" or "halted"
+    queued_ms: float = 0.0
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class FleetRecoveryReport:
+    """Outcome of a recovery wave."""
+    results: List[FleetRecoveryResult] = field(default_factory=list)
+    halted: bool = False
+    halt_reason: Optional[str] = None
+    elapsed_seconds: float = 0.0
+
+    def count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "results": [asdict(r) for r in self.results],
+            "recovered": self.count("recovered"),
+            "failed": self.count("failed") + self.count("timed_out"),
+            "not_attempted": self.count("halted"),
+            "halted": self.halted,
+            "halt_reason": self.halt_reason,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+        }
+
+
+def _succeeded(outcome: Any) -> bool:
+    if isinstance(outcome, dict):
+        return outcome.get("status") == "success"
+    return outcome is not False
+
+
+class FleetRecoveryCoordinator:
+    """Recover many agents concurrently without overloading the deployment backend."""
+
+    def __init__(
+        self,
+        recover: Optional[Callable[[RecoveryTarget], Awaitable[Any]]] = None,
+        workers: int = 8,
+        rate_per_second: Union[float, Dict[str, float]] = 5.0,
+        burst: float = 5.0,
+        failure_rate_threshold: float = 0.5,
+        min_results: int = 5,
+        timeout_seconds: float = 30.0
+    ):
+        self.recover = recover or _rollback_via_deployment_server
+        self.workers = workers
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_results = min_results
+        self.timeout_seconds = timeout_seconds
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, platform: str) -> TokenBucket:
+        """Token bucket shared by every recovery against `platform`."""
+        bucket = self._buckets.get(platform)
+        if bucket is None:
+            rate = self.rate_per_second
+            if isinstance(rate, dict):
+                rate = rate.get(platform, rate.get("default", 5.0))
+            bucket = self._buckets[platform] = TokenBucket(rate, self.burst)
+        return bucket
+
+    async def _acquire(self, platform: str):
+        bucket = self.bucket(platform)
+        while not bucket.try_acquire():
+            await asyncio.sleep(bucket.time_until_available())
+
+    async def run(self, targets: List[RecoveryTarget]) -> FleetRecoveryReport:
+        """Recover every target, most severe first, halting on a high failure rate."""
+        report = FleetRecoveryReport()
+        started = time.perf_counter()
+        queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        for seq, target in enumerate(targets):
+            queue.put_nowait((SEVERITY_PRIORITY.get(target.severity, len(SEVERITY_PRIORITY)), seq, target))
+        finished = {"ok": 0, "failed": 0}
+
+        async def worker():
+            while True:
+                try:
+                    _, _, target = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if report.halted:
+                    report.results.append(FleetRecoveryResult(
+                        target.agent_name, target.severity, target.platform, "halted",
+                        error=report.halt_reason
+                    ))
+                    continue
+                await self._acquire(target.platform)
+                if report.halted:  # the wave may have halted while waiting for a token
+                    report.results.append(FleetRecoveryResult(
+                        target.agent_name, target.severity, target.platform, "halted",
+                        error=report.halt_reason
+                    ))
+                    continue
+                result = await self._recover_one(target, started)
+                report.results.append(result)
+                finished["ok" if result.status == "recovered" else "failed"] += 1
+                self._check_halt(report, finished)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, max(len(targets), 1)))))
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(
+            f"Fleet recovery: {report.count('recovered')}/{len(targets)} recovered "
+            f"in {report.elapsed_seconds:.2f}s" + (f" (halted: {report.halt_reason})" if report.halted else "")
+        )
+        return report
+
+    async def _recover_one(self, target: RecoveryTarget, wave_started: float) -> FleetRecoveryResult:
+        call_started = time.perf_counter()
+        status, error = "recovered", None
+        try:
+            outcome = await asyncio.wait_for(self.recover(target), self.timeout_seconds)
+            if not _succeeded(outcome):
+                status, error = "failed", str(outcome)
+        except asyncio.TimeoutError:
+            status, error = "timed_out", f"Timed out after {self.timeout_seconds}s"
+        except Exception as e:
+            status, error = "failed", str(e)
+        return FleetRecoveryResult(
+            target.agent_name, target.severity, target.platform, status,
+            queued_ms=(call_started - wave_started) * 1000,
+            duration_ms=(time.perf_counter() - call_started) * 1000,
+            error=error
+        )
+
+    def _check_halt(self, report: FleetRecoveryReport, finished: Dict[str, int]):
+        total = finished["ok"] + finished["failed"]
+        if report.halted or total < self.min_results:
+            return
+        failure_rate = finished["failed"] / total
+        if failure_rate >= self.failure_rate_threshold:
+            report.halted = True
+            report.halt_reason = f"failure rate {failure_rate:.0%} after {total} recoveries"
+            logger.error(f"Halting recovery wave: {report.halt_reason}")
+
+
+async def _rollback_via_deployment_server(target: RecoveryTarget) -> Any:
+    from mcp_servers.deployment_server import deployment_server
+    return await deployment_server.rollback_agent(target.agent_name, target.target_version)
@@ -1,6 +1,14 @@
 """Recovery tools for incident response."""
 
-from typing import Dict, List
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+
+from config import config
+from tools.recovery.checkpoint_store import CheckpointStore
+
+logger = logging.getLogger(__name__)
 
 
 async def activate_circuit_breaker(agent_name: str) -> bool:
@@ -10,21 +18,57 @@ async def activate_circuit_breaker(agent_name: str) -> bool:
 
 
 async def rollback_to_version(agent_name: str, version: str) -> bool:
-    """Rollback agent to specified version."""
-    # Implementation will call deployment services
-    return True
+    """Rollback agent to specified version via the deployment server."""
+    from mcp_servers.deployment_server import deployment_server
+    result = await deployment_server.rollback_agent(agent_name, version)
+    return result.get("status") == "success"
 
 
-async def restore_checkpoint(agent_name: str, checkpoint_id: str) -> bool:
-    """Restore agent state from checkpoint."""
-    # Implementation will call state management services
-    return True
+def restore_destination(agent_name: str) -> Optional[str]:
+    """Where restored state for `agent_name` is written, if a state directory is configured."""
+    if not config.recovery.restored_state_dir:
+        return None
+    return os.path.join(config.recovery.restored_state_dir, f"{agent_name}.state")
+
+
+async def restore_checkpoint(agent_name: str, checkpoint_id: str, destination: Optional[str] = None) -> bool:
+    """Restore agent state from checkpoint.
+
+    Reads from the `CheckpointStore` under `config.recovery.checkpoint_dir`
+    and writes the state to `destination`, by default the agent's file under
+    `config.recovery.restored_state_dir`. With nowhere to write, the
+    checkpoint's chunks are only re-hashed, and nothing is restored.
+    """
+    if not config.recovery.checkpoint_dir:
+        logger.info(f"No checkpoint directory configured; skipping state restore for {agent_name}")
+        return True
+    destination = destination or restore_destination(agent_name)
+
+    def restore() -> bool:
+        store = CheckpointStore()
+        if not destination:
+            verified = store.verify(agent_name, checkpoint_id)
+            if verified:
+                logger.info(f"Verified {checkpoint_id} for {agent_name}; no state destination configured")
+            else:
+                logger.error(f"Checkpoint {checkpoint_id} for {agent_name} is missing or corrupt")
+            return verified
+        try:
+            size = store.restore_to(agent_name, checkpoint_id, destination)
+        except (KeyError, OSError, ValueError) as e:
+            logger.error(f"Cannot restore {checkpoint_id} for {agent_name}: {e}")
+            return False
+        logger.info(f"Restored {size} bytes of state for {agent_name} from {checkpoint_id} to {destination}")
+        return True
+
+    return await asyncio.to_thread(restore)
 
 
 async def notify_operations_team(message: str, channel: str = "slack") -> bool:
-    """Send notification to operations team."""
-    # Implementation will call notification services
-    return True
+    """Queue a notification to the operations team; delivery never blocks recovery."""
+    from mcp_servers.notification_server import notification_server
+    severity = "critical" if channel == "pagerduty" else "warning"
+    return notification_server.queue_notification(channel, "Automated recovery", message, severity)
 
 
 def build_recovery_plan(incident_severity: str) -> List[str]:
@@ -0,0 +1,123 @@
+"""Idempotent recovery action ledger.
+
+Several detectors and operators can trigger recovery for the same agent
+within seconds. The ledger keys every recovery action by
+(agent, action, target version/checkpoint), or by an explicit idempotency
+key:
+
+- the first request starts the work;
+- duplicates that arrive while it runs attach to the same execution;
+- duplicates within `result_ttl_seconds` after success get the cached result.
+
+Failures are not cached, so a later request retries. An action fails when
+it raises, is cancelled, or returns a value `succeeded` rejects; by default
+that is `False` or a dict whose status is not "success", the way the
+recovery tools report failure.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+@dataclass
+class LedgerResult:
+    """Result of a ledger call and where it came from."""
+    key: str
+    value: Any
+    source: str  # "executed", "attached" or "cached"
+
+
+def _succeeded(outcome: Any) -> bool:
+    if isinstance(outcome, dict):
+        return outcome.get("status") == "success"
+    return outcome is not False
+
+
+def idempotency_key(agent_name: str, action: str, target: str = "") -> str:
+    """Default key for an action on an agent towards a version or checkpoint."""
+    return f"{agent_name}:{action}:{target}"
+
+
+class RecoveryLedger:
+    """Deduplicate concurrent and repeated recovery actions."""
+
+    def __init__(self, result_ttl_seconds: float = 60.0, max_cached: int = 10_000, clock=time.monotonic,
+                 succeeded: Callable[[Any], bool] = _succeeded):
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_cached = max_cached
+        self.clock = clock
+        self.succeeded = succeeded
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.stats = {"executed": 0, "attached": 0, "cached": 0, "failed": 0}
+
+    def cached(self, key: str, default: Any = None) -> Any:
+        """Unexpired cached result for `key`, or `default`."""
+        entry = self._results.get(key)
+        if entry is None:
+            return default
+        stored_at, value = entry
+        if self.clock() - stored_at > self.result_ttl_seconds:
+            del self._results[key]
+            return default
+        return value
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._in_flight
+
+    async def run(
+        self,
+        agent_name: str,
+        action: str,
+        target: str,
+        factory: Callable[[], Awaitable[Any]],
+        key: Optional[str] = None
+    ) -> LedgerResult:
+        """Run `factory()` once per key; duplicates attach or get the cached result."""
+        key = key or idempotency_key(agent_name, action, target)
+
+        value = self.cached(key, _MISSING)
+        if value is not _MISSING:
+            self.stats["cached"] += 1
+            logger.info(f"Recovery action {key} already completed; returning cached result")
+            return LedgerResult(key, value, "cached")
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["attached"] += 1
+            logger.info(f"Recovery action {key} already in flight; attaching")
+            # Shield so one cancelled waiter does not cancel the shared execution
+            return LedgerResult(key, await asyncio.shield(task), "attached")
+
+        task = asyncio.ensure_future(factory())
+        self._in_flight[key] = task
+        self.stats["executed"] += 1
+        task.add_done_callback(lambda done: self._settle(key, done))
+        return LedgerResult(key, await asyncio.shield(task), "executed")
+
+    def _settle(self, key: str, task: asyncio.Task):
+        """Release the in-flight slot and cache a successful result."""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None or not self.succeeded(task.result()):
+            self.stats["failed"] += 1
+            return
+        self._store(key, task.result())
+
+    def _store(self, key: str, value: Any):
+        self._results[key] = (self.clock(), value)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_cached:
+            self._results.popitem(last=False)
+
+    def invalidate(self, key: str):
+        """Forget a cached result, e.g. after a new deploy changes the target."""
+        self._results.pop(key, None)
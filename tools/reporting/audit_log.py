@@ -0,0 +1,325 @@
+"""Durable, tamper-evident audit log: append-only segments, hash chaining, group commit.
+
+Each segment file starts with a header: magic, the chain hash the segment
+continues from, and the sequence number of its first record. Records follow:
+
+    <u32 payload length> <payload: JSON> <32-byte SHA-256 of (previous hash || payload)>
+
+The hash of every record covers the one before it, across segment
+boundaries, so editing, dropping or reordering any record breaks the chain
+from that point on. `head()` is the latest hash and can be anchored
+elsewhere. The segment header lets each segment be verified on its own,
+and in parallel.
+
+Durability uses group commit. Appends go to the file under a lock and
+return a sequence number. A caller that must be durable waits until a
+single fsync covers its record. If nobody is syncing, that caller becomes
+the leader and fsyncs everything written so far; callers that arrive
+meanwhile wait and share the next fsync. Under concurrent load, one fsync
+covers many events.
+
+A directory has one writer: opening a log takes an exclusive `flock` on the
+directory, so a second writer, in this process or another, fails instead of
+forking the chain. Code in one process that logs to the same directory
+should use `SegmentedAuditLog.shared`.
+"""
+
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ARGAUDIT1\n"
+GENESIS_HASH = b"\x00" * 32
+_HEADER = struct.Struct("<32sQ")  # previous hash, first sequence number
+_HEADER_SIZE = len(MAGIC) + _HEADER.size
+_LENGTH = struct.Struct("<I")
+_HASH_SIZE = 32
+
+SYNC_MODES = ("group", "always", "never")
+
+_shared: Dict[str, "SegmentedAuditLog"] = {}
+_shared_lock = threading.Lock()
+
+
+@dataclass
+class VerificationResult:
+    """Outcome of a chain verification pass."""
+    ok: bool
+    records: int
+    segments: int
+    head: str
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return asdict(self)
+
+
+def _segment_name(first_seq: int) -> str:
+    return f"segment-{first_seq:016d}.log"
+
+
+def _scan_segment(path: str) -> Tuple[bytes, int, bytes, int, int, Optional[str]]:
+    """Walk one segment's records, checking each hash.
+
+    Returns (previous hash from the header, first sequence, last hash,
+    record count, offset after the last good record, error or None).
+    """
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size < _HEADER_SIZE:
+            return GENESIS_HASH, 0, GENESIS_HASH, 0, 0, f"{os.path.basename(path)}: truncated header"
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                return GENESIS_HASH, 0, GENESIS_HASH, 0, 0, f"{os.path.basename(path)}: bad magic"
+            previous, first_seq = _HEADER.unpack_from(data, len(MAGIC))
+            chain, offset, count = previous, _HEADER_SIZE, 0
+            sha256 = hashlib.sha256
+            while offset < size:
+                if offset + _LENGTH.size > size:
+                    return previous, first_seq, chain, count, offset, f"torn record at offset {offset}"
+                (length,) = _LENGTH.unpack_from(data, offset)
+                end = offset + _LENGTH.size + length + _HASH_SIZE
+                if end > size:
+                    return previous, first_seq, chain, count, offset, f"torn record at offset {offset}"
+                payload = data[offset + _LENGTH.size:end - _HASH_SIZE]
+                digest = sha256(chain + payload).digest()
+                if digest != data[end - _HASH_SIZE:end]:
+                    return (previous, first_seq, chain, count, offset,
+                            f"hash mismatch at record {first_seq + count} ({os.path.basename(path)})")
+                chain, offset, count = digest, end, count + 1
+    return previous, first_seq, chain, count, offset, None
+
+
+class SegmentedAuditLog:
+    """Append-only, hash-chained audit log in segment files under `directory`."""
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, sync: str = "group"):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"sync must be one of {SYNC_MODES}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.sync = sync
+        self.stats = {"records": 0, "fsyncs": 0, "segments": 0}
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._syncing = False
+        self._retired: List[int] = []
+        self._fd: Optional[int] = None
+        self._dir_fd: Optional[int] = None
+        self.corruption: Optional[str] = None
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    @classmethod
+    def shared(cls, directory: str, **kwargs) -> "SegmentedAuditLog":
+        """The process-wide open log for `directory`, opening it on first use."""
+        key = os.path.realpath(directory)
+        with _shared_lock:
+            log = _shared.get(key)
+            if log is None or log._fd is None:
+                log = _shared[key] = cls(directory, **kwargs)
+            return log
+
+    # --- Opening and recovery ---
+
+    def segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "segment-*.log")))
+
+    def _open(self):
+        self._dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            fcntl.flock(self._dir_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._dir_fd)
+            self._dir_fd = None
+            raise RuntimeError(f"Audit log {self.directory} is already open by another writer") from None
+        segments = self.segments()
+        if not segments:
+            self._head, self._next_seq = GENESIS_HASH, 0
+            self._start_segment()
+            return
+        while segments and os.path.getsize(segments[-1]) < _HEADER_SIZE:
+            # A crash while starting a segment leaves it without a complete header,
+            # before any record was written to it; the previous segment is the tail
+            logger.warning(f"Removing {segments[-1]}: segment header was never completed")
+            os.remove(segments.pop())
+            self._sync_directory()
+        if not segments:
+            self._head, self._next_seq = GENESIS_HASH, 0
+            self._start_segment()
+            return
+        path = segments[-1]
+        _, first_seq, head, count, good_end, error = _scan_segment(path)
+        if error and error.startswith("torn record"):
+            # Only an incomplete record at the end of the newest segment can come from a crash
+            logger.warning(f"Truncating {path} to {good_end} bytes after recovery: {error}")
+            with open(path, "r+b") as handle:
+                handle.truncate(good_end)
+                os.fsync(handle.fileno())
+        elif error:
+            # Never repair a broken chain: keep the evidence and refuse to extend it
+            logger.error(f"Audit log {self.directory} failed verification, opening read-only: {error}")
+            self.corruption = error
+        self._head, self._next_seq = head, first_seq + count
+        self._durable_seq = self._next_seq - 1
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+        self._segment_size = good_end
+        self.stats["segments"] = len(segments)
+
+    def _start_segment(self):
+        """Begin a new segment continuing the chain (caller holds the lock or is initializing)."""
+        path = os.path.join(self.directory, _segment_name(self._next_seq))
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+        header = MAGIC + _HEADER.pack(self._head, self._next_seq)
+        os.write(fd, header)
+        os.fsync(fd)
+        self._sync_directory()  # make the new file's directory entry durable
+        if self._fd is not None:
+            os.fsync(self._fd)  # everything in the old segment is durable before we move on
+            self._retired.append(self._fd)
+        self._fd = fd
+        self._segment_size = len(header)
+        self._durable_seq = self._next_seq - 1
+        self.stats["segments"] += 1
+
+    def _sync_directory(self):
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    # --- Writing ---
+
+    def append(self, entry: Dict[str, Any], durable: bool = True) -> int:
+        """Append one entry; returns its sequence number once it is durable (per `sync`)."""
+        with self._lock:
+            if self._fd is None:
+                raise ValueError("Audit log is closed")
+            if self.corruption:
+                raise ValueError(f"Audit log chain is broken, refusing to append: {self.corruption}")
+            seq = self._next_seq
+            payload = json.dumps({"seq": seq, **entry}, separators=(",", ":"), default=str).encode()
+            digest = hashlib.sha256(self._head + payload).digest()
+            record = _LENGTH.pack(len(payload)) + payload + digest
+            if self._segment_size + len(record) > self.segment_bytes and self._segment_size > _HEADER_SIZE:
+                self._start_segment()
+            os.write(self._fd, record)
+            self._head = digest
+            self._next_seq += 1
+            self._segment_size += len(record)
+            self.stats["records"] += 1
+            if self.sync == "always" and durable:
+                os.fsync(self._fd)
+                self.stats["fsyncs"] += 1
+                self._durable_seq = seq
+                return seq
+        if self.sync == "group" and durable:
+            self._wait_durable(seq)
+        return seq
+
+    def _wait_durable(self, seq: int):
+        with self._lock:
+            while self._durable_seq < seq:
+                if self._syncing:
+                    self._synced.wait()
+                    continue
+                # Become the leader: one fsync covers everything written so far
+                self._syncing = True
+                fd, target = self._fd, self._next_seq - 1
+                retired, self._retired = self._retired, []
+                self._lock.release()
+                try:
+                    os.fsync(fd)
+                    for old in retired:
+                        os.close(old)
+                finally:
+                    self._lock.acquire()
+                    self._syncing = False
+                    self.stats["fsyncs"] += 1
+                    self._durable_seq = max(self._durable_seq, target)
+                    self._synced.notify_all()
+
+    def flush(self):
+        """Make every appended record durable."""
+        with self._lock:
+            last = self._next_seq - 1
+        if last >= 0:
+            self._wait_durable(last)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            for old in self._retired:
+                os.close(old)
+            self._retired = []
+            if self._dir_fd is not None:
+                os.close(self._dir_fd)  # releases the writer lock
+                self._dir_fd = None
+
+    def __enter__(self) -> "SegmentedAuditLog":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._next_seq
+
+    def head(self) -> str:
+        """Hex hash of the latest record; anchor it externally to detect truncation."""
+        return self._head.hex()
+
+    # --- Reading and verification ---
+
+    def entries(self, start_seq: int = 0) -> Iterator[Dict[str, Any]]:
+        """Decoded entries in order, from `start_seq`."""
+        for path in self.segments():
+            first_seq = int(os.path.basename(path)[len("segment-"):-len(".log")])
+            with open(path, "rb") as handle:
+                data = handle.read()
+            offset, seq = _HEADER_SIZE, first_seq
+            while offset + _LENGTH.size <= len(data):
+                (length,) = _LENGTH.unpack_from(data, offset)
+                end = offset + _LENGTH.size + length
+                if end + _HASH_SIZE > len(data):
+                    break
+                if seq >= start_seq:
+                    yield json.loads(data[offset + _LENGTH.size:end])
+                offset, seq = end + _HASH_SIZE, seq + 1
+
+    def verify(self, workers: int = 1) -> VerificationResult:
+        """Recompute the hash chain over every segment, in parallel processes if `workers` > 1."""
+        self.flush()
+        segments = self.segments()
+        if workers > 1 and len(segments) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                scans = list(pool.map(_scan_segment, segments))
+        else:
+            scans = [_scan_segment(path) for path in segments]
+
+        chain, expected_seq, records = GENESIS_HASH, 0, 0
+        for path, (previous, first_seq, last, count, _, error) in zip(segments, scans):
+            name = os.path.basename(path)
+            if previous != chain or first_seq != expected_seq:
+                return VerificationResult(False, records, len(segments), chain.hex(),
+                                          f"{name} does not continue the chain from record {expected_seq}")
+            if error:
+                return VerificationResult(False, records + count, len(segments), last.hex(), error)
+            chain, expected_seq, records = last, first_seq + count, records + count
+        return VerificationResult(True, records, len(segments), chain.hex())
@@ -1,8 +1,11 @@
 """Reporting tools for audit trails and compliance."""
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+from config import config
+from tools.reporting.audit_log import SegmentedAuditLog
+
 
 class AuditLog:
     """Immutable audit log entry."""
@@ -26,20 +29,40 @@ class AuditLog:
 
 
 class AuditTrail:
-    """Immutable audit trail for compliance."""
+    """Immutable audit trail for compliance.
+    
+    Backed by a durable `SegmentedAuditLog` when `log_dir` is given, or when
+    immutable logs are enabled and `config.compliance.audit_log_dir` is set;
+    otherwise entries are kept in memory. Trails on the same directory share
+    one store, so their entries form a single chain.
+    """
     
-    def __init__(self):
+    def __init__(self, log_dir: Optional[str] = None):
         self.entries: List[AuditLog] = []
+        if log_dir is None and config.compliance.enable_immutable_logs:
+            log_dir = config.compliance.audit_log_dir
+        self.store: Optional[SegmentedAuditLog] = SegmentedAuditLog.shared(log_dir) if log_dir else None
     
     def log(self, event_type: str, actor: str, details: str) -> str:
-        """Log an event."""
+        """Log an event; with a durable store, returns once the event is on disk."""
         entry = AuditLog(event_type, actor, details)
-        self.entries.append(entry)
+        if self.store is not None:
+            self.store.append(entry.to_dict())
+        else:
+            self.entries.append(entry)
         return entry.event_id
     
     def get_entries(self) -> List[Dict[str, Any]]:
         """Get all audit entries."""
+        if self.store is not None:
+            return list(self.store.entries())
         return [entry.to_dict() for entry in self.entries]
+    
+    def verify(self) -> Dict[str, Any]:
+        """Check the hash chain of the durable store."""
+        if self.store is None:
+            return {"ok": True, "records": len(self.entries), "durable": False}
+        return {**self.store.verify().to_dict(), "durable": True}
 
 
 def calculate_sla_compliance(uptime_hours: float, target_uptime_percent: float) -> Dict[str, Any]:
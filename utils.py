@@ -2,7 +2,9 @@
 
 import logging
 import json
-from typing import Any, Dict
+import time
+from collections import deque
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 
@@ -37,13 +39,14 @@ def from_json(data: str) -> Any:
 class MetricsCollector:
     """Collect and aggregate metrics."""
     
-    def __init__(self):
+    def __init__(self, max_samples: Optional[int] = None):
         self.metrics: Dict[str, Any] = {}
+        self.max_samples = max_samples  # keep only the latest samples per metric when set
     
     def record(self, name: str, value: float, metadata: Dict[str, Any] = None):
         """Record a metric."""
         if name not in self.metrics:
-            self.metrics[name] = []
+            self.metrics[name] = [] if self.max_samples is None else deque(maxlen=self.max_samples)
         
         self.metrics[name].append({
             "value": value,
@@ -107,6 +110,37 @@ class CircuitBreaker:
         return True
 
 
+class TokenBucket:
+    """Token bucket rate limiter."""
+    
+    def __init__(self, rate_per_second: float, capacity: float = 1.0, clock=time.monotonic):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.last_refill = clock()
+    
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate_per_second)
+        self.last_refill = now
+    
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available."""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+    
+    def time_until_available(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` can be taken (0 if available now)."""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate_per_second
+
+
 logger = setup_logging()
 
 def parse_adk_event(event) -> Dict[str, Any]: